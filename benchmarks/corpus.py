@@ -0,0 +1,138 @@
+"""
+基准测试语料生成
+基础语料复用 tests/test_merge.py 中的 create_test_pdf，另外生成图片密集、共享字体、大交叉引用表和注释密集四类较重的语料
+"""
+
+import os
+import io
+import sys
+import zlib
+import contextlib
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+
+from test_merge import create_test_pdf
+
+
+# 多个文件共用的嵌入字体（PyMuPDF 内置的 Base14 替代字体）
+SHARED_FONTS = ['helv', 'tiro', 'cour', 'symb', 'zadb']
+
+
+def _logo_pixmap(size: int = 256) -> fitz.Pixmap:
+    """生成所有文件共用的“徽标”图片"""
+    samples = bytearray(size * size * 3)
+    for y in range(size):
+        for x in range(size):
+            offset = (y * size + x) * 3
+            samples[offset] = x % 256
+            samples[offset + 1] = y % 256
+            samples[offset + 2] = (x * y) % 256
+    return fitz.Pixmap(fitz.csRGB, size, size, bytes(samples), False)
+
+
+def create_image_pdf(filename: str, page_count: int, logo: fitz.Pixmap):
+    """每页一张共用徽标图片 + 一张本文件独有的图片"""
+    doc = fitz.open()
+    unique = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 128, 128), False)
+    unique.set_rect(unique.irect, (zlib.crc32(filename.encode('utf-8')) % 256, 80, 160))
+    for i in range(page_count):
+        page = doc.new_page(width=595, height=842)
+        page.insert_image(fitz.Rect(50, 50, 306, 306), pixmap=logo)
+        page.insert_image(fitz.Rect(320, 50, 448, 178), pixmap=unique)
+        page.insert_text((50, 800), f"- {i + 1} -", fontsize=12)
+    doc.save(filename)
+    doc.close()
+
+
+def create_font_pdf(filename: str, page_count: int):
+    """每个文件都嵌入同一组字体"""
+    doc = fitz.open()
+    buffers = {name: fitz.Font(name).buffer for name in SHARED_FONTS}
+    for i in range(page_count):
+        page = doc.new_page(width=595, height=842)
+        y = 60
+        for idx, name in enumerate(SHARED_FONTS):
+            alias = f"F{idx}"
+            page.insert_font(fontname=alias, fontbuffer=buffers[name])
+            page.insert_text((50, y), f"{name} page {i + 1}", fontname=alias, fontsize=14)
+            y += 30
+    doc.save(filename)
+    doc.close()
+
+
+def create_xref_pdf(filename: str, page_count: int, objects_per_page: int = 500):
+    """每页引用大量独立的小对象，生成很大的交叉引用表"""
+    doc = fitz.open()
+    for i in range(page_count):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 50), f"xref page {i + 1}", fontsize=14)
+        refs = []
+        for j in range(objects_per_page):
+            xref = doc.get_new_xref()
+            doc.update_object(xref, f"<</Tag(p{i}o{j})/Order {j}>>")
+            refs.append(f"/MC{j} {xref} 0 R")
+        kind, value = doc.xref_get_key(page.xref, "Resources")
+        target = int(value.split()[0]) if kind == 'xref' else page.xref
+        key = "Properties" if kind == 'xref' else "Resources/Properties"
+        doc.xref_set_key(target, key, "<<" + " ".join(refs) + ">>")
+    doc.save(filename)
+    doc.close()
+
+
+def create_annot_pdf(filename: str, page_count: int, links_per_page: int = 20, notes_per_page: int = 10):
+    """每页带大量链接（含跨页跳转）和文本注释"""
+    doc = fitz.open()
+    for i in range(page_count):
+        doc.new_page(width=595, height=842).insert_text((50, 40), f"annots page {i + 1}", fontsize=14)
+    for i, page in enumerate(doc):
+        for j in range(links_per_page):
+            rect = fitz.Rect(50, 60 + j * 18, 300, 74 + j * 18)
+            if j % 2:
+                page.insert_link({'kind': fitz.LINK_URI, 'from': rect, 'uri': f"https://example.com/{i}/{j}"})
+            else:
+                page.insert_link({'kind': fitz.LINK_GOTO, 'from': rect, 'page': (i + j) % page_count})
+        for j in range(notes_per_page):
+            page.add_text_annot((350, 60 + j * 36), f"note {i + 1}.{j + 1}")
+    doc.save(filename)
+    doc.close()
+
+
+def build_corpus(directory: str, kind: str, file_count: int, page_count: int) -> list:
+    """
+    生成（或复用已生成的）语料
+
+    Args:
+        directory: 语料目录
+        kind: 语料类型 text/images/fonts/xref/annots
+        file_count: 文件数量
+        page_count: 每个文件的页数
+
+    Returns:
+        list: 文件路径列表
+    """
+    target = os.path.join(directory, f"{kind}-{file_count}x{page_count}")
+    os.makedirs(target, exist_ok=True)
+    logo = _logo_pixmap() if kind == 'images' else None
+
+    paths = []
+    for i in range(file_count):
+        filename = os.path.join(target, f"{kind}_{i:04d}.pdf")
+        paths.append(filename)
+        if os.path.exists(filename):
+            continue
+        if kind == 'text':
+            # create_test_pdf 每生成一个文件都会打印一行，这里不需要
+            with contextlib.redirect_stdout(io.StringIO()):
+                create_test_pdf(filename, page_count=page_count)
+        elif kind == 'images':
+            create_image_pdf(filename, page_count, logo)
+        elif kind == 'fonts':
+            create_font_pdf(filename, page_count)
+        elif kind == 'xref':
+            create_xref_pdf(filename, page_count)
+        elif kind == 'annots':
+            create_annot_pdf(filename, page_count)
+        else:
+            raise ValueError(f"未知的语料类型: {kind}")
+    return paths
@@ -0,0 +1,198 @@
+"""
+PDF合并性能基准测试
+复现 README 中的性能表，并与保存的基线比较，性能回退时以非零状态退出
+
+使用示例:
+  # 运行全部场景并与基线比较
+  python benchmarks/run_benchmarks.py
+
+  # 只运行部分场景，结果写入指定文件
+  python benchmarks/run_benchmarks.py --scenarios small medium -o results.json
+
+  # 比较不同合并配置的速度和输出大小
+  python benchmarks/run_benchmarks.py --scenarios annots --variants compress lean pages-only
+
+  # 用本次结果更新基线
+  python benchmarks/run_benchmarks.py --update-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'src'))
+
+import fitz  # PyMuPDF
+from core.merger import PdfMerger
+from corpus import build_corpus
+
+
+# 场景: (语料类型, 文件数, 每个文件页数, README中声明的耗时上限(秒)或None)
+SCENARIOS = {
+    'small': ('text', 10, 5, 1.0),
+    'medium': ('text', 50, 20, 5.0),
+    'large': ('text', 100, 50, 15.0),
+    'images': ('images', 20, 20, None),
+    'fonts': ('fonts', 50, 10, None),
+    'xref': ('xref', 20, 10, None),
+    'annots': ('annots', 20, 10, None),
+}
+
+# 每个场景下运行的合并选项
+VARIANTS = {
+    'compress': {'compress': True},
+    'no-compress': {'compress': False},
+    'balanced': {'compression': 'balanced'},
+    'no-dedupe': {'compression': 'balanced', 'dedupe': False},
+    'lean': {'compress': True, 'merge_profile': 'lean'},
+    'pages-only': {'compress': True, 'merge_profile': 'pages-only'},
+}
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_CORPUS_DIR = os.path.join(BENCH_DIR, '.corpus')
+
+
+def run_case(paths: list, merge_options: dict, repeat: int) -> dict:
+    """
+    对一组文件计时（取多次运行中的最小值）
+
+    Returns:
+        dict: {add_files_s, merge_s, pages, output_bytes}
+    """
+    best_add = best_merge = float('inf')
+    output_dir = tempfile.mkdtemp(prefix='pdfmerge-bench-')
+    output = os.path.join(output_dir, 'merged.pdf')
+    try:
+        for _ in range(repeat):
+            merger = PdfMerger()
+            start = time.perf_counter()
+            merger.add_files(paths)
+            best_add = min(best_add, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            merger.merge(output, mode='serial', **merge_options)
+            best_merge = min(best_merge, time.perf_counter() - start)
+
+        return {
+            'add_files_s': round(best_add, 4),
+            'merge_s': round(best_merge, 4),
+            'pages': merger.get_total_pages(),
+            'output_bytes': os.path.getsize(output),
+        }
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta: float) -> list:
+    """
+    与基线比较
+
+    Returns:
+        list: 回退项描述
+    """
+    regressions = []
+    for case, metrics in results.items():
+        base = baseline.get(case)
+        if not base:
+            continue
+        for metric in ('add_files_s', 'merge_s'):
+            if metric not in base:
+                continue
+            limit = max(base[metric] * (1 + tolerance), base[metric] + min_delta)
+            if metrics[metric] > limit:
+                regressions.append(
+                    f"{case} {metric}: {metrics[metric]:.3f}s > 基线 {base[metric]:.3f}s"
+                )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='PDF合并性能基准测试')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help='要运行的场景（默认全部）')
+    parser.add_argument('--variants', nargs='+', choices=list(VARIANTS), default=list(VARIANTS),
+                        help='要运行的合并选项（默认全部）')
+    parser.add_argument('--repeat', type=int, default=3, help='每个用例重复次数，取最小值（默认: 3）')
+    parser.add_argument('-o', '--output', default='bench_results.json', help='结果输出文件')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='基线文件')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='允许的相对回退比例（默认: 0.25）')
+    parser.add_argument('--min-delta', type=float, default=0.05,
+                        help='允许的绝对回退秒数，避免很短的用例受噪声影响（默认: 0.05）')
+    parser.add_argument('--update-baseline', action='store_true', help='用本次结果更新基线')
+    parser.add_argument('--corpus-dir', default=DEFAULT_CORPUS_DIR, help='语料缓存目录')
+    args = parser.parse_args(argv)
+
+    results = {}
+    claims = []
+    for name in args.scenarios:
+        kind, file_count, page_count, claim = SCENARIOS[name]
+        print(f"📁 准备语料 {name}: {file_count}个文件 × {page_count}页 ({kind})")
+        paths = build_corpus(args.corpus_dir, kind, file_count, page_count)
+
+        for variant in args.variants:
+            case = f"{name}/{variant}"
+            metrics = run_case(paths, VARIANTS[variant], args.repeat)
+            results[case] = metrics
+            total = metrics['add_files_s'] + metrics['merge_s']
+            print(f"  ⏱  {case:24s} 验证 {metrics['add_files_s']:7.3f}s  "
+                  f"合并 {metrics['merge_s']:7.3f}s  输出 {metrics['output_bytes'] / 1024:9.1f}KB")
+            if claim is not None and variant == 'compress':
+                claims.append((name, total, claim))
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'pymupdf': fitz.VersionBind,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n📄 结果已写入: {args.output}")
+
+    if claims:
+        print("\nREADME 性能声明:")
+        for name, total, claim in claims:
+            status = "✅" if total <= claim else "⚠️ "
+            print(f"{status} {name:8s} {total:7.3f}s (声明 ≤ {claim}s)")
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f).get('results', {})
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({'meta': report['meta'], 'results': baseline}, f, indent=2, ensure_ascii=False)
+        print(f"📌 基线已更新: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("⚠️  没有基线文件，跳过回退检查（使用 --update-baseline 生成）")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f).get('results', {})
+    regressions = compare(results, baseline, args.tolerance, args.min_delta)
+    if regressions:
+        print("\n❌ 性能回退:")
+        for item in regressions:
+            print(f"  {item}")
+        return 1
+    print("\n✅ 没有超出容差的性能回退")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,6 +2,7 @@
 统一入口：无参数启动 GUI，有参数启动 CLI
 """
 import sys
+import multiprocessing
 
 
 def main():
@@ -17,4 +18,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包后的可执行文件使用进程池时需要
+    multiprocessing.freeze_support()
     sys.exit(main())
@@ -1,4 +1,15 @@
 """PDF合并核心模块"""
 from .merger import PdfMerger
+from .doc_cache import DocumentCache
+from .meta_cache import MetadataCache
+from .result_cache import ResultCache
+from .profiler import MergeProfiler
+from .scanner import scan_pdfs
+from .validation import VALIDATION_LEVELS
+from .progress import ProgressBus, ProgressEvent
+from .cancel import CancelToken, MergeCancelled
+from .async_merge import AsyncMerger, ProgressStream, merge_async
 
-__all__ = ['PdfMerger']
+__all__ = ['PdfMerger', 'DocumentCache', 'MetadataCache', 'ResultCache', 'MergeProfiler', 'scan_pdfs',
+           'VALIDATION_LEVELS', 'ProgressBus', 'ProgressEvent', 'CancelToken', 'MergeCancelled',
+           'AsyncMerger', 'ProgressStream', 'merge_async']
@@ -0,0 +1,192 @@
+"""
+异步合并接口
+在 asyncio 服务中使用：验证和合并在受管理的线程池中运行，信号量限制同时进行的合并数，
+进度事件以异步迭代器交付，取消任务即取消合并
+"""
+
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+from .merger import PdfMerger
+from .cancel import CancelToken
+from .progress import ProgressBus, ProgressEvent
+
+
+# 默认同时进行的合并数
+DEFAULT_CONCURRENT_MERGES = 2
+# 进度流中最多暂存的事件数，消费者跟不上时丢弃最早的事件（事件中的计数是累计值）
+MAX_PENDING_EVENTS = 256
+
+
+class ProgressStream:
+    """
+    一次合并的进度事件的异步迭代器
+
+    用法:
+        events = ProgressStream()
+        task = asyncio.create_task(runner.merge(paths, output, events=events))
+        async for event in events:
+            ...
+    合并结束（完成、失败或取消）后迭代结束
+    """
+
+    def __init__(self, max_pending: int = MAX_PENDING_EVENTS):
+        self._events = deque(maxlen=max_pending)
+        self._closed = False
+        self._wakeup = None  # 在事件循环中首次使用时创建
+
+    def attach(self, bus: ProgressBus, loop: asyncio.AbstractEventLoop):
+        """订阅总线；事件在工作线程中发布，转交给事件循环"""
+        bus.subscribe(lambda event: loop.call_soon_threadsafe(self._put, event))
+
+    def _signal(self) -> asyncio.Event:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        return self._wakeup
+
+    def _put(self, event: ProgressEvent):
+        self._events.append(event)
+        self._signal().set()
+
+    def close(self):
+        """结束迭代（已暂存的事件仍会交付）"""
+        self._closed = True
+        self._signal().set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ProgressEvent:
+        while not self._events:
+            if self._closed:
+                raise StopAsyncIteration
+            wakeup = self._signal()
+            await wakeup.wait()
+            wakeup.clear()
+        return self._events.popleft()
+
+
+class AsyncMerger:
+    """在事件循环中调度合并：每个合并占用线程池中的一个线程，超出上限的请求在事件循环中排队"""
+
+    def __init__(self,
+                 max_concurrent: int = DEFAULT_CONCURRENT_MERGES,
+                 merger_factory: Callable[[], PdfMerger] = PdfMerger):
+        """
+        初始化
+
+        Args:
+            max_concurrent: 同时进行的合并数上限
+            merger_factory: 为每次合并创建 PdfMerger 的函数（可在其中配置缓存等选项）
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.merger_factory = merger_factory
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent,
+                                            thread_name_prefix='pdfmerge')
+        self._slots = None       # 所属事件循环中的信号量
+        self._slots_loop = None
+        self.active = 0          # 正在进行的合并数
+
+    async def merge(self,
+                    inputs: Iterable,
+                    output_path: str,
+                    events: Optional[ProgressStream] = None,
+                    progress_interval: float = 0.1,
+                    add_options: Optional[dict] = None,
+                    **merge_options) -> dict:
+        """
+        验证并合并一组输入
+
+        Args:
+            inputs: 传给 PdfMerger.add_files 的路径（或 (路径, 页码规格)、内存中的PDF数据）
+            output_path: 输出文件路径或可写的文件对象
+            events: 接收进度事件的流
+            progress_interval: 进度事件的最小间隔（秒）
+            add_options: 传给 add_files 的其他参数（jobs/executor/level）
+            merge_options: 传给 PdfMerger.merge 的其他参数
+
+        Returns:
+            dict: {path, files: 合并的文件数, pages, invalid: 验证失败的文件信息,
+                   skipped: 合并时跳过的文件记录, dedup: 去重统计或None}
+
+        Raises:
+            asyncio.CancelledError: 任务被取消（合并已停止，未写完的输出已删除）
+        """
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+            self._slots_loop = loop
+        try:
+            async with self._slots:
+                self.active += 1
+                try:
+                    return await self._run(loop, inputs, output_path, events, progress_interval,
+                                           add_options or {}, merge_options)
+                finally:
+                    self.active -= 1
+        finally:
+            if events:
+                events.close()
+
+    async def _run(self, loop, inputs, output_path, events, progress_interval, add_options, merge_options):
+        cancel = CancelToken()
+        bus = ProgressBus(progress_interval)
+        if events:
+            events.attach(bus, loop)
+
+        def job():
+            merger = self.merger_factory()
+            infos = merger.add_files(inputs, cancel=cancel, **add_options)
+            merger.merge(output_path, progress=bus, cancel=cancel, **merge_options)
+            return {
+                'path': output_path,
+                'files': len(merger.file_list) - len(merger.get_skipped_files()),
+                'pages': merger.get_total_pages(),
+                'invalid': [info for info in infos if not info['valid']],
+                'skipped': merger.get_skipped_files(),
+                'dedup': merger.get_dedup_stats(),
+            }
+
+        future = loop.run_in_executor(self._executor, job)
+        try:
+            # shield：任务被取消时工作线程仍在运行，需要等它停止并清理
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            cancel.cancel()
+            await asyncio.wait([future])
+            if not future.cancelled():
+                future.exception()  # 取走 MergeCancelled
+            raise
+
+    async def close(self):
+        """等待进行中的合并结束并关闭线程池"""
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+_default_merger = None
+
+
+async def merge_async(inputs: Iterable, output_path: str, **options) -> dict:
+    """
+    使用共享的 AsyncMerger 合并（同一进程内最多同时进行 DEFAULT_CONCURRENT_MERGES 个合并）
+
+    Args:
+        inputs: 输入路径
+        output_path: 输出文件路径
+        options: 见 AsyncMerger.merge
+
+    Returns:
+        dict: 见 AsyncMerger.merge
+    """
+    global _default_merger
+    if _default_merger is None:
+        _default_merger = AsyncMerger()
+    return await _default_merger.merge(inputs, output_path, **options)
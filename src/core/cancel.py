@@ -0,0 +1,63 @@
+"""
+合并取消
+调用方持有 CancelToken 并在任意线程中调用 cancel()；验证和合并在文件之间、
+页面块之间检查令牌，抛出 MergeCancelled 后清理临时文件和未完成的输出
+"""
+
+import signal
+import threading
+from typing import Optional
+
+
+class MergeCancelled(Exception):
+    """验证或合并被取消"""
+
+    def __init__(self, message: str = "操作已取消"):
+        super().__init__(message)
+
+
+class CancelToken:
+    """协作式取消令牌（线程安全）"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """请求取消；正在进行的操作在下一个检查点停止"""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        """
+        已请求取消时抛出异常
+
+        Raises:
+            MergeCancelled: 已请求取消
+        """
+        if self._event.is_set():
+            raise MergeCancelled()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待取消请求
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            bool: 是否已请求取消
+        """
+        return self._event.wait(timeout)
+
+
+def ignore_interrupts():
+    """
+    工作进程忽略 SIGINT
+
+    终端中的 Ctrl-C 会发给整个进程组；工作进程由主进程通过取消令牌停止，
+    不应各自抛出 KeyboardInterrupt 导致进程池损坏
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
@@ -0,0 +1,166 @@
+"""
+可恢复的合并
+输入按顺序划分为若干检查点分段，每段合并后写入输出文件旁的检查点目录并记入日志；
+中断后以相同输入再次运行时跳过已完成的分段，成功后自动删除检查点目录
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from typing import List, Optional, Tuple
+
+
+# 每个检查点分段的文件数和总大小上限（满足其一即结束当前分段）
+CHECKPOINT_FILES = 200
+CHECKPOINT_BYTES = 256 * 1024 * 1024
+
+JOURNAL_VERSION = 1
+
+
+def checkpoint_dir(output_path: str) -> str:
+    """输出文件对应的检查点目录"""
+    return os.path.abspath(output_path) + '.pdfmerge-resume'
+
+
+def plan_chunks(file_list: List[dict], max_files: int, max_bytes: int) -> List[Tuple[int, int]]:
+    """
+    把输入划分为检查点分段
+
+    Returns:
+        List[tuple]: [(起始下标, 结束下标)]，左闭右开
+    """
+    chunks = []
+    start = 0
+    size = 0
+    for idx, file_info in enumerate(file_list):
+        if idx > start and (idx - start >= max_files or size + file_info['size'] > max_bytes):
+            chunks.append((start, idx))
+            start, size = idx, 0
+        size += file_info['size']
+    if start < len(file_list):
+        chunks.append((start, len(file_list)))
+    return chunks
+
+
+def job_key(file_list: List[dict], options: dict) -> str:
+    """
+    合并任务的标识：输入文件（路径、大小、修改时间、选中的页面）和影响分段内容的选项
+
+    只读取文件元数据，上万个输入时也能很快算出
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(options, sort_keys=True).encode('utf-8'))
+    for file_info in file_list:
+        st = os.stat(file_info['path'])
+        digest.update(json.dumps([
+            os.path.abspath(file_info['path']), st.st_size, st.st_mtime_ns, file_info.get('page_runs')
+        ]).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class MergeJournal:
+    """检查点目录中的日志：分段划分和已完成的分段"""
+
+    def __init__(self, directory: str, state: dict, resumed: bool):
+        self.directory = directory
+        self.state = state
+        self.resumed = resumed
+
+    @classmethod
+    def open(cls,
+             output_path: str,
+             file_list: List[dict],
+             options: dict,
+             max_files: Optional[int] = None,
+             max_bytes: Optional[int] = None) -> 'MergeJournal':
+        """
+        打开输出文件对应的日志；日志不存在、已损坏或属于另一组输入时重新开始
+
+        Args:
+            output_path: 输出文件路径
+            file_list: 有效的输入文件（有序）
+            options: 影响分段内容的选项
+            max_files: 每个分段的文件数上限（默认 CHECKPOINT_FILES，仅新任务使用）
+            max_bytes: 每个分段的总大小上限（默认 CHECKPOINT_BYTES，仅新任务使用）
+
+        Returns:
+            MergeJournal: 日志，resumed 表示是否从已有的检查点继续
+        """
+        directory = checkpoint_dir(output_path)
+        key = job_key(file_list, options)
+        try:
+            with open(os.path.join(directory, 'journal.json'), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == JOURNAL_VERSION and state.get('key') == key:
+                return cls(directory, state, resumed=True)
+        except (OSError, ValueError):
+            pass
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+        state = {
+            'version': JOURNAL_VERSION,
+            'key': key,
+            'chunks': [list(c) for c in plan_chunks(
+                file_list, max_files or CHECKPOINT_FILES, max_bytes or CHECKPOINT_BYTES
+            )],
+            'completed': {},
+        }
+        journal = cls(directory, state, resumed=False)
+        journal._write()
+        return journal
+
+    @property
+    def chunks(self) -> List[Tuple[int, int]]:
+        return [tuple(c) for c in self.state['chunks']]
+
+    def completed(self, idx: int) -> Optional[dict]:
+        """已完成分段的记录 {shard, pages, skipped, dedup}，未完成时返回 None"""
+        return self.state['completed'].get(str(idx))
+
+    def shard_path(self, idx: int) -> str:
+        return os.path.join(self.directory, f"chunk-{idx:05d}.pdf")
+
+    def complete(self, idx: int, shard: Optional[str], pages: int,
+                 skipped: List[dict], dedup: Optional[dict] = None):
+        """
+        记录一个已写入磁盘的分段
+
+        Args:
+            idx: 分段下标
+            shard: 分段文件路径（分段中没有可合并的页面时为 None）
+            pages: 分段页数
+            skipped: 分段中被跳过的文件
+            dedup: 分段内的去重统计
+        """
+        self.state['completed'][str(idx)] = {
+            'shard': os.path.basename(shard) if shard else None,
+            'pages': pages,
+            'skipped': skipped,
+            'dedup': dedup,
+        }
+        self._write()
+
+    def shards(self) -> List[str]:
+        """按顺序列出所有非空分段的文件路径"""
+        paths = []
+        for idx in range(len(self.state['chunks'])):
+            record = self.completed(idx)
+            if record and record['shard']:
+                paths.append(os.path.join(self.directory, record['shard']))
+        return paths
+
+    def remove(self):
+        """删除检查点目录"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write(self):
+        # 先写临时文件再替换，进程在任何时刻被终止都不会留下半个日志
+        path = os.path.join(self.directory, 'journal.json')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
@@ -0,0 +1,83 @@
+"""
+输出压缩等级
+把命名的等级映射为 fitz.Document.save 的选项；auto 根据输入规模选择
+"""
+
+from typing import Optional
+
+
+# fastest: 不做任何处理，保存最快
+# balanced: 压缩交叉引用表、压缩数据流并使用对象流，耗时与对象数成线性关系；
+#           不做重复对象合并（garbage>=3），该步骤在对象很多的输出上耗时远超其余步骤
+# smallest: 最大程度的垃圾回收与压缩；clean 会先规整内容流，反而让重复对象合并更快
+COMPRESSION_TIERS = {
+    'fastest': {
+        'garbage': 0,
+        'deflate': False,
+    },
+    'balanced': {
+        'garbage': 2,
+        'deflate': True,
+        'use_objstms': 1,
+    },
+    'smallest': {
+        'garbage': 4,
+        'deflate': True,
+        'deflate_images': True,
+        'deflate_fonts': True,
+        'clean': True,
+        'use_objstms': 1,
+    },
+}
+
+COMPRESSION_CHOICES = tuple(COMPRESSION_TIERS) + ('auto',)
+
+# auto 等级的阈值：规模不超过阈值时用 smallest，否则用 balanced
+AUTO_SMALLEST_MAX_BYTES = 64 * 1024 * 1024
+AUTO_SMALLEST_MAX_PAGES = 1000
+
+# 增量保存（流式合并）只能压缩新写入的数据流
+_INCREMENTAL_KEYS = ('deflate', 'deflate_images', 'deflate_fonts')
+
+
+def resolve_tier(tier: str, total_bytes: int = 0, total_pages: int = 0) -> str:
+    """
+    确定实际使用的压缩等级
+
+    Args:
+        tier: 等级名称或 'auto'
+        total_bytes: 输入总大小（字节）
+        total_pages: 输入总页数
+
+    Returns:
+        str: fastest/balanced/smallest
+    """
+    if tier == 'auto':
+        if total_bytes <= AUTO_SMALLEST_MAX_BYTES and total_pages <= AUTO_SMALLEST_MAX_PAGES:
+            return 'smallest'
+        return 'balanced'
+    if tier not in COMPRESSION_TIERS:
+        raise ValueError(f"未知的压缩等级: {tier}")
+    return tier
+
+
+def tier_options(tier: str, incremental: bool = False) -> dict:
+    """
+    获取等级对应的保存选项
+
+    Args:
+        tier: fastest/balanced/smallest
+        incremental: 是否用于增量保存（只保留数据流压缩选项）
+
+    Returns:
+        dict: 传给 fitz.Document.save 的参数
+    """
+    options = dict(COMPRESSION_TIERS[tier])
+    if incremental:
+        options = {k: v for k, v in options.items() if k in _INCREMENTAL_KEYS}
+    return options
+
+
+def tier_for_compress(compress: Optional[bool]) -> str:
+    """旧的 compress 开关对应的等级"""
+    return 'smallest' if compress else 'fastest'
@@ -0,0 +1,214 @@
+"""
+跨文件资源去重
+插入每个文件后，为新加入的字体和图片（连同其引用的对象，如字体程序、ICC色彩配置）
+计算内容哈希；与已有资源相同的对象被重定向到同一个 xref，无需保存时的 garbage=4 全量比较
+"""
+
+import re
+import hashlib
+from typing import Dict, List
+
+import fitz  # PyMuPDF
+
+
+_REF = re.compile(r'(\d+) 0 R\b')
+# 不进入页面树
+_PAGE = re.compile(r'/Type/Pages?\b')
+
+
+class ResourceDeduplicator:
+    """输出文档的资源内容索引，在每次 insert_pdf 之后调用 process"""
+
+    def __init__(self, doc: fitz.Document):
+        """
+        初始化索引
+
+        Args:
+            doc: 输出文档（流式合并重新打开输出文件后，需更新 self.doc）
+        """
+        self.doc = doc
+        self._index = {}  # 内容摘要 -> xref
+        self.resources = 0
+        self.duplicates = 0
+        self.bytes_saved = 0
+
+    def process(self, first_xref: int, first_page: int) -> int:
+        """
+        对本次插入的页面所用的新字体和图片去重
+
+        Args:
+            first_xref: 本次插入前的 xref_length
+            first_page: 本次插入的第一页的页码
+
+        Returns:
+            int: 本次去重节省的字节数（数据流原始长度）
+        """
+        doc = self.doc
+        end = doc.xref_length()
+        resolved = {}
+        rewrites = {}
+        dups = {}
+        saved = 0
+
+        def canonical(xref, visiting):
+            # 已有对象（此前插入的）本身就是规范对象
+            if xref < first_xref or xref >= end:
+                return xref
+            if xref in resolved:
+                return resolved[xref]
+            if xref in visiting:
+                return xref
+            text = doc.xref_object(xref, compressed=True)
+            if _PAGE.search(text):
+                resolved[xref] = xref
+                return xref
+            visiting.add(xref)
+            new_text = _REF.sub(lambda m: f"{canonical(int(m.group(1)), visiting)} 0 R", text)
+            visiting.discard(xref)
+
+            digest = hashlib.sha256(new_text.encode('utf-8', 'surrogatepass'))
+            raw = doc.xref_stream_raw(xref) if doc.xref_is_stream(xref) else None
+            if raw is not None:
+                digest.update(b'\0stream\0')
+                digest.update(raw)
+            key = digest.hexdigest()
+            existing = self._index.get(key)
+            if existing is None or existing == xref:
+                self._index[key] = xref
+                self.resources += 1
+                resolved[xref] = xref
+                if new_text != text:
+                    rewrites[xref] = new_text
+            else:
+                dups[xref] = existing
+                resolved[xref] = existing
+                nonlocal saved
+                saved += len(raw) if raw is not None else len(text)
+            return resolved[xref]
+
+        holders = set()
+        owners = set()
+        for pno in range(first_page, doc.page_count):
+            for holder, text in _resource_holders(doc, doc.page_xref(pno), owners):
+                holders.add(holder)
+                for ref in _REF.findall(text):
+                    canonical(int(ref), set())
+        if not dups:
+            return 0
+
+        # 把对重复对象的引用改为规范对象，再释放重复对象。除页面资源外，注释外观、图案、
+        # 嵌套表单的资源和文档级的表单默认资源也可能引用它们，因此改写本次插入的全部对象
+        remap = lambda m: f"{dups.get(int(m.group(1)), int(m.group(1)))} 0 R"
+        targets = holders | set(range(first_xref, end)) | _document_holders(doc)
+        for xref in sorted(targets):
+            if xref not in rewrites and xref not in dups:
+                text = doc.xref_object(xref, compressed=True)
+                new_text = _REF.sub(remap, text)
+                if new_text != text:
+                    rewrites[xref] = new_text
+        for xref, text in rewrites.items():
+            _rewrite(doc, xref, text, dups)
+        for xref in dups:
+            # 对数据流对象调用 update_object 会同时丢弃其数据流
+            doc.update_object(xref, "null")
+
+        self.duplicates += len(dups)
+        self.bytes_saved += saved
+        return saved
+
+    def get_stats(self) -> dict:
+        """
+        获取去重统计
+
+        Returns:
+            dict: {resources, duplicates, bytes_saved}
+        """
+        return {
+            'resources': self.resources,
+            'duplicates': self.duplicates,
+            'bytes_saved': self.bytes_saved,
+        }
+
+
+def _rewrite(doc: fitz.Document, xref: int, new_text: str, dups: Dict[int, int]):
+    """写回改写后的对象；数据流对象只逐个改写字典中的键，保留数据流"""
+    if not doc.xref_is_stream(xref):
+        doc.update_object(xref, new_text)
+        return
+    for key in doc.xref_get_keys(xref):
+        kind, value = doc.xref_get_key(xref, key)
+        if kind == 'xref':
+            target = int(value.split()[0])
+            if target in dups:
+                doc.xref_set_key(xref, key, f"{dups[target]} 0 R")
+        elif kind in ('array', 'dict') and _REF.search(value):
+            new_value = _REF.sub(lambda m: f"{dups.get(int(m.group(1)), int(m.group(1)))} 0 R", value)
+            if new_value != value:
+                doc.xref_set_key(xref, key, new_value)
+
+
+def _resource_holders(doc: fitz.Document, page_xref: int, owners: set) -> list:
+    """
+    页面资源中 /Font 和 /XObject 字典所在的对象
+
+    Args:
+        doc: 输出文档
+        page_xref: 页面对象
+        owners: 已检查过的资源字典对象，多个页面共用同一资源字典时只检查一次
+
+    Returns:
+        list: [(对象 xref, 字典文本)]
+    """
+    kind, value = doc.xref_get_key(page_xref, "Resources")
+    if kind == 'xref':
+        owner, prefix = int(value.split()[0]), ""
+        if owner in owners:
+            return []
+        owners.add(owner)
+    elif kind == 'dict':
+        owner, prefix = page_xref, "Resources/"
+    else:
+        return []
+    holders = []
+    for name in ("Font", "XObject"):
+        kind, value = doc.xref_get_key(owner, prefix + name)
+        if kind == 'xref':
+            sub = int(value.split()[0])
+            holders.append((sub, doc.xref_object(sub, compressed=True)))
+        elif kind == 'dict':
+            holders.append((owner, value))
+    return holders
+
+
+def _document_holders(doc: fitz.Document) -> set:
+    """文档目录及表单默认资源（/AcroForm /DR /Font）所在的对象"""
+    owner, prefix = doc.pdf_catalog(), ""
+    holders = {owner}
+    for name in ("AcroForm", "DR", "Font"):
+        kind, value = doc.xref_get_key(owner, prefix + name)
+        if kind == 'xref':
+            owner, prefix = int(value.split()[0]), ""
+            holders.add(owner)
+        elif kind == 'dict':
+            prefix += name + "/"
+        else:
+            break
+    return holders
+
+
+def merge_stats(final: dict, partials: List[dict]) -> dict:
+    """
+    汇总分片合并的去重统计
+
+    Args:
+        final: 最终合并（跨分片去重）的统计
+        partials: 各分片内部去重的统计
+
+    Returns:
+        dict: {resources, duplicates, bytes_saved}
+    """
+    total = dict(final)
+    for stats in partials:
+        total['duplicates'] += stats['duplicates']
+        total['bytes_saved'] += stats['bytes_saved']
+    return total
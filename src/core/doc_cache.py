@@ -0,0 +1,126 @@
+"""
+PDF文档句柄缓存
+验证阶段打开的文档保留到合并阶段复用，避免同一文件被解析两次
+"""
+
+from collections import OrderedDict
+from typing import Optional
+
+import fitz  # PyMuPDF
+
+
+class DocumentCache:
+    """按LRU策略淘汰的文档句柄缓存，受打开句柄数与内存预算双重限制"""
+
+    def __init__(self, max_handles: int = 64, max_bytes: int = 256 * 1024 * 1024):
+        """
+        初始化缓存
+
+        Args:
+            max_handles: 最多同时保留的文档句柄数（文件描述符预算），0 表示禁用缓存
+            max_bytes: 缓存文档的总大小上限（按文件大小估算的内存预算）
+        """
+        self.max_handles = max_handles
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # path -> (doc, size)
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """缓存是否启用"""
+        return self.max_handles > 0 and self.max_bytes > 0
+
+    def put(self, path: str, doc: fitz.Document, size: int) -> bool:
+        """
+        放入一个已打开的文档
+
+        Args:
+            path: 文件路径（缓存键）
+            doc: 已打开的文档
+            size: 文件大小（字节）
+
+        Returns:
+            bool: 是否被缓存；未缓存时文档会被立即关闭
+        """
+        if not self.enabled or size > self.max_bytes:
+            doc.close()
+            return False
+
+        self._discard(path)
+        self._entries[path] = (doc, size)
+        self._bytes += size
+
+        # 超出任一预算时淘汰最久未使用的文档
+        while len(self._entries) > self.max_handles or self._bytes > self.max_bytes:
+            _, (old_doc, old_size) = self._entries.popitem(last=False)
+            self._bytes -= old_size
+            old_doc.close()
+            self.evictions += 1
+        return True
+
+    def take(self, path: str) -> Optional[fitz.Document]:
+        """
+        取出缓存的文档（取出后由调用方负责关闭）
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            Optional[fitz.Document]: 命中时返回文档，否则返回 None
+        """
+        entry = self._entries.pop(path, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        doc, size = entry
+        self._bytes -= size
+        self.hits += 1
+        return doc
+
+    def open(self, path: str) -> fitz.Document:
+        """取出缓存的文档，未命中时重新打开"""
+        doc = self.take(path)
+        if doc is None:
+            doc = fitz.open(path)
+        return doc
+
+    def clear(self):
+        """关闭并清空所有缓存的文档"""
+        for doc, _ in self._entries.values():
+            doc.close()
+        self._entries.clear()
+        self._bytes = 0
+
+    def discard(self, path: str):
+        """关闭并移除指定文件的缓存文档（不计入命中统计）"""
+        self._discard(path)
+
+    def _discard(self, path: str):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            entry[0].close()
+            self._bytes -= entry[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._entries
+
+    def get_stats(self) -> dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: {hits, misses, evictions, cached, cached_bytes}
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'cached': len(self._entries),
+            'cached_bytes': self._bytes,
+        }
@@ -0,0 +1,223 @@
+"""
+故障隔离
+每个输入文件在独立的工作进程中解析并复制选中的页面，受超时和内存上限约束；
+卡死、崩溃或超出内存的文件被跳过并记录原因，合并继续进行
+"""
+
+import os
+import time
+import multiprocessing
+from multiprocessing.connection import wait
+from typing import Iterator, List, NamedTuple, Optional
+
+import fitz  # PyMuPDF
+
+from .page_ranges import insert_pages
+from .cancel import CancelToken, ignore_interrupts
+
+
+# 跳过原因
+SKIP_ERROR = 'error'      # 解析或插入时抛出异常
+SKIP_TIMEOUT = 'timeout'  # 超过单文件时限
+SKIP_MEMORY = 'memory'    # 超过单文件内存上限
+SKIP_CRASH = 'crash'      # 工作进程异常退出
+
+# 等待工作进程时检查取消令牌的间隔（秒）
+CANCEL_POLL = 0.1
+
+
+class IsolationLimits(NamedTuple):
+    """隔离模式的限制"""
+    timeout: float = 60.0              # 单个文件的处理时限（秒）
+    max_memory: Optional[int] = None   # 单个工作进程可额外使用的内存（字节），仅 POSIX 系统生效
+    workers: Optional[int] = None      # 同时运行的工作进程数（默认CPU核数）
+
+
+def skip_report(path: str, reason: str, error: str) -> dict:
+    """
+    跳过文件的记录
+
+    Returns:
+        dict: {path, reason: error/timeout/memory/crash, error: 说明}
+    """
+    return {'path': path, 'reason': reason, 'error': error}
+
+
+def worker_context():
+    """
+    工作进程使用的 multiprocessing 上下文
+
+    调用方可能在多线程中（GUI 会话、AsyncMerger、预读线程），fork 会把其他线程
+    持有的锁（包括 MuPDF 的锁）复制到子进程中；forkserver 的子进程从一个干净的
+    服务进程派生，不会继承这些锁，不支持时使用 spawn
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload(['fitz'])
+        return ctx
+    return multiprocessing.get_context('spawn')
+
+
+def _limit_memory(extra: int):
+    """把本进程的地址空间限制为当前大小加上 extra"""
+    try:
+        import resource
+    except ImportError:
+        return  # Windows 不支持
+    current = 0
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmSize:'):
+                    current = int(line.split()[1]) * 1024
+                    break
+    except OSError:
+        pass
+    limit = current + extra
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _is_out_of_memory(error: BaseException) -> bool:
+    if isinstance(error, MemoryError):
+        return True
+    message = str(error).lower()
+    return 'malloc' in message or 'out of memory' in message
+
+
+def _isolated_copy(path: str, runs, insert_options: dict, out_path: str, max_memory: Optional[int], conn):
+    """工作进程：打开输入文件，把选中的页面复制到 out_path"""
+    try:
+        # Ctrl-C 由主进程处理，主进程退出迭代时终止工作进程
+        ignore_interrupts()
+        if max_memory:
+            _limit_memory(max_memory)
+        doc = fitz.open(path)
+        out = fitz.open()
+        pages = insert_pages(out, doc, runs, **insert_options)
+        doc.close()
+        out.save(out_path)
+        out.close()
+        conn.send((None, pages, None))
+    except BaseException as e:
+        reason = SKIP_MEMORY if _is_out_of_memory(e) else SKIP_ERROR
+        try:
+            conn.send((reason, 0, str(e) or type(e).__name__))
+        except BaseException:
+            pass
+    finally:
+        conn.close()
+
+
+class IsolatedLoader:
+    """在工作进程中预处理输入文件，按原顺序交付结果"""
+
+    def __init__(self,
+                 file_list: List[dict],
+                 tmp_dir: str,
+                 limits: IsolationLimits,
+                 insert_options: Optional[dict] = None,
+                 cancel: Optional[CancelToken] = None):
+        """
+        初始化
+
+        Args:
+            file_list: 待处理的文件信息（有序）
+            tmp_dir: 存放预处理结果的临时目录
+            limits: 时限、内存上限和并发数
+            insert_options: 传给 insert_pdf 的选项
+            cancel: 取消令牌；取消后终止运行中的工作进程并抛出 MergeCancelled
+        """
+        self.file_list = file_list
+        self.tmp_dir = tmp_dir
+        self.limits = limits
+        self.insert_options = dict(insert_options or {})
+        self.workers = max(1, limits.workers or os.cpu_count() or 1)
+        self.cancel = cancel
+        self._ctx = worker_context()
+
+    def results(self) -> Iterator[tuple]:
+        """
+        按顺序产出每个文件的处理结果；提前结束迭代时终止仍在运行的工作进程
+
+        Yields:
+            tuple: (文件信息, 预处理结果路径或None, 跳过记录或None)
+        """
+        running = {}   # 下标 -> (进程, 连接, 截止时间)
+        done = {}      # 下标 -> (结果路径, 跳过记录)
+        next_start = 0
+        next_yield = 0
+        total = len(self.file_list)
+        try:
+            while next_yield < total:
+                if self.cancel:
+                    self.cancel.check()
+                # 已完成但未交付的结果也占用临时空间，超前量限制为工作进程数
+                while (len(running) < self.workers and next_start < total
+                       and next_start - next_yield < self.workers * 2):
+                    running[next_start] = self._start(next_start)
+                    next_start += 1
+
+                if next_yield in done:
+                    out_path, report = done.pop(next_yield)
+                    yield self.file_list[next_yield], out_path, report
+                    next_yield += 1
+                    continue
+
+                now = time.monotonic()
+                timeout = max(0.0, min(deadline for _, _, deadline in running.values()) - now)
+                if self.cancel:
+                    timeout = min(timeout, CANCEL_POLL)
+                ready = wait([conn for _, conn, _ in running.values()], timeout)
+                now = time.monotonic()
+                for idx, (proc, conn, deadline) in list(running.items()):
+                    if conn in ready:
+                        done[idx] = self._finish(idx, proc, conn)
+                    elif now >= deadline:
+                        self._kill(proc, conn)
+                        done[idx] = (None, skip_report(
+                            self.file_list[idx]['path'], SKIP_TIMEOUT,
+                            f"处理超时（超过 {self.limits.timeout:g} 秒）"
+                        ))
+                    else:
+                        continue
+                    del running[idx]
+        finally:
+            for proc, conn, _ in running.values():
+                self._kill(proc, conn)
+
+    def _start(self, idx: int) -> tuple:
+        file_info = self.file_list[idx]
+        out_path = os.path.join(self.tmp_dir, f"isolated-{idx}.pdf")
+        parent_conn, child_conn = self._ctx.Pipe(duplex=False)
+        proc = self._ctx.Process(
+            target=_isolated_copy,
+            args=(file_info['path'], file_info.get('page_runs'), self.insert_options,
+                  out_path, self.limits.max_memory, child_conn),
+            daemon=True
+        )
+        proc.start()
+        # 关闭本进程持有的写端，工作进程退出时读端才会收到 EOF
+        child_conn.close()
+        return proc, parent_conn, time.monotonic() + self.limits.timeout
+
+    def _finish(self, idx: int, proc, conn) -> tuple:
+        path = self.file_list[idx]['path']
+        try:
+            reason, _, error = conn.recv()
+        except (EOFError, OSError):
+            reason, error = SKIP_CRASH, None
+        conn.close()
+        proc.join()
+        if reason == SKIP_CRASH:
+            code = proc.exitcode
+            error = f"工作进程异常退出（信号 {-code}）" if code and code < 0 else f"工作进程异常退出（退出码 {code}）"
+            return None, skip_report(path, SKIP_CRASH, error)
+        if reason:
+            return None, skip_report(path, reason, error)
+        return os.path.join(self.tmp_dir, f"isolated-{idx}.pdf"), None
+
+    @staticmethod
+    def _kill(proc, conn):
+        proc.kill()
+        proc.join()
+        conn.close()
@@ -3,86 +3,500 @@ PDF合并核心引擎
 使用PyMuPDF (fitz)实现高性能PDF合并
 """
 
+import io
 import os
+import shutil
+import tempfile
 import fitz  # PyMuPDF
 from pathlib import Path
-from typing import List, Callable, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Callable, Optional, Sized, Tuple, Union
+
+from .doc_cache import DocumentCache
+from .meta_cache import MetadataCache
+from .result_cache import ResultCache
+from .parallel import plan_workers, sharded_merge, combine_shards
+from .profiler import MergeProfiler
+from .validation import VALIDATION_LEVELS, quick_inspect, deep_check
+from .page_ranges import parse_page_spec, count_pages, insert_pages
+from .compression import resolve_tier, tier_options, tier_for_compress
+from .dedup import ResourceDeduplicator, merge_stats
+from .prefetch import DEFAULT_PREFETCH_BYTES, Prefetcher
+from .isolation import IsolationLimits, IsolatedLoader, skip_report, SKIP_ERROR
+from .checkpoint import MergeJournal
+from .progress import ProgressBus, MergeProgress, STATUS
+from .cancel import CancelToken, MergeCancelled, ignore_interrupts
+from .streams import is_stream, stream_data, open_stream, is_output_stream, save_pdf
+
+
+def inspect_pdf(pdf_path: str, level: str = 'standard') -> dict:
+    """
+    检查单个PDF文件（不修改任何合并器状态，可在线程/进程池中调用）
+    
+    Args:
+        pdf_path: PDF文件路径
+        level: 验证级别，见 _open_pdf
+        
+    Returns:
+        dict: 文件信息 {path, pages, size, valid, error}
+    """
+    return _open_pdf(pdf_path, keep_open=False, level=level)[0]
+
+
+def _open_pdf(pdf_path: str, keep_open: bool = False, level: str = 'standard') -> tuple:
+    """
+    打开并检查PDF文件
+    
+    Args:
+        pdf_path: PDF文件路径
+        keep_open: 是否保留打开的文档供后续合并复用
+        level: 验证级别，'quick'(只检查文件头和尾部结构，不打开文档；
+               页数无法低成本读取时记为0，合并时再更正)、
+               'standard'(完整打开) 或 'deep'(额外加载每一页)
+        
+    Returns:
+        tuple: (文件信息, 文档对象或None)
+    """
+    file_info = {
+        'path': pdf_path,
+        'pages': 0,
+        'size': 0,
+        'valid': False,
+        'error': None
+    }
+    
+    # 检查文件是否存在
+    if not os.path.exists(pdf_path):
+        file_info['error'] = f"文件不存在: {pdf_path}"
+        return file_info, None
+        
+    # 获取文件大小
+    try:
+        file_info['size'] = os.path.getsize(pdf_path)
+    except Exception as e:
+        file_info['error'] = f"无法读取文件大小: {e}"
+        return file_info, None
+    
+    if level == 'quick':
+        try:
+            pages, error = quick_inspect(pdf_path)
+        except OSError as e:
+            pages, error = None, str(e)
+        if error:
+            file_info['error'] = f"无效的PDF文件: {error}"
+        else:
+            file_info['pages'] = pages or 0
+            file_info['valid'] = True
+        return file_info, None
+    
+    # 验证PDF文件
+    try:
+        doc = fitz.open(pdf_path)
+        file_info['pages'] = len(doc)
+        if level == 'deep':
+            error = deep_check(doc)
+            if error:
+                doc.close()
+                file_info['error'] = f"无效的PDF文件: {error}"
+                return file_info, None
+        if not keep_open:
+            doc.close()
+            doc = None
+        file_info['valid'] = True
+    except Exception as e:
+        file_info['error'] = f"无效的PDF文件: {e}"
+        doc = None
+        
+    return file_info, doc
+
+
+def _open_stream(data, name: str, keep_open: bool = False, level: str = 'standard') -> tuple:
+    """
+    打开并检查内存中的PDF数据
+    
+    内存中的数据打开代价很低，'quick' 与 'standard' 相同；有效时数据保存在
+    文件信息的 data 中，合并时直接从内存重新打开
+    
+    Args:
+        data: bytes 或 memoryview
+        name: 在文件信息和提示中代替路径的名称
+        keep_open: 是否保留打开的文档供后续合并复用
+        level: 验证级别，'deep' 时额外加载每一页
+        
+    Returns:
+        tuple: (文件信息, 文档对象或None)
+    """
+    file_info = {'path': name, 'pages': 0, 'size': len(data), 'valid': False, 'error': None}
+    try:
+        doc = open_stream(data)
+        file_info['pages'] = len(doc)
+        error = deep_check(doc) if level == 'deep' else None
+        if error:
+            doc.close()
+            file_info['error'] = f"无效的PDF文件: {error}"
+            return file_info, None
+    except Exception as e:
+        file_info['error'] = f"无效的PDF文件: {e}"
+        return file_info, None
+    if not keep_open:
+        doc.close()
+        doc = None
+    file_info['valid'] = True
+    file_info['data'] = data
+    return file_info, doc
+
+
+# 合并配置：插入页面时是否复制链接、注释和表单控件
+# full 与原先一致；lean 不处理链接和注释；pages-only 只复制页面内容
+MERGE_PROFILES = {
+    'full': {},
+    'lean': {'links': False, 'annots': False},
+    'pages-only': {'links': False, 'annots': False, 'widgets': False},
+}
+
+
+# merge_iter 每写入一次输出文件之间累计的输入大小
+STREAM_BATCH_BYTES = 64 * 1024 * 1024
+
+
+def _split_item(item) -> tuple:
+    """add_files 的输入元素: 路径（或内存中的数据）或 (路径, 页码规格)"""
+    if isinstance(item, tuple):
+        return item
+    return item, None
+
+
+def _open_input(item, index: int, level: str = 'standard') -> tuple:
+    """
+    打开 merge_iter 的一个输入并验证
+    
+    Args:
+        item: 路径、内存中的PDF数据（bytes/memoryview/文件对象），或二者之一与页码规格组成的元组
+        index: 输入序号（内存中的数据以 <stream N> 作为名称）
+        level: 'standard' 或 'deep'
+        
+    Returns:
+        tuple: (文件信息, 文档对象或None)
+    """
+    source, page_spec = _split_item(item)
+    if is_stream(source):
+        file_info, doc = _open_stream(stream_data(source), f"<stream {index}>", True, level)
+    else:
+        file_info, doc = _open_pdf(os.fspath(source), keep_open=True, level=level)
+    if file_info['valid'] and page_spec:
+        file_info = _select_pages(file_info, doc, page_spec)
+        if not file_info['valid']:
+            doc.close()
+            doc = None
+    return file_info, doc
+
+
+def _select_pages(file_info: dict, doc: Optional[fitz.Document], page_spec: str) -> dict:
+    """
+    按页码规格选择页面
+    
+    Args:
+        file_info: 验证得到的文件信息（可能来自元数据缓存，不会被修改）
+        doc: 已打开的文档（如有）
+        page_spec: 页码规格
+        
+    Returns:
+        dict: 新的文件信息，pages 为选中的页数
+    """
+    file_info = dict(file_info)
+    doc_pages = file_info['pages']
+    try:
+        if doc is not None:
+            doc_pages = len(doc)
+        elif not doc_pages:
+            # 快速验证未取得页数时需要打开文件
+            with fitz.open(file_info['path']) as opened:
+                doc_pages = len(opened)
+        runs = parse_page_spec(page_spec, doc_pages)
+    except Exception as e:
+        file_info['valid'] = False
+        file_info['error'] = f"无效的页码选择: {e}"
+        return file_info
+    file_info['doc_pages'] = doc_pages
+    file_info['page_spec'] = page_spec
+    file_info['page_runs'] = runs
+    file_info['pages'] = count_pages(runs)
+    return file_info
 
 
 class PdfMerger:
     """PDF合并器类"""
     
-    def __init__(self):
-        """初始化PDF合并器"""
+    def __init__(self,
+                 max_open_docs: int = 64,
+                 max_cache_bytes: int = 256 * 1024 * 1024,
+                 meta_cache: Optional[MetadataCache] = None,
+                 result_cache: Optional[ResultCache] = None,
+                 profile: bool = False,
+                 prefetch_bytes: int = DEFAULT_PREFETCH_BYTES):
+        """
+        初始化PDF合并器
+        
+        Args:
+            max_open_docs: 验证后保留到合并阶段的文档句柄上限（0 表示不缓存）
+            max_cache_bytes: 保留文档的总大小上限（字节）
+            meta_cache: 持久化的元数据缓存，命中时跳过打开文件
+            result_cache: 合并结果缓存，相同输入和选项再次合并时直接复用结果
+            profile: 是否记录各文件、各阶段的耗时（见 self.profiler）
+            prefetch_bytes: 合并时后台预读后续文件的字节预算（0 表示不预读），
+                            读取与插入重叠，适合网络存储上的输入
+        """
         self.file_list = []
         self.total_pages = 0
+        self.doc_cache = DocumentCache(max_open_docs, max_cache_bytes)
+        self.meta_cache = meta_cache
+        self.result_cache = result_cache
+        self.profiler = MergeProfiler(enabled=profile)
+        self.dedup_stats = None
+        self.skipped_files = []
+        self.prefetch_bytes = prefetch_bytes
+        self._cancel = None  # 当前合并的取消令牌
+        self._stream_count = 0  # 已添加的内存输入数，用于命名
         
-    def add_file(self, pdf_path: str) -> dict:
+    def add_file(self, pdf_path, level: str = 'standard', pages: Optional[str] = None) -> dict:
         """
         添加PDF文件到合并列表
         
         Args:
-            pdf_path: PDF文件路径
+            pdf_path: PDF文件路径，或内存中的PDF数据（bytes、memoryview、可读的文件对象）
+            level: 验证级别 quick/standard/deep
+            pages: 页码规格，如 "1-5,9,20-" 或 "odd"（默认全部页面）
             
         Returns:
-            dict: 文件信息 {path, pages, size, valid, error}
-        """
-        file_info = {
-            'path': pdf_path,
-            'pages': 0,
-            'size': 0,
-            'valid': False,
-            'error': None
-        }
-        
-        # 检查文件是否存在
-        if not os.path.exists(pdf_path):
-            file_info['error'] = f"文件不存在: {pdf_path}"
-            return file_info
-            
-        # 获取文件大小
-        try:
-            file_info['size'] = os.path.getsize(pdf_path)
-        except Exception as e:
-            file_info['error'] = f"无法读取文件大小: {e}"
-            return file_info
+            dict: 文件信息 {path, pages, size, valid, error}；
+                  选择了页面时 pages 为选中的页数，另有 doc_pages、page_spec、page_runs
+        """
+        return self.add_files([(pdf_path, pages) if pages else pdf_path], level=level)[0]
+    
+    def add_files(self,
+                  pdf_paths: Iterable[Union[str, Tuple[str, Optional[str]]]],
+                  jobs: int = 1,
+                  executor: str = 'thread',
+                  level: str = 'standard',
+                  cancel: Optional[CancelToken] = None) -> List[dict]:
+        """
+        批量添加PDF文件
         
-        # 验证PDF文件
-        try:
-            doc = fitz.open(pdf_path)
-            file_info['pages'] = len(doc)
-            doc.close()
-            file_info['valid'] = True
+        pdf_paths 可以是任意可迭代对象（如目录扫描器），路径一产出就开始验证，
+        扫描与验证同时进行。
+        
+        Args:
+            pdf_paths: PDF文件路径列表或可迭代对象；元素也可以是 (路径, 页码规格)，
+                       路径也可以换成内存中的PDF数据（bytes、memoryview、可读的文件对象），
+                       以 <stream N> 命名，直接从内存打开，不写临时文件
+            jobs: 并发验证的工作线程/进程数（1 表示串行）
+            executor: 并发方式，'thread'(适合网络存储等I/O密集场景)
+                      或 'process'(适合解析开销大的文件)
+            level: 验证级别，'quick'(只检查文件结构，适合可信输入)、
+                   'standard'(完整打开，默认) 或 'deep'(额外加载每一页以提前发现损坏)
+            cancel: 取消令牌，在文件之间检查；取消时已验证的文件保留在合并列表中
+            
+        Returns:
+            List[dict]: 所有文件的信息列表（与输入顺序一致）
             
-            # 添加到列表
+        Raises:
+            MergeCancelled: 验证被取消
+        """
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"未知的并发方式: {executor}")
+        if level not in VALIDATION_LEVELS:
+            raise ValueError(f"未知的验证级别: {level}")
+        
+        keep_open = self.doc_cache.enabled and level != 'quick'
+        # 缓存中是完整打开得到的结果：quick 可以直接使用但不写回，deep 需要重新检查
+        use_cache = self.meta_cache is not None and level != 'deep'
+        store_cache = self.meta_cache is not None and level != 'quick'
+        
+        def lookup(path):
+            if use_cache:
+                return self.meta_cache.lookup(path)
+            return None, MetadataCache.file_key(path) if store_cache else None
+        
+        def store(key, info):
+            if store_cache:
+                self.meta_cache.store(key, info)
+        results = []
+        
+        try:
+            if jobs <= 1:
+                for item in pdf_paths:
+                    if cancel:
+                        cancel.check()
+                    path, page_spec = _split_item(item)
+                    doc = None
+                    if is_stream(path):
+                        info, doc = self._open_stream_input(path, keep_open, level)
+                    else:
+                        info, key = lookup(path)
+                        if info is None:
+                            with self.profiler.span('validate', path) as counters:
+                                info, doc = _open_pdf(path, keep_open, level)
+                                counters['pages'] = info['pages']
+                            store(key, info)
+                    results.append(self._record(info, doc, page_spec))
+            else:
+                pool_cls = ThreadPoolExecutor if executor == 'thread' else ProcessPoolExecutor
+                # 线程池可以直接把打开的文档交回给缓存，进程池只能返回文件信息
+                share_docs = executor == 'thread' and keep_open
+                # 限制已提交但未登记的任务数，输入源很大时内存不随之增长
+                window = jobs * 4
+                pending = deque()
+                
+                def drain(limit):
+                    while len(pending) > limit:
+                        if cancel:
+                            cancel.check()
+                        info, doc, key, future, page_spec = pending.popleft()
+                        if future is not None:
+                            if share_docs:
+                                info, doc = future.result()
+                            else:
+                                info = future.result()
+                            store(key, info)
+                        results.append(self._record(info, doc, page_spec))
+                
+                # 有取消令牌时验证进程不响应 Ctrl-C，由本进程丢弃尚未开始的任务
+                pool_options = {'initializer': ignore_interrupts} if cancel and executor == 'process' else {}
+                with self.profiler.span(f'validate-{executor}-pool'), \
+                        pool_cls(max_workers=jobs, **pool_options) as pool:
+                    try:
+                        for item in pdf_paths:
+                            if cancel:
+                                cancel.check()
+                            path, page_spec = _split_item(item)
+                            future = doc = key = None
+                            if is_stream(path):
+                                # 内存中的数据在本线程打开，不传给工作进程
+                                info, doc = self._open_stream_input(path, keep_open, level)
+                            else:
+                                info, key = lookup(path)
+                            if info is None:
+                                if share_docs:
+                                    future = pool.submit(_open_pdf, path, True, level)
+                                else:
+                                    future = pool.submit(inspect_pdf, path, level)
+                            pending.append((info, doc, key, future, page_spec))
+                            # 按输入顺序登记，保证 file_list 顺序与 total_pages 统计不变
+                            drain(window)
+                        drain(0)
+                    except MergeCancelled:
+                        # 丢弃尚未开始的验证，只等待正在进行的（退出 with 时）
+                        for _, _, _, future, _ in pending:
+                            if future is not None:
+                                future.cancel()
+                        raise
+        finally:
+            # 取消时已验证的结果同样写入缓存
+            if self.meta_cache is not None:
+                self.meta_cache.flush()
+        return results
+    
+    def _open_stream_input(self, item, keep_open: bool, level: str) -> tuple:
+        """验证一个内存中的输入（不使用元数据缓存），返回 (文件信息, 文档对象或None)"""
+        self._stream_count += 1
+        name = f"<stream {self._stream_count}>"
+        with self.profiler.span('validate', name) as counters:
+            info, doc = _open_stream(stream_data(item), name, keep_open, level)
+            counters['pages'] = info['pages']
+        return info, doc
+    
+    def _record(self,
+                file_info: dict,
+                doc: Optional[fitz.Document] = None,
+                page_spec: Optional[str] = None) -> dict:
+        """将验证结果登记到合并列表，并缓存已打开的文档"""
+        if file_info['valid'] and page_spec:
+            file_info = _select_pages(file_info, doc, page_spec)
+            if not file_info['valid'] and doc is not None:
+                doc.close()
+                doc = None
+        if file_info['valid']:
             self.file_list.append(file_info)
             self.total_pages += file_info['pages']
-            
-        except Exception as e:
-            file_info['error'] = f"无效的PDF文件: {e}"
-            
+            if doc is not None:
+                self.doc_cache.put(file_info['path'], doc, file_info['size'])
         return file_info
     
-    def add_files(self, pdf_paths: List[str]) -> List[dict]:
+    def set_order(self, pdf_paths: Iterable[str]) -> List[str]:
         """
-        批量添加PDF文件
+        按给定顺序重排已登记的文件，不在其中的文件从合并列表中移除
+        
+        已验证的文件无需重新验证，适合在多次合并之间调整列表（如图形界面）。
         
         Args:
-            pdf_paths: PDF文件路径列表
+            pdf_paths: 新的文件顺序
             
         Returns:
-            List[dict]: 所有文件的信息列表
+            List[str]: 尚未登记的路径（未验证或验证失败），需要时可再调用 add_files
         """
-        results = []
+        by_path = {f['path']: f for f in self.file_list}
+        ordered = []
+        missing = []
         for path in pdf_paths:
-            result = self.add_file(path)
-            results.append(result)
-        return results
+            file_info = by_path.pop(path, None)
+            if file_info is None:
+                missing.append(path)
+            else:
+                ordered.append(file_info)
+        for path in by_path:
+            self.doc_cache.discard(path)
+        self.file_list = ordered
+        self.total_pages = sum(f['pages'] for f in ordered)
+        return missing
     
     def clear(self):
         """清空文件列表"""
         self.file_list = []
         self.total_pages = 0
+        self.doc_cache.clear()
+    
+    def get_cache_stats(self) -> dict:
+        """获取文档句柄缓存的命中统计"""
+        return self.doc_cache.get_stats()
+    
+    def get_meta_cache_stats(self) -> Optional[dict]:
+        """获取元数据缓存的命中统计（未启用时返回 None）"""
+        return self.meta_cache.get_stats() if self.meta_cache is not None else None
+    
+    def get_result_cache_stats(self) -> Optional[dict]:
+        """获取合并结果缓存的命中统计（未启用时返回 None）"""
+        return self.result_cache.get_stats() if self.result_cache is not None else None
+    
+    def get_dedup_stats(self) -> Optional[dict]:
+        """
+        获取上一次合并的资源去重统计（未去重或使用了缓存结果时返回 None）
+        
+        Returns:
+            dict: {resources: 保留的字体/图片对象数, duplicates: 重定向的重复对象数,
+                   bytes_saved: 省去的数据流字节数}
+        """
+        return self.dedup_stats
+    
+    def get_skipped_files(self) -> List[dict]:
+        """
+        获取上一次合并中被跳过的文件
+        
+        Returns:
+            List[dict]: [{path, reason, error}]，reason 为 error(解析或插入出错)、
+                        timeout(超时)、memory(超出内存上限) 或 crash(工作进程崩溃)；
+                        后三种只在隔离模式下出现
+        """
+        return list(self.skipped_files)
+    
+    def get_profile(self) -> dict:
+        """
+        获取性能剖析结果（需以 profile=True 创建合并器）
+        
+        Returns:
+            dict: {phases, files, outliers}
+        """
+        return self.profiler.get_summary()
     
     def get_file_count(self) -> int:
         """获取文件数量"""
@@ -95,86 +509,717 @@ class PdfMerger:
     def merge(self, 
               output_path: str, 
               progress_callback: Optional[Callable[[int, int, str], None]] = None,
-              compress: bool = True) -> bool:
+              compress: bool = True,
+              mode: str = 'auto',
+              workers: Optional[int] = None,
+              max_memory: Optional[int] = None,
+              merge_profile: str = 'full',
+              compression: Optional[str] = None,
+              dedupe: Optional[bool] = None,
+              isolation: Optional[IsolationLimits] = None,
+              resume: bool = False,
+              progress: Optional[ProgressBus] = None,
+              cancel: Optional[CancelToken] = None) -> bool:
         """
         合并所有PDF文件
         
         Args:
-            output_path: 输出文件路径
+            output_path: 输出文件路径，或可写的二进制文件对象（如 sys.stdout.buffer；
+                         不能用于流式合并和可恢复模式，auto 方式下不分片，不使用结果缓存）
             progress_callback: 进度回调函数 (current_page, total_pages, current_file)
-            compress: 是否压缩输出文件
+            compress: 是否压缩输出文件（未指定 compression 时，True 对应 'smallest'，
+                      False 对应 'fastest'）
+            mode: 合并方式，'serial'(单进程)、'sharded'(分片并行)
+                  或 'auto'(根据总页数和总大小自动选择)
+            workers: 分片并行时的最大工作进程数（默认CPU核数）
+            max_memory: 内存上限（字节）。设置后使用流式合并：按该上限分段
+                        写入输出文件，常驻内存不随输入数量增长；此模式下
+                        只压缩数据流，不做跨文件的垃圾回收
+            merge_profile: 合并配置，'full'(复制链接、注释和表单)、'lean'(不复制
+                           链接和注释，适合归档) 或 'pages-only'(只复制页面内容)
+            compression: 压缩等级，'fastest'、'balanced'(去重并压缩数据流，不重写内容流)、
+                         'smallest' 或 'auto'(根据输入总大小和总页数选择)
+            dedupe: 是否在插入时按内容哈希合并各文件中相同的字体和图片。
+                    默认在保存时不做重复对象合并（garbage<3 或流式合并）且
+                    压缩等级不是 'fastest' 时启用
+            isolation: 隔离模式的限制。设置后每个文件在独立的工作进程中解析，
+                       超时、超出内存或崩溃的文件被跳过（见 get_skipped_files），
+                       不会拖住整个合并；此模式忽略 mode，且不能与 max_memory 同时使用
+            resume: 可恢复模式。输入按顺序分段合并，每段写入输出文件旁的检查点目录
+                    （<输出>.pdfmerge-resume）并记入日志；中断后以相同输入再次调用时
+                    从最后一个检查点继续，成功后删除检查点目录。此模式忽略 mode，
+                    且不能与 max_memory 或 isolation 同时使用
+            progress: 进度事件总线。合并过程按页面发布带类型的事件（开始处理文件、
+                      完成页面、读取字节、阶段切换），由总线按其间隔合并后分发；
+                      progress_callback 仍按原有的节点调用
+            cancel: 取消令牌，在文件之间和页面块之间检查（分片并行时由工作进程检查）。
+                    取消后删除临时文件和未写完的输出；可恢复模式保留已完成的检查点
+            
+        合并列表中有内存中的输入时，auto 方式下串行合并，不能使用分片并行、
+        隔离模式和可恢复模式（工作进程只能按路径读取输入）
             
         Returns:
             bool: 是否成功
+            
+        Raises:
+            MergeCancelled: 合并被取消
         """
         if not self.file_list:
             raise ValueError("没有可合并的PDF文件")
+        if mode not in ('auto', 'serial', 'sharded'):
+            raise ValueError(f"未知的合并方式: {mode}")
+        if merge_profile not in MERGE_PROFILES:
+            raise ValueError(f"未知的合并配置: {merge_profile}")
+        insert_options = MERGE_PROFILES[merge_profile]
+        if isolation and max_memory:
+            raise ValueError("隔离模式不能与流式合并同时使用")
+        if resume and (isolation or max_memory):
+            raise ValueError("可恢复模式不能与隔离模式或流式合并同时使用")
+        valid_files = [f for f in self.file_list if f['valid']]
+        # 内存中的输入和输出：不经过临时文件，也无法交给工作进程
+        in_memory = any('data' in f for f in valid_files)
+        to_stream = is_output_stream(output_path)
+        if in_memory and (mode == 'sharded' or isolation or resume):
+            raise ValueError("内存中的输入不能用于分片并行、隔离模式或可恢复模式")
+        if to_stream and (max_memory or resume):
+            raise ValueError("流式合并和可恢复模式需要输出到文件")
         
         # 创建输出目录
-        output_dir = os.path.dirname(output_path)
+        output_dir = '' if to_stream else os.path.dirname(output_path)
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
         
+        tier = resolve_tier(
+            compression or tier_for_compress(compress),
+            sum(f['size'] for f in valid_files),
+            self.total_pages
+        )
+        save_options = tier_options(tier)
+        if dedupe is None:
+            dedupe = tier != 'fastest' and (bool(max_memory) or save_options['garbage'] < 3)
+        self.dedup_stats = None
+        self.skipped_files = []
+        self._cancel = cancel
+        reporter = MergeProgress(lambda: self.total_pages, progress_callback, progress)
+        if mode == 'serial' or (mode == 'auto' and (in_memory or to_stream)):
+            parallel_workers = 1
+        elif mode == 'sharded':
+            parallel_workers = max(2, min(workers or os.cpu_count() or 2, len(valid_files)))
+        else:
+            parallel_workers = plan_workers(
+                len(valid_files),
+                self.total_pages,
+                sum(f['size'] for f in valid_files),
+                workers
+            )
+        
+        # 相同输入和选项的结果已缓存时直接复用
+        result_key = None
+        if self.result_cache is not None and not (in_memory or to_stream):
+            result_key = self.result_cache.make_key(
+                [f['path'] for f in valid_files],
+                dict(save_options, streaming=bool(max_memory), merge_profile=merge_profile, dedupe=dedupe,
+                     pages=[f.get('page_runs') for f in valid_files])
+            )
+            with self.profiler.span('result-cache'):
+                restored = self.result_cache.restore(result_key, output_path)
+            if restored is not None:
+                self.doc_cache.clear()
+                # 原合并中跳过的文件同样需要报告
+                for report in restored:
+                    self._skip(report, reporter)
+                reporter.finish("完成!（使用缓存结果）")
+                return True
+            if self.result_cache.use_hardlinks and os.path.exists(output_path):
+                # 旧输出可能与缓存共用同一文件，先断开链接再写入
+                os.remove(output_path)
+        
         try:
-            # 创建新的PDF文档
-            output_doc = fitz.open()
-            processed_pages = 0
+            if max_memory:
+                # 缓存的文档句柄同样占用内存，流式模式下不保留
+                self.doc_cache.clear()
+                self._merge_streaming(
+                    output_path, tier_options(tier, incremental=True), max_memory,
+                    reporter, insert_options, dedupe
+                )
+            elif resume:
+                self._merge_resumable(
+                    output_path, save_options, reporter, insert_options, dedupe
+                )
+            elif isolation:
+                self._merge_isolated(
+                    output_path, save_options, isolation, reporter, insert_options, dedupe
+                )
+            elif parallel_workers > 1 and len(valid_files) > 1:
+                # 工作进程无法复用本进程中打开的文档
+                self.doc_cache.clear()
+                # 页面在工作进程中插入，只能报告各分片的完成情况
+                reporter.enter('sharded', 0)
+                with self.profiler.span('sharded-merge', pages=self.total_pages):
+                    skipped, self.dedup_stats = sharded_merge(
+                        valid_files, output_path, save_options, parallel_workers,
+                        lambda current, total, message: reporter.report(STATUS, current, message),
+                        insert_options, dedupe, cancel
+                    )
+                for file_path, error in skipped:
+                    self._skip(skip_report(file_path, SKIP_ERROR, error), reporter)
+            else:
+                self._merge_serial(output_path, save_options, reporter, insert_options, dedupe)
             
-            # 依次合并每个PDF
-            for idx, file_info in enumerate(self.file_list):
-                if not file_info['valid']:
-                    continue
+            if self.result_cache is not None:
+                self.result_cache.store(result_key, output_path, self.skipped_files)
+            
+            reporter.finish("完成!")
+            
+            return True
+            
+        except MergeCancelled:
+            reporter.cancelled()
+            raise
+        except Exception as e:
+            raise Exception(f"合并失败: {e}")
+    
+    def merge_to_bytes(self, **merge_options) -> bytes:
+        """
+        合并到内存并返回PDF数据（不写任何文件）
+        
+        Args:
+            merge_options: 传给 merge 的其他参数（不能使用 max_memory 和 resume）
+            
+        Returns:
+            bytes: 合并后的PDF数据
+        """
+        output = io.BytesIO()
+        self.merge(output, **merge_options)
+        return output.getvalue()
+    
+    def merge_iter(self,
+                   inputs: Iterable,
+                   output_path: str,
+                   progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                   compress: bool = True,
+                   merge_profile: str = 'full',
+                   compression: Optional[str] = None,
+                   dedupe: Optional[bool] = None,
+                   level: str = 'standard',
+                   batch_bytes: int = STREAM_BATCH_BYTES,
+                   progress: Optional[ProgressBus] = None,
+                   cancel: Optional[CancelToken] = None) -> Iterator[dict]:
+        """
+        边读取输入边合并（适合队列、管道等无法预先列出的输入）
+        
+        每个输入在插入前才打开并验证，插入后立即产出结果；每累计 batch_bytes 的输入
+        就把已插入的页面增量写入输出文件。不使用合并列表（file_list）和缓存，
+        开始时间和内存占用与输入数量无关。
+        
+        Args:
+            inputs: 任意可迭代对象，元素为路径、内存中的PDF数据（bytes/memoryview/文件对象）
+                    或二者之一与页码规格组成的元组
+            output_path: 输出文件路径（增量写入，不能是文件对象）
+            progress_callback: 进度回调函数 (current_page, 0, message)，总页数未知时为0
+            compress: 同 merge
+            merge_profile: 同 merge
+            compression: 同 merge；'auto' 按 'balanced' 处理（输入总量未知）
+            dedupe: 同 merge，默认压缩等级不是 'fastest' 时启用
+            level: 验证级别，'standard' 或 'deep'（'quick' 按 'standard' 处理，插入前总要打开文件）
+            batch_bytes: 两次写入输出文件之间累计的输入大小
+            progress: 进度事件总线（事件中 total_pages 为0）
+            cancel: 取消令牌
+            
+        Yields:
+            dict: 每个输入的信息 {path, pages, size, valid, error}；验证或插入失败时 valid 为 False
+            
+        Raises:
+            ValueError: 输入为空、合并配置或压缩等级未知、输出为文件对象（调用时立即抛出），
+                        或没有任何页面被合并（迭代结束时抛出）
+            MergeCancelled: 合并被取消（未写完的输出已删除）
+        """
+        # 参数在调用时检查，而不是等到第一次 next()
+        if isinstance(inputs, Sized) and len(inputs) == 0:
+            raise ValueError("没有可合并的PDF文件")
+        if merge_profile not in MERGE_PROFILES:
+            raise ValueError(f"未知的合并配置: {merge_profile}")
+        if is_output_stream(output_path):
+            raise ValueError("边读取边合并需要输出到文件")
+        insert_options = MERGE_PROFILES[merge_profile]
+        tier = compression or tier_for_compress(compress)
+        tier = 'balanced' if tier == 'auto' else resolve_tier(tier)
+        # 与流式合并相同：只压缩数据流，跨文件的重复对象由去重处理
+        save_options = tier_options(tier, incremental=True)
+        if dedupe is None:
+            dedupe = tier != 'fastest'
+        level = 'deep' if level == 'deep' else 'standard'
+        
+        output_dir = os.path.dirname(output_path)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        
+        return self._merge_iter(inputs, output_path, progress_callback, insert_options, save_options,
+                                dedupe, level, batch_bytes, progress, cancel)
+    
+    def _merge_iter(self,
+                    inputs: Iterable,
+                    output_path: str,
+                    progress_callback: Optional[Callable[[int, int, str], None]],
+                    insert_options: dict,
+                    save_options: dict,
+                    dedupe: bool,
+                    level: str,
+                    batch_bytes: int,
+                    progress: Optional[ProgressBus],
+                    cancel: Optional[CancelToken]) -> Iterator[dict]:
+        """merge_iter 的生成器部分（参数已检查）"""
+        self.dedup_stats = None
+        self.skipped_files = []
+        self._cancel = cancel
+        reporter = MergeProgress(lambda: 0, progress_callback, progress)
+        dedup = ResourceDeduplicator(None) if dedupe else None
+        output_doc = None
+        started = False
+        pending_bytes = 0
+        batch_pages = 0
+        pages_done = 0
+        try:
+            for index, item in enumerate(inputs):
+                self._check_cancel()
+                if output_doc is None:
+                    # 重新打开输出文件时只加载页面树，已写入的内容不会进入内存
+                    output_doc = fitz.open(output_path) if started else fitz.open()
+                    if dedup:
+                        dedup.doc = output_doc
                 
-                file_path = file_info['path']
+                with self.profiler.span('validate') as counters:
+                    file_info, doc = _open_input(item, index, level)
+                    counters['pages'] = file_info['pages']
+                reporter.file_started(file_info['path'], pages_done)
+                if doc is not None:
+                    try:
+                        self._insert(output_doc, doc, file_info, insert_options, dedup, reporter)
+                        pages_done += file_info['pages']
+                        batch_pages += file_info['pages']
+                        pending_bytes += file_info['size']
+                    except MergeCancelled:
+                        raise
+                    except Exception as e:
+                        self._skip(skip_report(file_info['path'], SKIP_ERROR, str(e)), reporter)
+                        file_info = dict(file_info, valid=False, error=str(e))
+                    finally:
+                        doc.close()
                 
-                # 报告进度
-                if progress_callback:
-                    progress_callback(
-                        processed_pages, 
-                        self.total_pages, 
-                        f"正在处理: {os.path.basename(file_path)}"
-                    )
+                if pending_bytes >= batch_bytes and output_doc.page_count:
+                    reporter.enter('save', pages_done, "正在写入文件...")
+                    self._save_batch(output_doc, output_path, save_options, started)
+                    started = True
+                    output_doc = None
+                    pending_bytes = 0
+                    batch_pages = 0
+                    reporter.enter('insert', pages_done)
+                # 已插入的内存数据不随结果交给调用方
+                file_info.pop('data', None)
+                yield file_info
+            
+            # 重新打开输出文件后没有再插入页面时无需写入
+            if batch_pages:
+                self._check_cancel()
+                reporter.enter('save', pages_done, "正在保存文件...")
+                self._save_batch(output_doc, output_path, save_options, started)
+                started = True
+                output_doc = None
+        except BaseException as e:
+            # 取消、出错或调用方提前结束迭代：已写入的部分不构成完整的输出
+            if output_doc is not None and not output_doc.is_closed:
+                output_doc.close()
+            if started and os.path.exists(output_path):
+                os.remove(output_path)
+            if isinstance(e, (MergeCancelled, GeneratorExit)):
+                reporter.cancelled()
+            raise
+        
+        opened = output_doc is not None
+        if opened:
+            output_doc.close()
+        if not started:
+            raise ValueError("所有文件均合并失败" if opened else "没有可合并的PDF文件")
+        if dedup:
+            self.dedup_stats = dedup.get_stats()
+        reporter.finish("完成!")
+    
+    def _save_batch(self, output_doc: fitz.Document, output_path: str, save_options: dict, started: bool):
+        """写入一段：首段写出新文件，之后增量追加"""
+        with self.profiler.span('save'):
+            if started:
+                output_doc.save(
+                    output_path,
+                    incremental=True,
+                    encryption=fitz.PDF_ENCRYPT_KEEP,
+                    **save_options
+                )
+            else:
+                output_doc.save(output_path, **save_options)
+        output_doc.close()
+    
+    def _merge_serial(self,
+                      output_path: str,
+                      save_options: dict,
+                      reporter: MergeProgress,
+                      insert_options: Optional[dict] = None,
+                      dedupe: bool = False):
+        """在当前进程中依次合并所有文件"""
+        # 创建新的PDF文档
+        output_doc = fitz.open()
+        dedup = ResourceDeduplicator(output_doc) if dedupe else None
+        # 验证时保留了句柄的文件无需再读取
+        prefetcher = self._start_prefetch(
+            [f for f in self.file_list if f['valid'] and f['path'] not in self.doc_cache],
+            self.prefetch_bytes
+        )
+        try:
+            self._insert_all(output_doc, self.file_list, prefetcher, reporter, insert_options, dedup)
+        finally:
+            if prefetcher:
+                prefetcher.close()
+        
+        # 保存合并后的PDF
+        self._check_cancel()
+        reporter.enter('save', self.total_pages, "正在保存文件...")
+        
+        with self.profiler.span('save'):
+            save_pdf(output_doc, output_path, **save_options)
+        output_doc.close()
+        if dedup:
+            self.dedup_stats = dedup.get_stats()
+    
+    def _insert_all(self,
+                    output_doc: fitz.Document,
+                    file_list: List[dict],
+                    prefetcher: Optional[Prefetcher],
+                    reporter: MergeProgress,
+                    insert_options: Optional[dict] = None,
+                    dedup: Optional[ResourceDeduplicator] = None,
+                    processed_pages: int = 0) -> int:
+        """依次插入给定的文件，返回累计处理的页数（从 processed_pages 起算）"""
+        opener = self._opener(prefetcher, self.doc_cache.take)
+        
+        # 依次合并每个PDF
+        for idx, file_info in enumerate(file_list):
+            if not file_info['valid']:
+                continue
+            
+            file_path = file_info['path']
+            self._check_cancel()
+            
+            # 报告进度
+            reporter.file_started(file_path, processed_pages)
+            
+            # 打开并插入PDF
+            try:
+                doc = self._open_for_merge(file_info, opener, reporter)
+                self._sync_pages(file_info, len(doc))
+                self._insert(output_doc, doc, file_info, insert_options, dedup, reporter)
+                processed_pages += file_info['pages']
+                doc.close()
                 
-                # 打开并插入PDF
-                try:
-                    doc = fitz.open(file_path)
-                    output_doc.insert_pdf(doc)
-                    processed_pages += len(doc)
-                    doc.close()
-                    
-                except Exception as e:
-                    print(f"警告: 跳过文件 {file_path}, 原因: {e}")
-                    continue
+            except MergeCancelled:
+                raise
+            except Exception as e:
+                self._skip(skip_report(file_path, SKIP_ERROR, str(e)), reporter)
+                continue
+        return processed_pages
+    
+    def _check_cancel(self):
+        """本次合并已被取消时抛出 MergeCancelled"""
+        if self._cancel:
+            self._cancel.check()
+    
+    def _skip(self, report: dict, reporter: Optional[MergeProgress] = None):
+        """记录并提示被跳过的文件"""
+        self.skipped_files.append(report)
+        print(f"警告: 跳过文件 {report['path']}, 原因: {report['error']}")
+        if reporter:
+            reporter.skipped(report)
+    
+    @staticmethod
+    def _start_prefetch(file_list: List[dict], max_bytes: int) -> Optional[Prefetcher]:
+        """为待读取的文件启动后台预读（预算为0或只有一个文件时不预读；内存中的输入无需预读）"""
+        file_list = [f for f in file_list if 'data' not in f]
+        if max_bytes <= 0 or len(file_list) < 2:
+            return None
+        return Prefetcher([(f['path'], f['size']) for f in file_list], max_bytes)
+    
+    @staticmethod
+    def _opener(prefetcher: Optional[Prefetcher],
+                cached: Optional[Callable[[str], Optional[fitz.Document]]] = None) -> Callable[[str], fitz.Document]:
+        """合并时打开文件的方式：先取缓存的句柄，再取预读的数据，最后直接打开"""
+        def open_doc(path: str) -> fitz.Document:
+            doc = cached(path) if cached else None
+            if doc is not None:
+                return doc
+            return prefetcher.open(path) if prefetcher else fitz.open(path)
+        return open_doc
+    
+    def _insert(self,
+                output_doc: fitz.Document,
+                doc: fitz.Document,
+                file_info: dict,
+                insert_options: Optional[dict] = None,
+                dedup: Optional[ResourceDeduplicator] = None,
+                reporter: Optional[MergeProgress] = None):
+        """插入一个文件，随后把其中与已插入文件相同的字体和图片重定向到已有对象"""
+        first_xref, first_page = output_doc.xref_length(), output_doc.page_count
+        path = file_info['path']
+        # 只有订阅了事件总线或可以取消时才按页面块插入
+        on_pages = None
+        if self._cancel or (reporter and reporter.bus):
+            def on_pages(n):
+                self._check_cancel()
+                if reporter:
+                    reporter.advance(n, path)
+        with self.profiler.span('insert', path, pages=file_info['pages']):
+            insert_pages(output_doc, doc, file_info.get('page_runs'), on_pages=on_pages,
+                         **(insert_options or {}))
+        if dedup:
+            with self.profiler.span('dedupe', file_info['path']) as counters:
+                counters['bytes'] = dedup.process(first_xref, first_page)
+    
+    def _sync_pages(self, file_info: dict, pages: int):
+        """用打开后得到的实际页数更正快速验证时的页数（选择了页面时页数已在登记时确定）"""
+        if 'page_runs' not in file_info and file_info['pages'] != pages:
+            self.total_pages += pages - file_info['pages']
+            file_info['pages'] = pages
+    
+    def _open_for_merge(self,
+                        file_info: dict,
+                        opener: Callable[[str], fitz.Document],
+                        reporter: Optional[MergeProgress] = None) -> fitz.Document:
+        """打开待合并的文件并记录耗时；复用缓存句柄时不计读取字节"""
+        hits = self.doc_cache.hits
+        with self.profiler.span('open', file_info['path']) as counters:
+            if 'data' in file_info:
+                # 内存中的输入：取验证时保留的句柄，或从数据重新打开（不复制）
+                doc = self.doc_cache.take(file_info['path']) or open_stream(file_info['data'])
+            else:
+                doc = opener(file_info['path'])
+            if self.doc_cache.hits == hits:
+                counters['bytes'] = file_info['size']
+        if reporter and self.doc_cache.hits == hits:
+            reporter.read(file_info['size'], file_info['path'])
+        return doc
+    
+    def _merge_resumable(self,
+                         output_path: str,
+                         save_options: dict,
+                         reporter: MergeProgress,
+                         insert_options: Optional[dict] = None,
+                         dedupe: bool = False):
+        """分段合并并在每段完成后写入检查点，最后合并所有分段"""
+        valid_files = [f for f in self.file_list if f['valid']]
+        journal = MergeJournal.open(
+            output_path, valid_files, dict(insert_options or {}, dedupe=dedupe)
+        )
+        chunks = journal.chunks
+        if journal.resumed:
+            done = [r for r in map(journal.completed, range(len(chunks))) if r]
+            reporter.report(
+                STATUS,
+                sum(r['pages'] for r in done),
+                f"从检查点继续: 已完成 {len(done)}/{len(chunks)} 段"
+            )
+        processed_pages = 0
+        partial_stats = []
+        for idx, (start, end) in enumerate(chunks):
+            record = journal.completed(idx)
+            if record:
+                # 上次运行已完成的分段
+                processed_pages += record['pages']
+                for report in record['skipped']:
+                    self._skip(report, reporter)
+                if record['dedup']:
+                    partial_stats.append(record['dedup'])
+                continue
             
-            # 保存合并后的PDF
-            if progress_callback:
-                progress_callback(
-                    self.total_pages, 
-                    self.total_pages, 
-                    "正在保存文件..."
+            files = valid_files[start:end]
+            skipped_before = len(self.skipped_files)
+            chunk_doc = fitz.open()
+            dedup = ResourceDeduplicator(chunk_doc) if dedupe else None
+            prefetcher = self._start_prefetch(
+                [f for f in files if f['path'] not in self.doc_cache], self.prefetch_bytes
+            )
+            try:
+                chunk_start = processed_pages
+                processed_pages = self._insert_all(
+                    chunk_doc, files, prefetcher, reporter, insert_options, dedup, processed_pages
                 )
+            finally:
+                if prefetcher:
+                    prefetcher.close()
             
-            # 保存选项: garbage=4(最大压缩), deflate=True(压缩流)
-            save_options = {
-                'garbage': 4 if compress else 0,
-                'deflate': compress,
-                'clean': compress
-            }
+            shard = None
+            if chunk_doc.page_count:
+                shard = journal.shard_path(idx)
+                # 写完再改名，日志只会指向完整的分段文件
+                reporter.enter('checkpoint', processed_pages)
+                with self.profiler.span('checkpoint', pages=chunk_doc.page_count):
+                    chunk_doc.save(shard + '.tmp', garbage=1 if dedup else 0)
+                    os.replace(shard + '.tmp', shard)
+            chunk_doc.close()
+            stats = dedup.get_stats() if dedup else None
+            if stats:
+                partial_stats.append(stats)
+            journal.complete(
+                idx, shard, processed_pages - chunk_start, self.skipped_files[skipped_before:], stats
+            )
+            reporter.report(STATUS, processed_pages, f"已保存检查点 {idx + 1}/{len(chunks)}")
+            reporter.enter('insert', processed_pages)
+        
+        shards = journal.shards()
+        if not shards:
+            raise ValueError("所有文件均合并失败")
+        reporter.enter('save', self.total_pages, "正在保存文件...")
+        with self.profiler.span('save'):
+            final = combine_shards(shards, output_path, save_options, dedupe, self._cancel)
+        if dedupe:
+            self.dedup_stats = merge_stats(final['dedup'], partial_stats)
+        journal.remove()
+    
+    def _merge_isolated(self,
+                        output_path: str,
+                        save_options: dict,
+                        limits: IsolationLimits,
+                        reporter: MergeProgress,
+                        insert_options: Optional[dict] = None,
+                        dedupe: bool = False):
+        """每个文件先在工作进程中复制出选中的页面，本进程只插入复制结果"""
+        # 本进程不再解析原始文件，验证时保留的句柄不再需要
+        self.doc_cache.clear()
+        output_doc = fitz.open()
+        dedup = ResourceDeduplicator(output_doc) if dedupe else None
+        processed_pages = 0
+        output_dir = None if is_output_stream(output_path) else os.path.dirname(os.path.abspath(output_path))
+        tmp_dir = tempfile.mkdtemp(prefix='.pdfmerge-isolated-', dir=output_dir)
+        loader = IsolatedLoader(
+            [f for f in self.file_list if f['valid']], tmp_dir, limits, insert_options, self._cancel
+        )
+        results = loader.results()
+        try:
+            for file_info, copy_path, report in results:
+                file_path = file_info['path']
+                reporter.file_started(file_path, processed_pages)
+                if report:
+                    self._skip(report, reporter)
+                    continue
+                try:
+                    doc = fitz.open(copy_path)
+                    self._sync_pages(file_info, len(doc))
+                    # 复制结果只包含选中的页面
+                    self._insert(output_doc, doc, dict(file_info, page_runs=None), insert_options, dedup, reporter)
+                    processed_pages += file_info['pages']
+                    doc.close()
+                except MergeCancelled:
+                    raise
+                except Exception as e:
+                    self._skip(skip_report(file_path, SKIP_ERROR, str(e)), reporter)
+                finally:
+                    os.remove(copy_path)
             
-            output_doc.save(output_path, **save_options)
+            if output_doc.page_count == 0:
+                raise ValueError("所有文件均合并失败")
+            self._check_cancel()
+            reporter.enter('save', self.total_pages, "正在保存文件...")
+            with self.profiler.span('save'):
+                save_pdf(output_doc, output_path, **save_options)
+        finally:
+            results.close()
             output_doc.close()
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        if dedup:
+            self.dedup_stats = dedup.get_stats()
+    
+    def _merge_streaming(self,
+                         output_path: str,
+                         save_options: dict,
+                         max_memory: int,
+                         reporter: MergeProgress,
+                         insert_options: Optional[dict] = None,
+                         dedupe: bool = False):
+        """按内存上限分段合并，每段通过增量保存追加到输出文件"""
+        # 按文件大小估算内存占用，把文件划分为若干段
+        batches = [[]]
+        batch_bytes = 0
+        for file_info in self.file_list:
+            if not file_info['valid']:
+                continue
+            if batches[-1] and batch_bytes + file_info['size'] > max_memory:
+                batches.append([])
+                batch_bytes = 0
+            batches[-1].append(file_info)
+            batch_bytes += file_info['size']
+        
+        # 去重索引只保存摘要和 xref，跨段有效（已写入的对象编号在增量保存后不变）
+        dedup = ResourceDeduplicator(None) if dedupe else None
+        # 预读的数据同样占用内存，预算不超过内存上限
+        prefetcher = self._start_prefetch(
+            [f for batch in batches for f in batch], min(self.prefetch_bytes, max_memory)
+        )
+        try:
+            started = self._stream_batches(
+                output_path, batches, save_options, prefetcher, reporter, insert_options, dedup
+            )
+        finally:
+            if prefetcher:
+                prefetcher.close()
+        
+        if not started:
+            raise ValueError("所有文件均合并失败")
+        if dedup:
+            self.dedup_stats = dedup.get_stats()
+    
+    def _stream_batches(self,
+                        output_path: str,
+                        batches: List[List[dict]],
+                        save_options: dict,
+                        prefetcher: Optional[Prefetcher],
+                        reporter: MergeProgress,
+                        insert_options: Optional[dict] = None,
+                        dedup: Optional[ResourceDeduplicator] = None) -> bool:
+        """逐段插入并写入输出文件，返回是否写入过任何页面"""
+        opener = self._opener(prefetcher)
+        processed_pages = 0
+        started = False
+        for batch in batches:
+            # 重新打开输出文件时只加载页面树，已写入的内容不会进入内存
+            output_doc = fitz.open(output_path) if started else fitz.open()
+            if dedup:
+                dedup.doc = output_doc
             
-            if progress_callback:
-                progress_callback(
-                    self.total_pages, 
-                    self.total_pages, 
-                    "完成!"
-                )
+            for file_info in batch:
+                file_path = file_info['path']
+                reporter.file_started(file_path, processed_pages)
+                try:
+                    self._check_cancel()
+                    doc = self._open_for_merge(file_info, opener, reporter)
+                    self._sync_pages(file_info, len(doc))
+                    self._insert(output_doc, doc, file_info, insert_options, dedup, reporter)
+                    processed_pages += file_info['pages']
+                    doc.close()
+                except MergeCancelled:
+                    output_doc.close()
+                    # 已写入的段不构成完整的输出
+                    if started:
+                        os.remove(output_path)
+                    raise
+                except Exception as e:
+                    self._skip(skip_report(file_path, SKIP_ERROR, str(e)), reporter)
+                    continue
             
-            return True
+            if output_doc.page_count == 0:
+                output_doc.close()
+                continue
             
-        except Exception as e:
-            raise Exception(f"合并失败: {e}")
+            reporter.enter('save', processed_pages, "正在写入文件...")
+            self._save_batch(output_doc, output_path, save_options, started)
+            started = True
+            reporter.enter('insert', processed_pages)
+        return started
     
     def get_file_info_summary(self) -> str:
         """
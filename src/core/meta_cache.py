@@ -0,0 +1,186 @@
+"""
+PDF元数据持久化缓存
+以 (路径, 大小, 修改时间, inode) 标识文件，未变化的文件无需再次打开即可得到页数和有效性
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import threading
+from typing import Optional, Tuple
+
+
+def default_cache_dir() -> str:
+    """获取当前用户的缓存目录"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'pdfmerge')
+
+
+class MetadataCache:
+    """基于SQLite的文件验证结果缓存"""
+
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 max_age_days: float = 30,
+                 max_entries: int = 100000):
+        """
+        初始化缓存
+
+        Args:
+            db_path: 数据库路径（默认位于用户缓存目录）
+            max_age_days: 超过该天数未使用的记录会被淘汰
+            max_entries: 最多保留的记录数，超出时淘汰最久未使用的记录
+        """
+        self.db_path = db_path or os.path.join(default_cache_dir(), 'metadata.sqlite3')
+        self.max_age_days = max_age_days
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pending = []
+        self._touched = []
+        self._lock = threading.Lock()
+
+        # 缓存不可用（如目录只读）时降级为始终未命中
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, "
+                "pages INTEGER, valid INTEGER, error TEXT, last_used REAL)"
+            )
+            self._conn.commit()
+        except (OSError, sqlite3.Error):
+            self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        """缓存是否可用"""
+        return self._conn is not None
+
+    @staticmethod
+    def file_key(pdf_path: str) -> Optional[tuple]:
+        """
+        计算文件标识
+
+        Returns:
+            Optional[tuple]: (绝对路径, 大小, 修改时间ns, inode)，文件不可访问时返回 None
+        """
+        try:
+            st = os.stat(pdf_path)
+        except OSError:
+            return None
+        return (os.path.abspath(pdf_path), st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def lookup(self, pdf_path: str) -> Tuple[Optional[dict], Optional[tuple]]:
+        """
+        查询文件的缓存结果
+
+        Args:
+            pdf_path: PDF文件路径
+
+        Returns:
+            tuple: (文件信息或None, 文件标识)；文件标识用于随后调用 store
+        """
+        key = self.file_key(pdf_path)
+        if key is None or not self.enabled:
+            return None, key
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, inode, pages, valid, error FROM files WHERE path = ?",
+                (key[0],)
+            ).fetchone()
+            if row is None or tuple(row[:3]) != key[1:]:
+                self.misses += 1
+                return None, key
+            self.hits += 1
+            self._touched.append(key[0])
+
+        return {
+            'path': pdf_path,
+            'pages': row[3],
+            'size': row[0],
+            'valid': bool(row[4]),
+            'error': row[5]
+        }, key
+
+    def store(self, key: Optional[tuple], file_info: dict):
+        """
+        记录文件的验证结果（调用 flush 后写入磁盘）
+
+        Args:
+            key: lookup 返回的文件标识
+            file_info: 文件信息
+        """
+        if key is None or not self.enabled:
+            return
+        with self._lock:
+            self._pending.append(
+                key + (file_info['pages'], int(file_info['valid']), file_info['error'], time.time())
+            )
+
+    def flush(self):
+        """写入待保存的记录并淘汰过期记录"""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.time()
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    self._pending
+                )
+                self._conn.executemany(
+                    "UPDATE files SET last_used = ? WHERE path = ?",
+                    [(now, path) for path in self._touched]
+                )
+                self._prune(now)
+                self._conn.commit()
+            except sqlite3.Error:
+                self._conn.rollback()
+            self._pending = []
+            self._touched = []
+
+    def _prune(self, now: float):
+        self._conn.execute(
+            "DELETE FROM files WHERE last_used < ?",
+            (now - self.max_age_days * 86400,)
+        )
+        count = self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM files WHERE path NOT IN "
+                "(SELECT path FROM files ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        """删除所有缓存记录"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn.execute("DELETE FROM files")
+            self._conn.commit()
+
+    def close(self):
+        """写入剩余记录并关闭数据库"""
+        if self.enabled:
+            self.flush()
+            self._conn.close()
+            self._conn = None
+
+    def get_stats(self) -> dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: {hits, misses}
+        """
+        return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,178 @@
+"""
+页面选择
+解析 "1-5,9,20-"、"odd"、"even" 等页码规格，转换为 insert_pdf 的 from_page/to_page 区间
+"""
+
+import os
+from typing import Callable, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+
+# 区间为从0开始的闭区间 (from_page, to_page)；from_page > to_page 表示倒序
+PageRuns = List[Tuple[int, int]]
+
+# 报告页面粒度进度时每次 insert_pdf 插入的页数
+PAGE_BLOCK = 32
+
+# 分批插入后按区间补回链接所用的 Document._do_links 是 PyMuPDF 的内部方法，
+# 不存在时每个区间改为一次插入（链接由 insert_pdf 自行处理，进度按区间报告）
+CAN_RESTORE_LINKS = hasattr(fitz.Document, '_do_links')
+
+
+def parse_page_spec(spec: str, page_count: int) -> PageRuns:
+    """
+    解析页码规格（页码从1开始）
+
+    支持以逗号分隔的:
+      N      单页
+      N-M    区间（N > M 时倒序插入）
+      N-     从第N页到最后一页
+      -M     从第1页到第M页
+      odd    所有奇数页
+      even   所有偶数页
+
+    Args:
+        spec: 页码规格
+        page_count: 文档页数
+
+    Returns:
+        PageRuns: 插入区间，相邻的正序区间会被合并
+
+    Raises:
+        ValueError: 规格无效或页码超出范围
+    """
+    runs = []
+    for item in spec.split(','):
+        item = item.strip().lower()
+        if not item:
+            continue
+        if item in ('odd', 'even'):
+            start = 0 if item == 'odd' else 1
+            runs.extend((i, i) for i in range(start, page_count, 2))
+            continue
+
+        if '-' in item:
+            first, _, last = item.partition('-')
+            first = _page_number(first, spec) if first.strip() else 1
+            last = _page_number(last, spec) if last.strip() else page_count
+        else:
+            first = last = _page_number(item, spec)
+        for number in (first, last):
+            if not 1 <= number <= page_count:
+                raise ValueError(f"页码 {number} 超出范围 (共{page_count}页): {spec}")
+        runs.append((first - 1, last - 1))
+
+    if not runs:
+        raise ValueError(f"页码规格为空: {spec}")
+    return _coalesce(runs)
+
+
+def _page_number(text: str, spec: str) -> int:
+    text = text.strip()
+    if not text.isdigit():
+        raise ValueError(f"无效的页码规格: {spec}")
+    return int(text)
+
+
+def _coalesce(runs: PageRuns) -> PageRuns:
+    """合并首尾相接的正序区间，减少 insert_pdf 调用次数"""
+    merged = []
+    for start, end in runs:
+        if merged and start <= end:
+            prev_start, prev_end = merged[-1]
+            if prev_start <= prev_end and start == prev_end + 1:
+                merged[-1] = (prev_start, end)
+                continue
+        merged.append((start, end))
+    return merged
+
+
+def count_pages(runs: PageRuns) -> int:
+    """区间包含的总页数"""
+    return sum(abs(end - start) + 1 for start, end in runs)
+
+
+def split_page_spec(arg: str) -> Tuple[str, Optional[str]]:
+    """
+    拆分命令行参数中的页码规格，如 "report.pdf:1-5,9"
+
+    只有冒号前的部分以 .pdf 结尾、且整个参数不是已存在的文件时才拆分，
+    因此 Windows 盘符和文件名中的冒号不受影响。
+
+    Args:
+        arg: 命令行参数
+
+    Returns:
+        tuple: (路径, 页码规格或None)
+    """
+    if ':' in arg and not os.path.exists(arg):
+        path, spec = arg.rsplit(':', 1)
+        if path.lower().endswith('.pdf') and spec.strip():
+            return path, spec
+    return arg, None
+
+
+def insert_pages(output_doc: fitz.Document,
+                 doc: fitz.Document,
+                 runs: Optional[PageRuns] = None,
+                 on_pages: Optional[Callable[[int], None]] = None,
+                 block: int = PAGE_BLOCK,
+                 **insert_options) -> int:
+    """
+    把文档（或其中选定的页面）插入输出文档
+
+    同一源文档的多个区间共用一份对象映射（只在最后一次插入时释放），
+    共享的字体和图片只复制一次。
+
+    Args:
+        output_doc: 输出文档
+        doc: 源文档
+        runs: 插入区间，None 表示整个文档
+        on_pages: 每插入一批页面后以该批页数调用，用于页面粒度的进度；
+                  设置后较长的区间按 block 页一批插入，链接在整个区间插入后统一复制，
+                  结果与整段插入相同
+        block: 每批页数
+        insert_options: 传给 insert_pdf 的其他参数（links/annots/widgets）
+
+    Returns:
+        int: 插入的页数
+    """
+    if runs is None:
+        if on_pages is None:
+            output_doc.insert_pdf(doc, **insert_options)
+            return len(doc)
+        runs = [(0, len(doc) - 1)]
+    last = len(runs) - 1
+    if on_pages is None:
+        for idx, (start, end) in enumerate(runs):
+            output_doc.insert_pdf(doc, from_page=start, to_page=end, final=idx == last, **insert_options)
+        return count_pages(runs)
+
+    # insert_pdf 只保留目标页在同一次插入中的链接，分批插入时跨批的链接会丢失：
+    # 各批不复制链接，区间插入完成后按整个区间复制一次（见 CAN_RESTORE_LINKS）
+    links = insert_options.pop('links', True)
+    whole_runs = links and not CAN_RESTORE_LINKS
+    for idx, (start, end) in enumerate(runs):
+        start_at = output_doc.page_count
+        blocks = [(start, end)] if whole_runs else _split_runs([(start, end)], block)
+        for block_idx, (first, stop) in enumerate(blocks):
+            output_doc.insert_pdf(doc, from_page=first, to_page=stop, links=whole_runs,
+                                  final=idx == last and block_idx == len(blocks) - 1,
+                                  **insert_options)
+            on_pages(abs(stop - first) + 1)
+        if links and not whole_runs:
+            output_doc._do_links(doc, from_page=start, to_page=end, start_at=start_at)
+    return count_pages(runs)
+
+
+def _split_runs(runs: PageRuns, block: int) -> PageRuns:
+    """把区间拆分为不超过 block 页的小区间（保持方向）"""
+    split = []
+    for start, end in runs:
+        step = 1 if end >= start else -1
+        while abs(end - start) + 1 > block:
+            split.append((start, start + step * (block - 1)))
+            start += step * block
+        split.append((start, end))
+    return split
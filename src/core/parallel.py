@@ -0,0 +1,289 @@
+"""
+分片并行合并引擎
+将有序文件列表切分为若干分片，由多个进程分别合并为临时PDF，
+再两两归并（树形归约）得到最终输出
+"""
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from typing import Iterator, List, Callable, Optional
+
+import fitz  # PyMuPDF
+
+from .page_ranges import insert_pages
+from .dedup import ResourceDeduplicator, merge_stats
+from .cancel import CancelToken, MergeCancelled, ignore_interrupts
+from .isolation import worker_context
+from .streams import is_output_stream, save_pdf
+
+# 自动模式下启用分片合并的阈值（满足其一即可）
+PARALLEL_MIN_PAGES = 2000
+PARALLEL_MIN_BYTES = 100 * 1024 * 1024
+# 每个分片至少包含的文件数，太小的分片归并开销大于收益
+MIN_FILES_PER_SHARD = 2
+# 主进程检查取消令牌的间隔（秒）
+CANCEL_POLL = 0.1
+
+# 工作进程中由主进程设置的停止事件
+_stop = None
+
+
+def _init_worker(stop):
+    global _stop
+    _stop = stop
+    ignore_interrupts()
+
+
+def _check_stop(cancel: Optional[CancelToken] = None):
+    """主进程中检查取消令牌，工作进程中检查停止事件"""
+    if cancel is not None:
+        cancel.check()
+    elif _stop is not None and _stop.is_set():
+        raise MergeCancelled()
+
+
+def _as_completed(futures, cancel: Optional[CancelToken], stop) -> Iterator:
+    """
+    同 as_completed；设置了取消令牌时每 CANCEL_POLL 秒检查一次
+
+    取消后丢弃尚未开始的任务，并通过 stop 事件让运行中的工作进程尽快停止
+    """
+    if cancel is None:
+        yield from as_completed(futures)
+        return
+    pending = set(futures)
+    while pending:
+        if cancel.cancelled:
+            stop.set()
+            for future in pending:
+                future.cancel()
+            raise MergeCancelled()
+        done, pending = wait(pending, timeout=CANCEL_POLL, return_when=FIRST_COMPLETED)
+        yield from done
+
+
+def plan_workers(file_count: int,
+                 total_pages: int,
+                 total_bytes: int,
+                 workers: Optional[int] = None) -> int:
+    """
+    根据任务规模决定并行度
+
+    Args:
+        file_count: 文件数量
+        total_pages: 总页数
+        total_bytes: 总大小（字节）
+        workers: 指定的最大工作进程数（默认CPU核数）
+
+    Returns:
+        int: 工作进程数，1 表示应串行合并
+    """
+    if total_pages < PARALLEL_MIN_PAGES and total_bytes < PARALLEL_MIN_BYTES:
+        return 1
+    workers = workers or os.cpu_count() or 1
+    return max(1, min(workers, file_count // MIN_FILES_PER_SHARD))
+
+
+def split_shards(file_list: List[dict], shard_count: int) -> List[List[dict]]:
+    """
+    按页数把有序文件列表切分为连续的分片
+
+    Args:
+        file_list: 文件信息列表
+        shard_count: 分片数量
+
+    Returns:
+        List[List[dict]]: 分片列表，保持原有顺序
+    """
+    shard_count = max(1, min(shard_count, len(file_list)))
+    total = sum(max(f['pages'], 1) for f in file_list)
+    target = total / shard_count
+
+    shards = [[]]
+    acc = 0
+    for idx, info in enumerate(file_list):
+        remaining_files = len(file_list) - idx
+        remaining_shards = shard_count - len(shards)
+        # 当前分片已达目标页数，或剩余文件刚好够每个分片一个时，开始新分片
+        if shards[-1] and remaining_shards > 0 and (
+                acc >= target * len(shards) or remaining_files <= remaining_shards):
+            shards.append([])
+        shards[-1].append(info)
+        acc += max(info['pages'], 1)
+    return shards
+
+
+def merge_shard(inputs: List[tuple],
+                shard_path: str,
+                insert_options: Optional[dict] = None,
+                dedupe: bool = False) -> dict:
+    """
+    在工作进程中合并一个分片
+
+    Args:
+        inputs: 分片内的文件 [(路径, 插入区间或None)]（有序）
+        shard_path: 临时输出路径
+        insert_options: 传给 insert_pdf 的选项（见 merger.MERGE_PROFILES）
+        dedupe: 是否在分片内对字体和图片去重
+
+    Returns:
+        dict: {path: 分片文件路径或None(分片为空), pages, skipped: [(path, error)], dedup: 去重统计或None}
+    """
+    output_doc = fitz.open()
+    dedup = ResourceDeduplicator(output_doc) if dedupe else None
+    skipped = []
+    pages = 0
+    # 主进程取消时在文件之间和页面块之间停止
+    on_pages = (lambda n: _check_stop()) if _stop is not None else None
+    for path, runs in inputs:
+        _check_stop()
+        try:
+            doc = fitz.open(path)
+            first_xref, first_page = output_doc.xref_length(), output_doc.page_count
+            pages += insert_pages(output_doc, doc, runs, on_pages=on_pages, **(insert_options or {}))
+            doc.close()
+            if dedup:
+                dedup.process(first_xref, first_page)
+        except MergeCancelled:
+            raise
+        except Exception as e:
+            skipped.append((path, str(e)))
+
+    stats = dedup.get_stats() if dedup else None
+    if output_doc.page_count == 0:
+        output_doc.close()
+        return {'path': None, 'pages': 0, 'skipped': skipped, 'dedup': stats}
+
+    # 中间结果只丢弃去重后不再被引用的对象，压缩留给最终输出
+    output_doc.save(shard_path, garbage=1 if dedup else 0)
+    output_doc.close()
+    return {'path': shard_path, 'pages': pages, 'skipped': skipped, 'dedup': stats}
+
+
+def combine_shards(paths: List[str],
+                   output_path: str,
+                   save_options: Optional[dict] = None,
+                   dedupe: bool = False,
+                   cancel: Optional[CancelToken] = None) -> dict:
+    """
+    按顺序合并若干分片文件
+
+    Args:
+        paths: 分片文件路径
+        output_path: 输出路径或可写的文件对象
+        save_options: 保存选项（仅最终输出需要）
+        dedupe: 是否对不同分片之间相同的字体和图片去重（仅最终输出需要）
+        cancel: 取消令牌，在分片之间检查
+
+    Returns:
+        dict: {path: 输出路径, dedup: 去重统计或None}
+    """
+    output_doc = fitz.open()
+    dedup = ResourceDeduplicator(output_doc) if dedupe else None
+    for path in paths:
+        _check_stop(cancel)
+        doc = fitz.open(path)
+        first_xref, first_page = output_doc.xref_length(), output_doc.page_count
+        output_doc.insert_pdf(doc)
+        doc.close()
+        if dedup:
+            dedup.process(first_xref, first_page)
+    save_pdf(output_doc, output_path, **(save_options or {}))
+    output_doc.close()
+    return {'path': output_path, 'dedup': dedup.get_stats() if dedup else None}
+
+
+def sharded_merge(file_list: List[dict],
+                  output_path: str,
+                  save_options: dict,
+                  workers: int,
+                  progress_callback: Optional[Callable[[int, int, str], None]] = None,
+                  insert_options: Optional[dict] = None,
+                  dedupe: bool = False,
+                  cancel: Optional[CancelToken] = None) -> tuple:
+    """
+    分片并行合并
+
+    Args:
+        file_list: 有效文件信息列表（有序）
+        output_path: 输出文件路径或可写的文件对象
+        save_options: 最终输出的保存选项
+        workers: 工作进程数
+        progress_callback: 进度回调函数 (current_page, total_pages, current_file)
+        insert_options: 插入输入文件时传给 insert_pdf 的选项
+        dedupe: 是否对字体和图片去重（分片内各自去重，最终合并时再跨分片去重）
+        cancel: 取消令牌；取消后通知工作进程在下一个页面块停止，并丢弃尚未开始的分片
+
+    Returns:
+        tuple: (被跳过的文件 [(path, error)], 去重统计或None)
+    """
+    total_pages = sum(f['pages'] for f in file_list)
+    shards = split_shards(file_list, workers)
+    # 临时分片与输出放在同一文件系统，避免占满系统临时目录（输出到文件对象时只能用系统临时目录）
+    output_dir = None if is_output_stream(output_path) else os.path.dirname(os.path.abspath(output_path))
+    tmp_dir = tempfile.mkdtemp(prefix='.pdfmerge-shards-', dir=output_dir)
+    # 有取消令牌时工作进程只响应主进程的停止事件
+    ctx = worker_context()
+    stop = ctx.Event() if cancel else None
+    pool_options = {'initializer': _init_worker, 'initargs': (stop,)} if cancel else {}
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, **pool_options) as pool:
+            futures = {}
+            for idx, shard in enumerate(shards):
+                shard_path = os.path.join(tmp_dir, f"shard-0-{idx}.pdf")
+                future = pool.submit(
+                    merge_shard, [(f['path'], f.get('page_runs')) for f in shard], shard_path,
+                    insert_options, dedupe
+                )
+                futures[future] = idx
+
+            results = [None] * len(shards)
+            processed_pages = 0
+            for future in _as_completed(futures, cancel, stop):
+                idx = futures[future]
+                results[idx] = future.result()
+                processed_pages += results[idx]['pages']
+                if progress_callback:
+                    last_file = os.path.basename(shards[idx][-1]['path'])
+                    progress_callback(
+                        processed_pages,
+                        total_pages,
+                        f"已完成分片 {idx + 1}/{len(shards)}: {last_file}"
+                    )
+
+            skipped = [item for r in results for item in r['skipped']]
+            level = [r['path'] for r in results if r['path']]
+            if not level:
+                raise ValueError("所有文件均合并失败")
+
+            # 树形归约：每轮两两合并，直到只剩不超过两个分片
+            depth = 1
+            while len(level) > 2:
+                futures = []
+                for i in range(0, len(level) - 1, 2):
+                    pair_path = os.path.join(tmp_dir, f"shard-{depth}-{i // 2}.pdf")
+                    futures.append(pool.submit(combine_shards, level[i:i + 2], pair_path))
+                for _ in _as_completed(futures, cancel, stop):
+                    pass
+                next_level = [f.result()['path'] for f in futures]
+                if len(level) % 2:
+                    next_level.append(level[-1])
+                for path in level:
+                    if path not in next_level:
+                        os.remove(path)
+                level = next_level
+                depth += 1
+
+        if progress_callback:
+            progress_callback(total_pages, total_pages, "正在保存文件...")
+        final = combine_shards(level, output_path, save_options, dedupe, cancel)
+        dedup_stats = None
+        if dedupe:
+            # 分片内保留的资源在最终合并时会再次登记，资源数以最终输出为准
+            dedup_stats = merge_stats(final['dedup'], [r['dedup'] for r in results if r['dedup']])
+        return skipped, dedup_stats
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
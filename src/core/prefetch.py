@@ -0,0 +1,218 @@
+"""
+输入文件预读
+后台线程按合并顺序提前把后续文件读入内存，读取与 insert_pdf 重叠进行；
+本地文件使用 mmap，网络文件系统上的文件整块读取
+"""
+
+import os
+import re
+import sys
+import mmap
+import threading
+from typing import List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+
+# 默认预读预算：已读入但尚未被取走的数据总量
+DEFAULT_PREFETCH_BYTES = 64 * 1024 * 1024
+
+# 视为网络存储的文件系统类型（/proc/self/mounts 中的名称）
+REMOTE_FS_TYPES = {
+    'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', 'afs', '9p', 'ceph', 'glusterfs',
+    'lustre', 'davfs', 'fuse.sshfs', 'fuse.rclone', 'fuse.s3fs',
+}
+
+_mounts = None
+
+
+def _mount_table() -> List[Tuple[str, str]]:
+    """挂载点及其文件系统类型，按挂载点长度降序（只读取一次）"""
+    global _mounts
+    if _mounts is None:
+        _mounts = []
+        try:
+            with open('/proc/self/mounts', 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) >= 3:
+                        # 挂载点中的空格等字符以八进制转义
+                        point = re.sub(r'\\([0-7]{3})', lambda m: chr(int(m.group(1), 8)), fields[1])
+                        _mounts.append((point, fields[2]))
+        except OSError:
+            pass
+        _mounts.sort(key=lambda m: len(m[0]), reverse=True)
+    return _mounts
+
+
+def is_remote_path(path: str) -> bool:
+    """
+    判断文件是否位于网络存储上（无法判断时视为本地文件）
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        bool: 是否为网络文件
+    """
+    path = os.path.realpath(path)
+    if sys.platform == 'win32':
+        if path.startswith('\\\\'):
+            return True
+        try:
+            import ctypes
+            drive = os.path.splitdrive(path)[0] + '\\'
+            return ctypes.windll.kernel32.GetDriveTypeW(drive) == 4  # DRIVE_REMOTE
+        except Exception:
+            return False
+    for point, fs_type in _mount_table():
+        if path == point or path.startswith(point.rstrip('/') + '/'):
+            return fs_type in REMOTE_FS_TYPES
+    return False
+
+
+def read_file(path: str, remote: Optional[bool] = None):
+    """
+    把文件读入内存
+
+    Args:
+        path: 文件路径
+        remote: 是否为网络文件（默认自动判断）
+
+    Returns:
+        bytes 或 memoryview: 可直接传给 fitz.open(stream=...)
+    """
+    if remote is None:
+        remote = is_remote_path(path)
+    with open(path, 'rb', buffering=0) as f:
+        if not remote:
+            try:
+                view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            except (ValueError, OSError):
+                view = None  # 空文件或不支持 mmap 的文件系统
+            if view is not None:
+                _fault_in(view)
+                return view
+        # 网络文件系统上 mmap 的缺页会逐页往返，整块读取一次完成
+        return f.read()
+
+
+def _fault_in(view: memoryview):
+    """提前把映射的页面读入页缓存，避免合并线程阻塞在缺页上"""
+    m = view.obj
+    if hasattr(m, 'madvise') and hasattr(mmap, 'MADV_WILLNEED'):
+        m.madvise(mmap.MADV_WILLNEED)
+    step = mmap.PAGESIZE
+    for offset in range(0, len(view), step):
+        view[offset]
+
+
+class Prefetcher:
+    """按顺序预读一组文件，预读深度受字节预算限制"""
+
+    def __init__(self, files: List[Tuple[str, int]], max_bytes: int = DEFAULT_PREFETCH_BYTES):
+        """
+        初始化并启动后台读取线程
+
+        Args:
+            files: 按合并顺序排列的 [(路径, 文件大小)]
+            max_bytes: 已读入但尚未取走的数据总量上限；单个文件超过上限时
+                       仍会读取，但只在前面的数据都被取走之后
+        """
+        self.files = list(files)
+        self.max_bytes = max_bytes
+        self._ready = {}       # 下标 -> (数据, 异常)
+        self._buffered = 0
+        self._cursor = 0       # 调用方最近一次取走（或正在等待）的文件之后的下标
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        for idx, (path, size) in enumerate(self.files):
+            with self._cond:
+                while not self._closed and not self._skipped(idx) and \
+                        self._buffered > 0 and self._buffered + size > self.max_bytes:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                if self._skipped(idx):
+                    continue
+                self._buffered += size
+            try:
+                entry = (read_file(path), None)
+            except Exception as e:
+                entry = (None, e)
+            with self._cond:
+                if self._skipped(idx) or self._closed:
+                    # 读取期间被跳过
+                    self._buffered -= size
+                else:
+                    self._ready[idx] = entry
+                self._cond.notify_all()
+
+    def take(self, path: str):
+        """
+        取出文件内容（等待后台线程读完）；必须按顺序调用，跳过的文件会被丢弃
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            bytes 或 memoryview: 文件内容
+
+        Raises:
+            KeyError: 文件不在预读列表中（或已被取走）
+            OSError: 读取失败
+        """
+        with self._cond:
+            idx = self._cursor
+            while idx < len(self.files) and self.files[idx][0] != path:
+                idx += 1
+            if idx == len(self.files):
+                raise KeyError(path)
+            for skipped in range(self._cursor, idx):
+                self._release(skipped)
+            self._cursor = idx + 1
+            while idx not in self._ready and not self._closed:
+                self._cond.wait()
+            data, error = self._ready.pop(idx, (None, None))
+            self._buffered -= self.files[idx][1]
+            self._cond.notify_all()
+        if error is not None:
+            raise error
+        if data is None:
+            raise KeyError(path)
+        return data
+
+    def open(self, path: str) -> fitz.Document:
+        """取出文件内容并打开为文档；不在预读列表中的文件直接从磁盘打开"""
+        try:
+            data = self.take(path)
+        except KeyError:
+            return fitz.open(path)
+        return fitz.open(stream=data, filetype='pdf')
+
+    def _skipped(self, idx: int) -> bool:
+        """调用方已越过该文件取走了后面的文件"""
+        return idx < self._cursor - 1
+
+    def _release(self, idx: int):
+        # 正在读取或尚未读取的文件由后台线程根据 _cursor 丢弃或跳过
+        if self._ready.pop(idx, None) is not None:
+            self._buffered -= self.files[idx][1]
+
+    def close(self):
+        """停止预读并丢弃尚未取走的数据"""
+        with self._cond:
+            self._closed = True
+            self._ready.clear()
+            self._cond.notify_all()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,199 @@
+"""
+合并过程性能剖析
+按文件和阶段记录墙钟时间、CPU时间、读取字节数和插入页数，可导出 Chrome/Perfetto 跟踪文件
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+
+# 单个文件耗时占比超过该值时在报告中标记为异常
+OUTLIER_SHARE = 0.2
+
+
+class MergeProfiler:
+    """合并过程剖析器，未启用时所有记录操作均为空操作"""
+
+    def __init__(self, enabled: bool = True):
+        """
+        初始化剖析器
+
+        Args:
+            enabled: 是否记录
+        """
+        self.enabled = enabled
+        self.spans = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, phase: str, file: Optional[str] = None, **counters):
+        """
+        记录一个阶段的耗时
+
+        Args:
+            phase: 阶段名称，如 validate/open/insert/save
+            file: 关联的文件路径
+            counters: 计数（bytes, pages），可在块内通过返回的字典更新
+
+        Yields:
+            dict: 计数字典
+        """
+        if not self.enabled:
+            yield counters
+            return
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield counters
+        finally:
+            record = {
+                'phase': phase,
+                'file': file,
+                'start': wall_start - self._origin,
+                'wall': time.perf_counter() - wall_start,
+                'cpu': time.thread_time() - cpu_start,
+                'bytes': counters.get('bytes', 0),
+                'pages': counters.get('pages', 0),
+                'tid': threading.get_ident(),
+            }
+            with self._lock:
+                self.spans.append(record)
+
+    def reset(self):
+        """清空已记录的数据"""
+        with self._lock:
+            self.spans = []
+            self._origin = time.perf_counter()
+
+    def phase_totals(self) -> dict:
+        """
+        按阶段汇总
+
+        Returns:
+            dict: {phase: {count, wall, cpu, bytes, pages}}
+        """
+        totals = {}
+        for span in self.spans:
+            entry = totals.setdefault(
+                span['phase'], {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'bytes': 0, 'pages': 0}
+            )
+            entry['count'] += 1
+            for key in ('wall', 'cpu', 'bytes', 'pages'):
+                entry[key] += span[key]
+        return totals
+
+    def file_totals(self) -> list:
+        """
+        按文件汇总，按墙钟时间降序排列
+
+        Returns:
+            list: [{file, wall, cpu, bytes, pages, phases: {phase: wall}}]
+        """
+        totals = {}
+        for span in self.spans:
+            if span['file'] is None:
+                continue
+            entry = totals.setdefault(
+                span['file'],
+                {'file': span['file'], 'wall': 0.0, 'cpu': 0.0, 'bytes': 0, 'pages': 0, 'phases': {}}
+            )
+            for key in ('wall', 'cpu', 'bytes', 'pages'):
+                entry[key] += span[key]
+            entry['phases'][span['phase']] = entry['phases'].get(span['phase'], 0.0) + span['wall']
+        return sorted(totals.values(), key=lambda e: e['wall'], reverse=True)
+
+    def get_summary(self) -> dict:
+        """
+        获取剖析结果
+
+        Returns:
+            dict: {phases, files, outliers}
+        """
+        files = self.file_totals()
+        file_wall = sum(f['wall'] for f in files)
+        outliers = [
+            f['file'] for f in files
+            if file_wall > 0 and len(files) > 1 and f['wall'] / file_wall >= OUTLIER_SHARE
+        ]
+        return {'phases': self.phase_totals(), 'files': files, 'outliers': outliers}
+
+    def format_report(self, top: int = 10) -> str:
+        """
+        生成文本报告
+
+        Args:
+            top: 显示耗时最多的文件数
+
+        Returns:
+            str: 格式化的报告
+        """
+        summary = self.get_summary()
+        lines = ["阶段耗时:"]
+        total_wall = sum(p['wall'] for p in summary['phases'].values()) or 1.0
+        for phase, p in sorted(summary['phases'].items(), key=lambda kv: kv[1]['wall'], reverse=True):
+            lines.append(
+                f"  {phase:12s} {p['wall']:8.3f}s 墙钟 {p['cpu']:8.3f}s CPU "
+                f"{p['wall'] / total_wall * 100:5.1f}%  ×{p['count']}"
+                + (f"  {p['pages']}页" if p['pages'] else "")
+                + (f"  {p['bytes'] / (1024 * 1024):.2f}MB" if p['bytes'] else "")
+            )
+
+        files = summary['files']
+        if files:
+            file_wall = sum(f['wall'] for f in files) or 1.0
+            lines.append(f"耗时最多的文件 (前{min(top, len(files))}个):")
+            for f in files[:top]:
+                share = f['wall'] / file_wall
+                mark = "⚠️ " if f['file'] in summary['outliers'] else "  "
+                bar = '█' * max(1, int(share * 20))
+                lines.append(
+                    f"{mark}{os.path.basename(f['file']):40s} {f['wall']:8.3f}s {share * 100:5.1f}% {bar}"
+                )
+        return "\n".join(lines)
+
+    def to_chrome_trace(self) -> dict:
+        """
+        转换为 Chrome/Perfetto 跟踪格式（Trace Event Format）
+
+        Returns:
+            dict: {traceEvents: [...]}
+        """
+        pid = os.getpid()
+        tids = {}
+        events = []
+        for span in self.spans:
+            tid = tids.setdefault(span['tid'], len(tids) + 1)
+            name = span['phase']
+            if span['file']:
+                name = f"{span['phase']}: {os.path.basename(span['file'])}"
+            events.append({
+                'name': name,
+                'cat': span['phase'],
+                'ph': 'X',
+                'ts': round(span['start'] * 1e6, 3),
+                'dur': round(span['wall'] * 1e6, 3),
+                'pid': pid,
+                'tid': tid,
+                'args': {
+                    'file': span['file'],
+                    'cpu_ms': round(span['cpu'] * 1e3, 3),
+                    'bytes': span['bytes'],
+                    'pages': span['pages'],
+                },
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export_chrome_trace(self, path: str):
+        """
+        导出跟踪文件，可在 chrome://tracing 或 ui.perfetto.dev 中打开
+
+        Args:
+            path: 输出文件路径
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False)
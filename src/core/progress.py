@@ -0,0 +1,200 @@
+"""
+合并进度事件
+合并过程产生带类型的进度事件（开始处理文件、完成页面、读取字节、阶段切换），
+经 ProgressBus 按固定频率合并后分发给订阅者（命令行进度条、图形界面、JSON Lines 日志）
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Callable, List, NamedTuple, Optional, TextIO
+
+
+# 事件类型
+FILE_STARTED = 'file-started'   # 开始处理一个文件
+PAGES_DONE = 'pages-done'       # 插入了一批页面
+BYTES_READ = 'bytes-read'       # 从磁盘读取了一个文件
+PHASE = 'phase'                 # 进入新的阶段（insert/save/checkpoint/sharded/cache）
+STATUS = 'status'               # 其他状态说明
+FILE_SKIPPED = 'file-skipped'   # 跳过了一个文件
+FINISHED = 'finished'           # 合并完成
+CANCELLED = 'cancelled'         # 合并被取消
+
+# 这些事件总是立即送达，不会被合并掉
+_IMMEDIATE = {PHASE, FILE_SKIPPED, FINISHED, CANCELLED}
+
+
+class ProgressEvent(NamedTuple):
+    """一条进度事件；pages_done、bytes_read 为累计值，丢弃中间事件不会丢失进度"""
+    kind: str
+    pages_done: int
+    total_pages: int
+    bytes_read: int = 0
+    phase: str = 'insert'
+    path: Optional[str] = None
+    message: str = ''
+    timestamp: float = 0.0
+
+
+class ProgressBus:
+    """按最小间隔合并事件的发布/订阅总线（线程安全，订阅者在发布事件的线程中被调用）"""
+
+    def __init__(self, min_interval: float = 0.1):
+        """
+        初始化
+
+        Args:
+            min_interval: 两次分发之间的最小间隔（秒），期间只保留最新的事件；0 表示不合并
+        """
+        self.min_interval = min_interval
+        self._subscribers = []
+        self._pending = None
+        self._last_dispatch = 0.0
+        self._lock = threading.Lock()
+        self.emitted = 0
+        self.dispatched = 0
+
+    def subscribe(self, callback: Callable[[ProgressEvent], None]) -> Callable[[], None]:
+        """
+        订阅事件
+
+        Args:
+            callback: 接收 ProgressEvent 的函数
+
+        Returns:
+            Callable: 调用后取消订阅
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def emit(self, event: ProgressEvent):
+        """发布事件；距上次分发不足 min_interval 时暂存（阶段切换、跳过、完成除外）"""
+        with self._lock:
+            self.emitted += 1
+            now = time.monotonic()
+            immediate = event.kind in _IMMEDIATE
+            if not immediate and now - self._last_dispatch < self.min_interval:
+                self._pending = event
+                return
+            # 先送达暂存的事件，保证顺序
+            batch = [self._pending, event] if immediate and self._pending else [event]
+            self._pending = None
+            self._last_dispatch = now
+            subscribers = list(self._subscribers)
+        self._dispatch(batch, subscribers)
+
+    def flush(self):
+        """立即送达暂存的事件"""
+        with self._lock:
+            pending, self._pending = self._pending, None
+            subscribers = list(self._subscribers)
+            if pending:
+                self._last_dispatch = time.monotonic()
+        if pending:
+            self._dispatch([pending], subscribers)
+
+    def _dispatch(self, events: List[ProgressEvent], subscribers: list):
+        for event in events:
+            self.dispatched += 1
+            for callback in subscribers:
+                callback(event)
+
+
+class MergeProgress:
+    """
+    一次合并的进度状态
+
+    把合并过程中的各个节点转换为事件发布到总线，同时以原有的方式调用
+    progress_callback(current_page, total_pages, message)（只在带说明的节点调用，不做合并）
+    """
+
+    def __init__(self,
+                 total_pages: Callable[[], int],
+                 callback: Optional[Callable[[int, int, str], None]] = None,
+                 bus: Optional[ProgressBus] = None):
+        """
+        初始化
+
+        Args:
+            total_pages: 返回当前总页数的函数（快速验证的文件在打开后才更正页数）
+            callback: 旧式进度回调
+            bus: 事件总线
+        """
+        self._total = total_pages
+        self.callback = callback
+        self.bus = bus
+        self.pages_done = 0
+        self.bytes_read = 0
+        self.phase = 'insert'
+
+    def report(self, kind: str, pages_done: int, message: str = '', path: Optional[str] = None):
+        """报告一个带说明的节点（同时调用旧式回调）"""
+        self.pages_done = pages_done
+        if self.callback and message:
+            self.callback(pages_done, self._total(), message)
+        self._emit(kind, path, message)
+
+    def file_started(self, path: str, pages_done: int):
+        """开始处理一个文件"""
+        self.report(FILE_STARTED, pages_done, f"正在处理: {os.path.basename(path)}", path)
+
+    def enter(self, phase: str, pages_done: int, message: str = ''):
+        """进入新的阶段"""
+        self.phase = phase
+        self.report(PHASE, pages_done, message)
+
+    def advance(self, pages: int, path: Optional[str] = None):
+        """插入了若干页（页面粒度，只发布到总线）"""
+        self.pages_done += pages
+        self._emit(PAGES_DONE, path)
+
+    def read(self, size: int, path: Optional[str] = None):
+        """从磁盘读取了一个文件"""
+        self.bytes_read += size
+        self._emit(BYTES_READ, path)
+
+    def skipped(self, report: dict):
+        """跳过了一个文件"""
+        self._emit(FILE_SKIPPED, report['path'], report['error'])
+
+    def finish(self, message: str = "完成!"):
+        """合并完成"""
+        total = self._total()
+        self.phase = 'done'
+        self.report(FINISHED, total, message)
+        if self.bus:
+            self.bus.flush()
+
+    def cancelled(self, message: str = "已取消"):
+        """合并被取消"""
+        self.report(CANCELLED, self.pages_done, message)
+
+    def _emit(self, kind: str, path: Optional[str] = None, message: str = ''):
+        if self.bus:
+            self.bus.emit(ProgressEvent(
+                kind, self.pages_done, self._total(), self.bytes_read, self.phase,
+                path, message, time.time()
+            ))
+
+
+def json_lines_writer(stream: TextIO) -> Callable[[ProgressEvent], None]:
+    """
+    把事件写为 JSON Lines 的订阅者
+
+    Args:
+        stream: 文本输出流
+
+    Returns:
+        Callable: 可传给 ProgressBus.subscribe 的函数
+    """
+    def write(event: ProgressEvent):
+        stream.write(json.dumps(event._asdict(), ensure_ascii=False) + '\n')
+        stream.flush()
+    return write
@@ -0,0 +1,200 @@
+"""
+合并结果缓存
+以输入文件指纹和保存选项的哈希为键保存合并结果，相同输入再次合并时直接复制结果
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+from typing import List, Optional
+
+from .meta_cache import default_cache_dir
+
+
+# 指纹读取文件首尾各一段内容，与文件标识一起防止“修改时间未变但内容已变”的情况
+FINGERPRINT_BLOCK = 64 * 1024
+
+
+def file_fingerprint(pdf_path: str) -> dict:
+    """
+    计算文件的快速指纹
+
+    Args:
+        pdf_path: PDF文件路径
+
+    Returns:
+        dict: {path, size, mtime_ns, inode, digest}
+    """
+    st = os.stat(pdf_path)
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_BLOCK))
+        if st.st_size > FINGERPRINT_BLOCK:
+            f.seek(max(FINGERPRINT_BLOCK, st.st_size - FINGERPRINT_BLOCK))
+            digest.update(f.read(FINGERPRINT_BLOCK))
+    return {
+        'path': os.path.abspath(pdf_path),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'inode': st.st_ino,
+        'digest': digest.hexdigest(),
+    }
+
+
+class ResultCache:
+    """按总字节数LRU淘汰的合并结果缓存"""
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 max_bytes: int = 2 * 1024 * 1024 * 1024,
+                 use_hardlinks: bool = False):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录（默认位于用户缓存目录）
+            max_bytes: 缓存结果的总大小上限
+            use_hardlinks: 命中时优先以硬链接放置结果（同一文件系统上近乎零开销）
+        """
+        self.cache_dir = cache_dir or os.path.join(default_cache_dir(), 'results')
+        self.max_bytes = max_bytes
+        self.use_hardlinks = use_hardlinks
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, pdf_paths: List[str], options: dict) -> Optional[str]:
+        """
+        计算合并任务的缓存键
+
+        Args:
+            pdf_paths: 有序的输入文件路径
+            options: 影响输出内容的选项
+
+        Returns:
+            Optional[str]: 缓存键，输入不可读时返回 None
+        """
+        try:
+            fingerprints = [file_fingerprint(path) for path in pdf_paths]
+        except OSError:
+            return None
+        payload = json.dumps({'inputs': fingerprints, 'options': options}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_paths(self, key: str) -> tuple:
+        base = os.path.join(self.cache_dir, key)
+        return base + '.pdf', base + '.json'
+
+    def restore(self, key: Optional[str], output_path: str) -> Optional[List[dict]]:
+        """
+        命中时把缓存结果放置到输出路径
+
+        Args:
+            key: 缓存键
+            output_path: 输出文件路径
+
+        Returns:
+            Optional[List[dict]]: 命中时返回原合并中跳过的文件记录，未命中返回 None
+        """
+        if key is None:
+            return None
+        pdf_path, meta_path = self._entry_paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            # 缓存文件被截断或改动时不可信
+            if os.path.getsize(pdf_path) != meta['size']:
+                raise ValueError("缓存结果大小不一致")
+            self._place(pdf_path, output_path, self.use_hardlinks)
+            os.utime(pdf_path)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return meta.get('skipped', [])
+
+    def store(self, key: Optional[str], output_path: str, skipped: Optional[List[dict]] = None):
+        """
+        保存合并结果
+
+        Args:
+            key: 缓存键
+            output_path: 已生成的输出文件
+            skipped: 合并中跳过的文件记录，命中时随结果一起重新报告
+        """
+        if key is None:
+            return
+        try:
+            size = os.path.getsize(output_path)
+            if size > self.max_bytes:
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            pdf_path, meta_path = self._entry_paths(key)
+            # 写入缓存时总是复制，避免之后覆盖输出文件时破坏缓存
+            self._place(output_path, pdf_path, False)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'size': size, 'skipped': skipped or []}, f)
+            self._evict()
+        except OSError:
+            # 缓存写入失败不影响合并结果
+            pass
+
+    def _place(self, src: str, dst: str, link: bool):
+        """通过临时文件原子地把 src 放置到 dst"""
+        dst_dir = os.path.dirname(os.path.abspath(dst))
+        fd, tmp_path = tempfile.mkstemp(prefix='.pdfmerge-', suffix='.tmp', dir=dst_dir)
+        os.close(fd)
+        try:
+            linked = False
+            if link:
+                os.remove(tmp_path)
+                try:
+                    os.link(src, tmp_path)
+                    linked = True
+                except OSError:
+                    pass
+            if not linked:
+                shutil.copyfile(src, tmp_path)
+                # mkstemp 创建的文件权限为 0600，改为与来源相同（即正常合并写出的权限）
+                shutil.copymode(src, tmp_path)
+            os.replace(tmp_path, dst)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _evict(self):
+        """按最近使用时间淘汰，直到总大小不超过上限"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.pdf'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            for victim in (path, path[:-4] + '.json'):
+                try:
+                    os.remove(victim)
+                except OSError:
+                    pass
+            total -= size
+
+    def get_stats(self) -> dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            dict: {hits, misses}
+        """
+        return {'hits': self.hits, 'misses': self.misses}
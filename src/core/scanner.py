@@ -0,0 +1,159 @@
+"""
+目录扫描
+基于 os.scandir 按顺序流式产出PDF路径，可用多个线程预读子目录
+"""
+
+import os
+import re
+import fnmatch
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional
+
+
+SYMLINK_POLICIES = ('skip', 'files', 'follow')
+
+_DIGITS = re.compile(r'(\d+)')
+
+
+def natural_key(name: str) -> list:
+    """自然排序键：file2 排在 file10 之前"""
+    return [(0, int(part), '') if part.isdigit() else (1, 0, part)
+            for part in _DIGITS.split(name.lower()) if part]
+
+
+def name_key(name: str) -> str:
+    """按名称排序"""
+    return name
+
+
+def _matches(patterns: List[str], name: str, rel_path: str) -> bool:
+    """文件名或相对路径匹配任一模式（不区分大小写）"""
+    name = name.lower()
+    rel_path = rel_path.lower()
+    return any(fnmatch.fnmatchcase(name, p) or fnmatch.fnmatchcase(rel_path, p) for p in patterns)
+
+
+def _list_dir(path: str, dir_idents: bool = False) -> list:
+    """
+    列出目录，无法读取时返回空列表
+
+    Args:
+        path: 目录路径
+        dir_idents: 是否为所有子目录取 (st_dev, st_ino) 标识（默认只为链接目录取）
+
+    Returns:
+        list: [(名称, 路径, 是否目录, 是否符号链接, 标识)]
+    """
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_link = entry.is_symlink()
+                    is_dir = entry.is_dir(follow_symlinks=True)
+                    ident = None
+                    if is_dir and (is_link or dir_idents):
+                        st = entry.stat(follow_symlinks=True)
+                        ident = (st.st_dev, st.st_ino)
+                    entries.append((entry.name, entry.path, is_dir, is_link, ident))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return entries
+
+
+def scan_pdfs(root: str,
+              include: Optional[List[str]] = None,
+              exclude: Optional[List[str]] = None,
+              max_depth: Optional[int] = None,
+              symlinks: str = 'files',
+              order: str = 'name',
+              workers: int = 1) -> Iterator[str]:
+    """
+    按顺序流式扫描目录中的PDF文件
+
+    每个目录内的条目（文件和子目录）按名称排序后深度优先遍历，
+    因此无需先收集整棵目录树即可按最终顺序逐个产出路径。
+
+    Args:
+        root: 根目录
+        include: 文件名/相对路径需匹配的通配模式（默认 ['*.pdf']，不区分大小写）
+        exclude: 排除的通配模式，同时作用于文件和目录
+        max_depth: 最大递归深度（0 表示只扫描根目录，None 表示不限）
+        symlinks: 符号链接策略，'skip'(全部忽略)、'files'(包含链接文件但不进入链接目录)
+                  或 'follow'(全部跟随，自动避免循环)
+        order: 排序方式，'name'(按名称) 或 'natural'(自然排序)
+        workers: 预读子目录的线程数（1 表示不预读）
+
+    Yields:
+        str: PDF文件路径
+    """
+    if symlinks not in SYMLINK_POLICIES:
+        raise ValueError(f"未知的符号链接策略: {symlinks}")
+    sort_key = natural_key if order == 'natural' else name_key
+    include = [p.lower() for p in (include or ['*.pdf'])]
+    exclude = [p.lower() for p in (exclude or [])]
+
+    st = os.stat(root)
+    visited = {(st.st_dev, st.st_ino)}
+    pool = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    follow = symlinks == 'follow'
+
+    def listing(path):
+        return pool.submit(_list_dir, path, follow) if pool else path
+
+    def resolve(handle):
+        return handle.result() if pool else _list_dir(handle, follow)
+
+    stack = []
+    try:
+        # 栈中每一层是一个待处理条目的队列；子目录的列表在进入前已提交预读
+        stack = [(deque([(None, root, True, False, None, '', 0, listing(root))]))]
+        while stack:
+            level = stack[-1]
+            if not level:
+                stack.pop()
+                continue
+            name, path, is_dir, is_link, ident, rel, depth, handle = level.popleft()
+            if not is_dir:
+                yield path
+                continue
+
+            entries = []
+            for child_name, child_path, child_is_dir, child_is_link, child_ident in resolve(handle):
+                child_rel = f"{rel}/{child_name}" if rel else child_name
+                if exclude and _matches(exclude, child_name, child_rel):
+                    continue
+                if child_is_link and symlinks == 'skip':
+                    continue
+                if child_is_dir:
+                    if max_depth is not None and depth >= max_depth:
+                        continue
+                    if child_is_link and not follow:
+                        continue
+                    if follow:
+                        # 跟随链接时记录所有已访问目录，避免循环和重复扫描
+                        if child_ident in visited:
+                            continue
+                        visited.add(child_ident)
+                elif not _matches(include, child_name, child_rel):
+                    continue
+                entries.append((child_name, child_path, child_is_dir, child_is_link, child_ident, child_rel))
+
+            # 目录名后加分隔符参与排序，与按完整路径字符串排序的结果一致
+            entries.sort(key=lambda e: sort_key(e[0] + os.sep if e[2] else e[0]))
+            stack.append(deque(
+                (n, p, d, l, i, r, depth + 1, listing(p) if d else None)
+                for n, p, d, l, i, r in entries
+            ))
+    finally:
+        if pool:
+            # 提前结束遍历时丢弃尚未开始的预读
+            for level in stack:
+                for entry in level:
+                    if entry[7] is not None:
+                        entry[7].cancel()
+            pool.shutdown(wait=False)
@@ -0,0 +1,73 @@
+"""
+内存中的输入与输出
+输入可以是 bytes、memoryview 或可读的文件对象，通过 fitz.open(stream=...) 直接打开，不写临时文件；
+输出可以是可写的二进制文件对象（如 sys.stdout.buffer、上传流）
+"""
+
+import io
+import os
+import fitz  # PyMuPDF
+from typing import Union
+
+
+def is_stream(item) -> bool:
+    """输入是否为内存中的PDF数据或文件对象（而非路径）"""
+    return isinstance(item, (bytes, bytearray, memoryview)) or hasattr(item, 'read')
+
+
+def stream_data(item) -> Union[bytes, memoryview]:
+    """
+    取得输入的PDF数据，尽量不复制
+
+    bytes 和 memoryview 原样使用（合并完成前不应修改 memoryview 引用的内存）；
+    bytearray 复制一份，调用方之后修改或改变其大小不受影响；
+    文件对象（包括 BytesIO）与 read() 相同，从当前位置读到末尾
+
+    Args:
+        item: bytes、bytearray、memoryview 或可读的二进制文件对象
+
+    Returns:
+        bytes 或 memoryview: 可传给 fitz.open(stream=...) 的数据
+    """
+    if isinstance(item, (bytes, memoryview)):
+        return item
+    if isinstance(item, bytearray):
+        return bytes(item)
+    if isinstance(item, io.BytesIO):
+        # getvalue 与 BytesIO 共享数据（写时复制），不复制也不锁定调用方的缓冲区；
+        # getbuffer 会导出缓冲区，文档打开期间调用方无法改变其大小
+        data = item.getvalue()
+        start = item.tell()
+        item.seek(0, io.SEEK_END)
+        return memoryview(data)[start:] if start else data
+    return item.read()
+
+
+def open_stream(data: Union[bytes, memoryview]) -> fitz.Document:
+    """打开内存中的PDF数据（文档引用 data，不复制）"""
+    return fitz.open(stream=data, filetype='pdf')
+
+
+def is_output_stream(output) -> bool:
+    """输出是否为可写的文件对象（而非路径）"""
+    return not isinstance(output, (str, os.PathLike)) and hasattr(output, 'write')
+
+
+def save_pdf(doc: fitz.Document, output, **save_options):
+    """
+    保存文档到路径或可写的文件对象
+
+    fitz 会把带 name 属性的文件对象当作路径处理（sys.stdout.buffer 会被写入名为
+    "<stdout>" 的文件），因此文件对象一律先生成完整的数据再写入
+
+    Args:
+        doc: 待保存的文档
+        output: 输出路径或可写的二进制文件对象
+        save_options: 传给 fitz.Document.save 的选项
+    """
+    if is_output_stream(output):
+        output.write(doc.tobytes(**save_options))
+        if hasattr(output, 'flush'):
+            output.flush()
+    else:
+        doc.save(output, **save_options)
@@ -0,0 +1,174 @@
+"""
+PDF分级验证
+quick 只检查文件头、startxref 和结束标记，能低成本读取时顺带从交叉引用表取得页数；
+standard 完整打开文档；deep 额外加载每一页的内容以提前发现损坏
+"""
+
+import re
+from typing import Optional, Tuple
+
+import fitz  # PyMuPDF
+
+
+VALIDATION_LEVELS = ('quick', 'standard', 'deep')
+
+HEAD_BYTES = 1024
+TAIL_BYTES = 4096
+# 结束标记之后可能还有附加数据（签名工具、邮件网关等追加的内容），
+# 最后 TAIL_BYTES 中找不到 %%EOF 时在这一范围内再找一次
+MAX_TAIL_BYTES = 1024 * 1024
+OBJECT_BYTES = 4096
+# 沿 /Prev 链查找的最大增量更新次数
+MAX_XREF_SECTIONS = 32
+
+_LINEARIZED = re.compile(rb'/Linearized\s.*?/N\s+(\d+)', re.S)
+_STARTXREF = re.compile(rb'startxref\s+(\d+)')
+_ROOT = re.compile(rb'/Root\s+(\d+)\s+\d+\s+R')
+_PREV = re.compile(rb'/Prev\s+(\d+)')
+_PAGES = re.compile(rb'/Pages\s+(\d+)\s+\d+\s+R')
+_COUNT = re.compile(rb'/Count\s+(\d+)')
+
+
+def quick_inspect(pdf_path: str) -> Tuple[Optional[int], Optional[str]]:
+    """
+    不解析文档结构的快速检查
+
+    不比完整打开更严格：%%EOF 之后的附加数据超出 MAX_TAIL_BYTES 时不判定为无效，
+    返回 (None, None)，由合并时打开文档决定
+
+    Args:
+        pdf_path: PDF文件路径
+
+    Returns:
+        tuple: (页数或None(无法低成本读取), 错误信息或None)
+    """
+    with open(pdf_path, 'rb') as f:
+        head = f.read(HEAD_BYTES)
+        if b'%PDF-' not in head:
+            return None, "缺少 %PDF- 文件头"
+        size = f.seek(0, 2)
+        f.seek(max(0, size - TAIL_BYTES))
+        tail = f.read()
+        if b'%%EOF' not in tail and size > TAIL_BYTES:
+            f.seek(max(0, size - MAX_TAIL_BYTES))
+            tail = f.read()
+
+        if b'%%EOF' not in tail:
+            if size > MAX_TAIL_BYTES:
+                # 附加数据超出查找范围：不在这里判定，交给合并时打开文档
+                return None, None
+            return None, "缺少 %%EOF 结束标记"
+        matches = _STARTXREF.findall(tail)
+        if not matches:
+            return None, "缺少 startxref"
+        startxref = int(matches[-1])
+        if startxref >= size:
+            return None, "startxref 偏移超出文件范围"
+
+        # 线性化文件在文件头附近直接记录页数
+        linearized = _LINEARIZED.search(head)
+        if linearized:
+            return int(linearized.group(1)), None
+
+        try:
+            return _count_from_xref(f, startxref), None
+        except (ValueError, IndexError, OSError):
+            return None, None
+
+
+def _count_from_xref(f, startxref: int) -> Optional[int]:
+    """通过传统交叉引用表定位 Catalog 和 Pages 对象，读取 /Count"""
+    f.seek(startxref)
+    if f.read(4) != b'xref':
+        # 交叉引用流需要解压，不属于低成本路径
+        return None
+
+    root = _read_trailer_key(f, startxref, _ROOT)
+    if root is None:
+        return None
+    catalog = _read_object(f, _find_offset(f, startxref, root))
+    pages = _PAGES.search(catalog)
+    if not pages:
+        return None
+    pages_obj = _read_object(f, _find_offset(f, startxref, int(pages.group(1))))
+    count = _COUNT.search(pages_obj)
+    return int(count.group(1)) if count else None
+
+
+def _iter_sections(f, startxref: int):
+    """沿 /Prev 链依次产出每个交叉引用表的起始偏移"""
+    offset = startxref
+    for _ in range(MAX_XREF_SECTIONS):
+        yield offset
+        prev = _read_trailer_key(f, offset, _PREV)
+        if prev is None:
+            return
+        offset = prev
+
+
+def _read_trailer_key(f, offset: int, pattern):
+    """跳过交叉引用表的所有子段，读取其后 trailer 中的键"""
+    f.seek(offset)
+    f.readline()  # xref
+    while True:
+        pos = f.tell()
+        line = f.readline()
+        parts = line.split()
+        if len(parts) != 2 or not parts[0].isdigit():
+            break
+        f.seek(int(parts[1]) * 20, 1)
+    f.seek(pos)
+    trailer = f.read(OBJECT_BYTES)
+    if not trailer.lstrip().startswith(b'trailer'):
+        raise ValueError("缺少 trailer")
+    end = trailer.find(b'startxref')
+    match = pattern.search(trailer[:end] if end >= 0 else trailer)
+    return int(match.group(1)) if match else None
+
+
+def _find_offset(f, startxref: int, objnum: int) -> int:
+    """在交叉引用表（含增量更新）中查找对象偏移，表项为固定的20字节"""
+    for section in _iter_sections(f, startxref):
+        f.seek(section)
+        f.readline()  # xref
+        while True:
+            line = f.readline()
+            parts = line.split()
+            if len(parts) != 2 or not parts[0].isdigit():
+                break
+            start, count = int(parts[0]), int(parts[1])
+            if start <= objnum < start + count:
+                f.seek((objnum - start) * 20, 1)
+                entry = f.read(20).split()
+                if len(entry) >= 3 and entry[2] == b'n':
+                    return int(entry[0])
+                raise ValueError("对象已删除")
+            f.seek(count * 20, 1)
+    raise ValueError("未找到对象")
+
+
+def _read_object(f, offset: int) -> bytes:
+    """读取对象内容（截止到 endobj）"""
+    f.seek(offset)
+    data = f.read(OBJECT_BYTES)
+    end = data.find(b'endobj')
+    return data[:end] if end >= 0 else data
+
+
+def deep_check(doc: fitz.Document) -> Optional[str]:
+    """
+    加载每一页及其内容流
+
+    Args:
+        doc: 已打开的文档
+
+    Returns:
+        Optional[str]: 发现的第一个错误，没有错误时返回 None
+    """
+    for index in range(len(doc)):
+        try:
+            page = doc.load_page(index)
+            page.read_contents()
+        except Exception as e:
+            return f"第{index + 1}页损坏: {e}"
+    return None
@@ -5,9 +5,26 @@ PDF合并工具 - 命令行版本
 
 import sys
 import os
+import signal
 import argparse
+import itertools
+import threading
+from contextlib import contextmanager, nullcontext, redirect_stdout
 from pathlib import Path
-from core.merger import PdfMerger
+
+# PyMuPDF 的提示默认写到标准输出；-o - 时标准输出只能有PDF数据（须在导入 fitz 之前设置）
+os.environ.setdefault('PYMUPDF_MESSAGE', 'fd:2')
+
+from core.merger import PdfMerger, MERGE_PROFILES, STREAM_BATCH_BYTES
+from core.scanner import scan_pdfs, SYMLINK_POLICIES
+from core.meta_cache import MetadataCache
+from core.result_cache import ResultCache
+from core.page_ranges import split_page_spec
+from core.compression import COMPRESSION_CHOICES
+from core.prefetch import DEFAULT_PREFETCH_BYTES
+from core.isolation import IsolationLimits
+from core.progress import ProgressBus, ProgressEvent, FILE_SKIPPED, json_lines_writer
+from core.cancel import CancelToken, MergeCancelled
 
 
 def format_size(size_bytes: int) -> str:
@@ -20,6 +37,26 @@ def format_size(size_bytes: int) -> str:
         return f"{size_bytes / (1024 * 1024):.2f}MB"
 
 
+def parse_size(text: str) -> int:
+    """
+    解析带单位的大小，如 512M、2G、1024K、4096
+    
+    Args:
+        text: 大小字符串
+        
+    Returns:
+        int: 字节数
+    """
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    value = text.strip().upper().rstrip('B')
+    try:
+        if value and value[-1] in units:
+            return int(float(value[:-1]) * units[value[-1]])
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的大小: {text}")
+
+
 def progress_callback(current: int, total: int, message: str):
     """进度回调函数"""
     if total > 0:
@@ -32,25 +69,167 @@ def progress_callback(current: int, total: int, message: str):
         print(f'\r{message}', end='', flush=True)
 
 
-def find_pdfs_in_directory(directory: str) -> list:
+# 进度条中各阶段的名称
+PHASE_LABELS = {
+    'insert': '合并',
+    'sharded': '分片合并',
+    'checkpoint': '保存检查点',
+    'save': '保存',
+    'done': '完成',
+}
+
+
+def render_progress(event: ProgressEvent):
+    """进度事件的命令行显示：页数进度条、当前阶段和正在处理的文件"""
+    if event.kind == FILE_SKIPPED:
+        return  # 跳过的文件在合并结束后统一列出
+    detail = event.message
+    if not detail and event.path:
+        detail = os.path.basename(event.path)
+    label = PHASE_LABELS.get(event.phase, event.phase)
+    total = event.total_pages
+    if total > 0:
+        bar_length = 40
+        filled = int(bar_length * min(event.pages_done, total) / total)
+        bar = '█' * filled + '░' * (bar_length - filled)
+        line = f'进度: [{bar}] {event.pages_done}/{total}页 {label} - {detail}'
+    else:
+        line = f'{label} - {detail}'
+    # 清除上一行较长的残留内容
+    print(f'\r{line}\033[K', end='', flush=True)
+
+
+def open_progress(args) -> tuple:
+    """
+    创建进度总线，订阅命令行进度条和 --progress-log
+    
+    Returns:
+        tuple: (进度总线, 需在结束时关闭的日志文件或None)
+    """
+    progress = ProgressBus(args.progress_interval)
+    progress.subscribe(render_progress)
+    progress_log = None
+    if args.progress_log == '-':
+        progress.subscribe(json_lines_writer(sys.stderr))
+    elif args.progress_log:
+        progress_log = open(args.progress_log, 'w', encoding='utf-8')
+        progress.subscribe(json_lines_writer(progress_log))
+    return progress, progress_log
+
+
+@contextmanager
+def cancel_on_interrupt(cancel: CancelToken):
+    """
+    第一次 Ctrl-C 请求取消，让合并在下一个文件或页面块处停止并清理；
+    第二次 Ctrl-C 立即中断
+    
+    Args:
+        cancel: 取消令牌
+    """
+    if threading.current_thread() is not threading.main_thread():
+        # 只有主线程可以设置信号处理函数
+        yield
+        return
+    
+    def on_interrupt(signum, frame):
+        if cancel.cancelled:
+            raise KeyboardInterrupt
+        cancel.cancel()
+        print("\n⏹  正在取消...（再按一次 Ctrl-C 立即退出）", flush=True)
+    
+    previous = signal.signal(signal.SIGINT, on_interrupt)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+
+def find_pdfs_in_directory(directory: str, **scan_options) -> list:
     """
     在目录中查找所有PDF文件
     
     Args:
         directory: 目录路径
+        scan_options: 传给 scan_pdfs 的扫描选项
         
     Returns:
         list: PDF文件路径列表（已排序）
     """
-    pdf_files = []
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.lower().endswith('.pdf'):
-                pdf_files.append(os.path.join(root, file))
+    return list(scan_pdfs(directory, **scan_options))
+
+
+def iter_input_pdfs(inputs: list, scan_options: dict):
+    """
+    按顺序流式产出输入中的PDF文件，目录在扫描的同时即可开始验证
+    
+    Args:
+        inputs: 文件或目录路径列表（需已确认存在）
+        scan_options: 传给 scan_pdfs 的扫描选项
+        
+    Yields:
+        str、tuple 或 bytes: PDF文件路径，带页码规格的文件为 (路径, 页码规格)，
+        - 为从标准输入读入的PDF数据
+    """
+    for input_path in inputs:
+        if input_path == '-':
+            # 标准输入中的一个PDF，整体读入内存后直接打开，不写临时文件
+            yield sys.stdin.buffer.read()
+            continue
+        input_path, page_spec = split_page_spec(input_path)
+        if page_spec:
+            yield input_path, page_spec
+        elif os.path.isdir(input_path):
+            # 如果是目录，查找所有PDF
+            found = 0
+            for path in scan_pdfs(input_path, **scan_options):
+                found += 1
+                yield path
+            if found:
+                print(f"📁 在目录 '{input_path}' 中找到 {found} 个PDF文件")
+            else:
+                print(f"⚠️  警告: 目录 '{input_path}' 中没有找到PDF文件")
+        elif input_path.lower().endswith('.pdf'):
+            # 如果是文件，直接添加
+            yield input_path
+        else:
+            print(f"⚠️  警告: '{input_path}' 不是PDF文件，已跳过")
+
+
+def read_path_list(stream, chunk_size: int = 64 * 1024):
+    """
+    从二进制流中逐个读取路径，读到一个就产出一个（不等待输入结束）
+    
+    以先出现的分隔符决定格式：NUL 分隔（find -print0）或换行分隔；空项被忽略
     
-    # 按文件名排序
-    pdf_files.sort()
-    return pdf_files
+    Args:
+        stream: 二进制输入流，如 sys.stdin.buffer
+        chunk_size: 每次读取的字节数
+        
+    Yields:
+        str: 路径
+    """
+    # read1 读到已有的数据即返回，管道中的输入无需凑满一块
+    read = getattr(stream, 'read1', stream.read)
+    buffer = b''
+    sep = None
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+        if sep is None:
+            nul, newline = buffer.find(b'\0'), buffer.find(b'\n')
+            if nul < 0 and newline < 0:
+                continue
+            sep = b'\0' if newline < 0 or 0 <= nul < newline else b'\n'
+        *items, buffer = buffer.split(sep)
+        for item in items:
+            item = item.rstrip(b'\r') if sep == b'\n' else item
+            if item:
+                yield os.fsdecode(item)
+    buffer = buffer.rstrip(b'\r\n')
+    if buffer:
+        yield os.fsdecode(buffer)
 
 
 def run_cli(argv=None):
@@ -66,30 +245,251 @@ def run_cli(argv=None):
   # 合并文件夹中的所有PDF
   python main.py /path/to/pdf/folder
   
+  # 只合并部分页面（第1-5页、第9页、第20页到末尾；扫描件的奇数页）
+  python main.py report.pdf:1-5,9,20- scan.pdf:odd
+  
   # 指定输出文件名
   python main.py file1.pdf file2.pdf -o my_merged.pdf
   
   # 不压缩输出文件（更快但文件更大）
   python main.py file1.pdf file2.pdf --no-compress
+  
+  # 压缩数据流但不做耗时的重复对象合并（大输出时比 smallest 快很多）
+  python main.py /path/to/pdf/folder --compression balanced
+  
+  # 查看耗时分布并导出跟踪文件（可在 ui.perfetto.dev 打开）
+  python main.py /path/to/pdf/folder --profile --trace trace.json
+  
+  # 超大合并时限制内存占用
+  python main.py /path/to/pdf/folder --max-memory 512M
+  
+  # 使用8个线程并发验证（适合网络存储上的大量文件）
+  python main.py /path/to/pdf/folder --jobs 8
+  
+  # 网络存储上加大预读预算，让读取与合并重叠
+  python main.py /mnt/share/pdfs --prefetch 256M
+  
+  # 超长合并：中断（内存不足、容器被终止、Ctrl-C）后再次运行同一命令即从检查点继续
+  python main.py /path/to/10000-pdfs -o all.pdf --resume
+  
+  # 把进度事件写入 JSON Lines 文件，供其他程序跟踪
+  python main.py /path/to/pdf/folder --progress-log progress.jsonl
+  
+  # 处理来源不可信的上传文件：每个文件限时30秒、内存1G
+  python main.py /srv/uploads --isolate --file-timeout 30 --file-memory 1G
+  
+  # 边查找边合并（第一个文件在 find 结束前就开始合并）
+  find /data -name '*.pdf' -print0 | python main.py --files-from - -o all.pdf
+  
+  # 管道中使用：从标准输入读入封面，合并后写到标准输出，不产生临时文件
+  curl -s https://example.com/cover.pdf | python main.py - body.pdf -o - | aws s3 cp - s3://bucket/out.pdf
         """
     )
     
     parser.add_argument(
         'inputs',
-        nargs='+',
-        help='PDF文件路径或包含PDF的文件夹路径'
+        nargs='*',
+        help='PDF文件路径或包含PDF的文件夹路径；文件后可加页码选择，如 report.pdf:1-5,9,20- 或 scan.pdf:odd；'
+             '- 表示从标准输入读入一个PDF'
+    )
+    
+    parser.add_argument(
+        '--files-from',
+        metavar='FILE',
+        default=None,
+        help='从文件读取更多输入（- 表示标准输入），每行一个或以 NUL 分隔（如 find -print0）；'
+             '边读取边验证和合并，不必等待输入列完（不支持 --resume 和 --isolate，忽略 --merge-mode）'
     )
     
     parser.add_argument(
         '-o', '--output',
         default='merged_output.pdf',
-        help='输出文件名（默认: merged_output.pdf）'
+        help='输出文件名，- 表示写到标准输出（提示信息改写到标准错误）（默认: merged_output.pdf）'
+    )
+    
+    parser.add_argument(
+        '--compression',
+        choices=COMPRESSION_CHOICES,
+        default='auto',
+        help='压缩等级: fastest(不压缩)、balanced(压缩数据流，不合并重复对象)、smallest(最大压缩)、'
+             'auto(小规模输入用 smallest，否则用 balanced)（默认: auto）'
     )
     
     parser.add_argument(
         '--no-compress',
         action='store_true',
-        help='不压缩输出文件（更快但文件更大）'
+        help='不压缩输出文件，等同于 --compression fastest（更快但文件更大）'
+    )
+    
+    parser.add_argument(
+        '--no-dedupe',
+        action='store_true',
+        help='不合并各文件中相同的字体和图片（默认在 balanced 等级和流式合并时启用）'
+    )
+    
+    parser.add_argument(
+        '--include',
+        action='append',
+        metavar='GLOB',
+        help='扫描目录时只包含匹配的文件（可多次指定，默认: *.pdf）'
+    )
+    
+    parser.add_argument(
+        '--exclude',
+        action='append',
+        metavar='GLOB',
+        help='扫描目录时排除匹配的文件或子目录（可多次指定）'
+    )
+    
+    parser.add_argument(
+        '--max-depth',
+        type=int,
+        default=None,
+        metavar='N',
+        help='扫描目录的最大深度（0 表示不进入子目录，默认不限）'
+    )
+    
+    parser.add_argument(
+        '--symlinks',
+        choices=SYMLINK_POLICIES,
+        default='files',
+        help='符号链接策略: skip(忽略)、files(包含链接文件但不进入链接目录)、follow(全部跟随)（默认: files）'
+    )
+    
+    parser.add_argument(
+        '--sort',
+        choices=['name', 'natural'],
+        default='name',
+        help='目录内文件的排序方式: name(按名称)、natural(自然排序，file2 在 file10 之前)（默认: name）'
+    )
+    
+    parser.add_argument(
+        '--validate',
+        choices=['quick', 'standard', 'deep'],
+        default='standard',
+        help='验证级别: quick(只检查文件结构，适合可信输入)、standard(完整打开)、'
+             'deep(额外加载每一页以提前发现损坏)（默认: standard）'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        metavar='N',
+        help='并发扫描和验证的工作数（默认: 1，即串行）'
+    )
+    
+    parser.add_argument(
+        '--process-pool',
+        action='store_true',
+        help='使用进程池而非线程池并发验证（适合解析开销大的文件）'
+    )
+    
+    parser.add_argument(
+        '--merge-mode',
+        choices=['auto', 'serial', 'sharded'],
+        default='auto',
+        help='合并方式: auto(按规模自动选择)、serial(单进程)、sharded(分片并行)（默认: auto）'
+    )
+    
+    parser.add_argument(
+        '--merge-profile',
+        choices=list(MERGE_PROFILES),
+        default='full',
+        help='合并配置: full(复制链接、注释和表单)、lean(不复制链接和注释，更快)、'
+             'pages-only(只复制页面内容)（默认: full）'
+    )
+    
+    parser.add_argument(
+        '--merge-workers',
+        type=int,
+        default=None,
+        metavar='N',
+        help='分片并行合并的最大进程数（默认: CPU核数）'
+    )
+    
+    parser.add_argument(
+        '--max-memory',
+        type=parse_size,
+        default=None,
+        metavar='SIZE',
+        help='流式合并的内存上限，如 512M、2G（分段写入输出，适合超大合并）'
+    )
+    
+    parser.add_argument(
+        '--prefetch',
+        type=parse_size,
+        default=DEFAULT_PREFETCH_BYTES,
+        metavar='SIZE',
+        help='合并时后台预读后续文件的内存预算，如 256M（0 表示不预读，默认: 64M）'
+    )
+    
+    parser.add_argument(
+        '--isolate',
+        action='store_true',
+        help='在独立进程中解析每个文件，卡死、崩溃或占用过多内存的文件被跳过而不影响合并'
+    )
+    
+    parser.add_argument(
+        '--file-timeout',
+        type=float,
+        default=IsolationLimits().timeout,
+        metavar='SECONDS',
+        help='隔离模式下单个文件的处理时限（默认: 60）'
+    )
+    
+    parser.add_argument(
+        '--file-memory',
+        type=parse_size,
+        default=None,
+        metavar='SIZE',
+        help='隔离模式下单个文件可使用的内存上限，如 1G（默认不限）'
+    )
+    
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='可恢复模式：分段合并并在输出文件旁保存检查点，中断后以相同参数再次运行即从断点继续'
+    )
+    
+    parser.add_argument(
+        '--progress-interval',
+        type=float,
+        default=0.1,
+        metavar='SECONDS',
+        help='进度刷新的最小间隔，期间只显示最新的进度（默认: 0.1）'
+    )
+    
+    parser.add_argument(
+        '--progress-log',
+        metavar='FILE',
+        default=None,
+        help='把进度事件以 JSON Lines 格式写入文件（- 表示标准错误输出），供其他程序读取'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='不使用元数据缓存（每个文件都重新验证）'
+    )
+    
+    parser.add_argument(
+        '--result-cache',
+        action='store_true',
+        help='缓存合并结果，相同输入和选项再次合并时直接复制结果（每次未命中需多写一份输出）'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='显示各阶段和各文件的耗时'
+    )
+    
+    parser.add_argument(
+        '--trace',
+        metavar='FILE',
+        default=None,
+        help='导出 Chrome/Perfetto 跟踪文件（JSON）'
     )
     
     parser.add_argument(
@@ -99,51 +499,86 @@ def run_cli(argv=None):
     )
     
     args = parser.parse_args(argv)
-    
-    # 收集所有PDF文件
-    pdf_files = []
+    if not args.inputs and not args.files_from:
+        parser.error("需要至少一个输入，或使用 --files-from 指定输入列表")
+    if '-' in args.inputs and args.files_from == '-':
+        parser.error("标准输入不能同时用作输入PDF和 --files-from 的路径列表")
+    if args.output == '-' and (args.files_from or args.resume or args.max_memory):
+        parser.error("--files-from、--resume 和 --max-memory 需要输出到文件")
+    # -o -：PDF 写到标准输出，提示信息改写到标准错误
+    args.output_stream = sys.stdout.buffer if args.output == '-' else None
+    cancel = CancelToken()
+    with cancel_on_interrupt(cancel), \
+            (redirect_stdout(sys.stderr) if args.output_stream else nullcontext()):
+        try:
+            return merge_from_args(args, cancel)
+        except MergeCancelled:
+            print("\n\n⏹  已取消")
+            if args.resume:
+                print("💾 已完成的检查点已保留，再次运行同一命令即可继续")
+            return 130
+
+
+def merge_from_args(args, cancel: CancelToken) -> int:
+    """按命令行参数扫描、验证并合并，返回退出码"""
+    # 先确认所有输入都存在，再开始扫描
     for input_path in args.inputs:
-        if os.path.isdir(input_path):
-            # 如果是目录，查找所有PDF
-            found_pdfs = find_pdfs_in_directory(input_path)
-            if found_pdfs:
-                print(f"📁 在目录 '{input_path}' 中找到 {len(found_pdfs)} 个PDF文件")
-                pdf_files.extend(found_pdfs)
-            else:
-                print(f"⚠️  警告: 目录 '{input_path}' 中没有找到PDF文件")
-        elif os.path.isfile(input_path):
-            # 如果是文件，直接添加
-            if input_path.lower().endswith('.pdf'):
-                pdf_files.append(input_path)
-            else:
-                print(f"⚠️  警告: '{input_path}' 不是PDF文件，已跳过")
-        else:
+        input_path, _ = split_page_spec(input_path)
+        if input_path != '-' and not os.path.exists(input_path):
             print(f"❌ 错误: '{input_path}' 不存在")
             return 1
     
-    if not pdf_files:
-        print("❌ 错误: 没有找到可合并的PDF文件")
-        return 1
+    scan_options = {
+        'include': args.include,
+        'exclude': args.exclude,
+        'max_depth': args.max_depth,
+        'symlinks': args.symlinks,
+        'order': args.sort,
+        'workers': args.jobs,
+    }
+    if args.files_from:
+        return stream_from_args(args, scan_options, cancel)
     
     # 创建合并器
-    print(f"\n🔍 正在验证 {len(pdf_files)} 个PDF文件...")
-    merger = PdfMerger()
+    print("\n🔍 正在扫描并验证PDF文件...")
+    profile = args.profile or bool(args.trace)
+    merger = PdfMerger(
+        meta_cache=None if args.no_cache else MetadataCache(),
+        result_cache=ResultCache() if args.result_cache else None,
+        profile=profile,
+        prefetch_bytes=args.prefetch
+    )
     
     # 添加文件并显示信息
-    results = merger.add_files(pdf_files)
+    results = merger.add_files(
+        iter_input_pdfs(args.inputs, scan_options),
+        jobs=args.jobs,
+        executor='process' if args.process_pool else 'thread',
+        level=args.validate,
+        cancel=cancel
+    )
     
     # 显示文件列表
     if args.verbose:
+        meta_stats = merger.get_meta_cache_stats()
+        if meta_stats is not None:
+            print(f"🗂  元数据缓存: 命中 {meta_stats['hits']} / 未命中 {meta_stats['misses']}")
         print("\n文件列表:")
         print("-" * 80)
         for idx, info in enumerate(results, 1):
             status = "✅" if info['valid'] else "❌"
             size = format_size(info['size'])
             pages = f"{info['pages']}页" if info['valid'] else info['error']
+            if info['valid'] and info.get('page_spec'):
+                pages = f"{info['pages']}/{info['doc_pages']}页 ({info['page_spec']})"
             filename = os.path.basename(info['path'])
             print(f"{status} {idx:2d}. {filename:40s} {size:>10s} {pages}")
         print("-" * 80)
     
+    if not results:
+        print("❌ 错误: 没有找到可合并的PDF文件")
+        return 1
+    
     # 检查是否有有效文件
     valid_count = sum(1 for r in results if r['valid'])
     if valid_count == 0:
@@ -156,26 +591,121 @@ def run_cli(argv=None):
     # 开始合并
     print(f"\n🔄 开始合并到 '{args.output}'...")
     
+    progress, progress_log = open_progress(args)
     try:
         success = merger.merge(
-            args.output,
-            progress_callback=progress_callback,
-            compress=not args.no_compress
+            args.output_stream or args.output,
+            progress=progress,
+            compression='fastest' if args.no_compress else args.compression,
+            mode=args.merge_mode,
+            workers=args.merge_workers,
+            max_memory=args.max_memory,
+            merge_profile=args.merge_profile,
+            dedupe=False if args.no_dedupe else None,
+            isolation=IsolationLimits(args.file_timeout, args.file_memory) if args.isolate else None,
+            resume=args.resume,
+            cancel=cancel
         )
         
         if success:
-            output_size = os.path.getsize(args.output)
-            print(f"\n\n✅ 合并成功!")
-            print(f"📄 输出文件: {args.output}")
-            print(f"📦 文件大小: {format_size(output_size)}")
+            print_merge_report(args, merger)
             return 0
         else:
             print("\n\n❌ 合并失败")
             return 1
             
+    except MergeCancelled:
+        raise
+    except Exception as e:
+        print(f"\n\n❌ 合并过程中出错: {e}")
+        return 1
+    finally:
+        if progress_log:
+            progress_log.close()
+
+
+def stream_from_args(args, scan_options: dict, cancel: CancelToken) -> int:
+    """--files-from：边读取输入列表边验证和合并，返回退出码"""
+    if args.resume or args.isolate:
+        print("❌ 错误: --files-from 不能与 --resume 或 --isolate 同时使用")
+        return 1
+    
+    merger = PdfMerger(profile=args.profile or bool(args.trace))
+    source = sys.stdin.buffer if args.files_from == '-' else open(args.files_from, 'rb')
+    entries = itertools.chain(args.inputs, read_path_list(source))
+    print(f"\n🔄 边读取边合并到 '{args.output}'...")
+    
+    progress, progress_log = open_progress(args)
+    merged = 0
+    pages = 0
+    invalid = []
+    try:
+        for info in merger.merge_iter(
+                iter_input_pdfs(entries, scan_options),
+                args.output,
+                progress=progress,
+                compression='fastest' if args.no_compress else args.compression,
+                merge_profile=args.merge_profile,
+                dedupe=False if args.no_dedupe else None,
+                level=args.validate,
+                batch_bytes=args.max_memory or STREAM_BATCH_BYTES,
+                cancel=cancel):
+            if info['valid']:
+                merged += 1
+                pages += info['pages']
+            else:
+                invalid.append(info)
+    except MergeCancelled:
+        raise
     except Exception as e:
         print(f"\n\n❌ 合并过程中出错: {e}")
         return 1
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if progress_log:
+            progress_log.close()
+    
+    # 插入时失败的文件已在跳过列表中显示
+    skipped = {report['path'] for report in merger.get_skipped_files()}
+    invalid = [info for info in invalid if info['path'] not in skipped]
+    print_merge_report(args, merger)
+    print(f"📊 合并了 {merged} 个文件，共 {pages} 页")
+    if invalid:
+        print(f"❌ {len(invalid)} 个文件无效:")
+        for info in invalid:
+            print(f"   - {info['path']}: {info['error']}")
+    return 0
+
+
+def print_merge_report(args, merger: PdfMerger):
+    """合并成功后显示输出文件、跳过的文件、剖析结果和统计"""
+    print(f"\n\n✅ 合并成功!")
+    if args.output_stream:
+        print("📄 已写到标准输出")
+    else:
+        print(f"📄 输出文件: {args.output}")
+        print(f"📦 文件大小: {format_size(os.path.getsize(args.output))}")
+    skipped = merger.get_skipped_files()
+    if skipped:
+        print(f"⚠️  跳过了 {len(skipped)} 个文件:")
+        for report in skipped:
+            print(f"   - [{report['reason']}] {report['path']}: {report['error']}")
+    if args.profile:
+        print(f"\n⏱  性能剖析\n{merger.profiler.format_report()}")
+    if args.trace:
+        merger.profiler.export_chrome_trace(args.trace)
+        print(f"🧭 跟踪文件: {args.trace}")
+    if args.verbose:
+        stats = merger.get_cache_stats()
+        print(f"🗂  文档缓存: 命中 {stats['hits']} / 未命中 {stats['misses']} / 淘汰 {stats['evictions']}")
+        result_stats = merger.get_result_cache_stats()
+        if result_stats is not None:
+            print(f"🗂  结果缓存: 命中 {result_stats['hits']} / 未命中 {result_stats['misses']}")
+        dedup_stats = merger.get_dedup_stats()
+        if dedup_stats is not None:
+            print(f"♻️  资源去重: 合并 {dedup_stats['duplicates']} 个重复对象，"
+                  f"节省 {format_size(dedup_stats['bytes_saved'])}")
 
 
 def main():
@@ -0,0 +1,143 @@
+"""
+文件浏览器的目录列表
+一次 os.scandir 取得名称、类型和修改时间，按目录 mtime 缓存，排序只作用于缓存结果
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+
+class DirEntry(NamedTuple):
+    """目录列表中的一项"""
+    name: str
+    path: str
+    is_dir: bool
+    mtime: float
+
+
+def list_directory(path: str) -> List[DirEntry]:
+    """
+    列出目录中的子目录和PDF文件（忽略隐藏项）
+
+    Args:
+        path: 目录路径
+
+    Returns:
+        List[DirEntry]: 未排序的条目
+
+    Raises:
+        OSError: 目录无法读取
+    """
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name.startswith('.'):
+                continue
+            try:
+                is_dir = entry.is_dir()
+                if not is_dir and not (entry.name.lower().endswith('.pdf') and entry.is_file()):
+                    continue
+                entries.append(DirEntry(entry.name, entry.path, is_dir, entry.stat().st_mtime))
+            except OSError:
+                continue
+    return entries
+
+
+def sort_entries(entries: List[DirEntry], order: str = 'name') -> List[DirEntry]:
+    """
+    排序：目录在前，按名称（不区分大小写）或修改时间（新的在前）
+
+    Args:
+        entries: 条目列表
+        order: 'name' 或 'mtime'
+
+    Returns:
+        List[DirEntry]: 排序后的新列表
+    """
+    if order == 'mtime':
+        key = lambda e: (not e.is_dir, -e.mtime)
+    else:
+        key = lambda e: (not e.is_dir, e.name.lower())
+    return sorted(entries, key=key)
+
+
+class DirectoryListingCache:
+    """按目录 mtime 失效的目录列表缓存（LRU），可在工作线程中使用"""
+
+    def __init__(self, max_dirs: int = 32):
+        """
+        初始化缓存
+
+        Args:
+            max_dirs: 最多缓存的目录数
+        """
+        self.max_dirs = max_dirs
+        self._entries = OrderedDict()  # path -> (目录 mtime_ns, 条目列表)
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Optional[List[DirEntry]]:
+        """
+        获取仍然有效的缓存列表
+
+        目录中增删或重命名条目会改变目录自身的 mtime，此时缓存失效。
+
+        Args:
+            path: 目录路径
+
+        Returns:
+            Optional[List[DirEntry]]: 缓存的条目，未命中时返回 None
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            cached = self._entries.get(key)
+        if cached is None:
+            return None
+        try:
+            mtime_ns = os.stat(key).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        with self._lock:
+            if mtime_ns != cached[0]:
+                self._entries.pop(key, None)
+                return None
+            self._entries.move_to_end(key)
+        return cached[1]
+
+    def load(self, path: str) -> List[DirEntry]:
+        """
+        重新读取目录并写入缓存
+
+        Args:
+            path: 目录路径
+
+        Returns:
+            List[DirEntry]: 条目列表
+
+        Raises:
+            OSError: 目录无法读取
+        """
+        key = os.path.abspath(path)
+        # 先取目录 mtime 再列目录：列目录期间发生的变化会在下次 get 时被发现
+        mtime_ns = os.stat(key).st_mtime_ns
+        entries = list_directory(key)
+        with self._lock:
+            self._entries[key] = (mtime_ns, entries)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_dirs:
+                self._entries.popitem(last=False)
+        return entries
+
+    def invalidate(self, path: Optional[str] = None):
+        """
+        使缓存失效
+
+        Args:
+            path: 目录路径，None 表示全部
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
@@ -0,0 +1,121 @@
+"""
+合并列表的数据模型
+有序集合：保持添加顺序，O(1) 判重；批量移动/删除返回受影响的下标，界面只更新这些行
+"""
+
+import os
+from typing import Iterable, List, Tuple
+
+
+def path_key(path: str) -> str:
+    """判重用的规范化路径（同一文件的不同写法视为同一项）"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+class FileListModel:
+    """有序、无重复的文件路径列表"""
+
+    def __init__(self, paths: Iterable[str] = ()):
+        self._items = []
+        self._keys = set()
+        self.extend(paths)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def __contains__(self, path) -> bool:
+        return path_key(path) in self._keys
+
+    def paths(self) -> List[str]:
+        """当前列表的快照"""
+        return list(self._items)
+
+    def extend(self, paths: Iterable[str]) -> List[str]:
+        """
+        追加文件，已存在的（包括本批次内重复的）跳过
+
+        Args:
+            paths: 文件路径
+
+        Returns:
+            List[str]: 实际追加的路径
+        """
+        added = []
+        for path in paths:
+            key = path_key(path)
+            if key in self._keys:
+                continue
+            self._keys.add(key)
+            self._items.append(path)
+            added.append(path)
+        return added
+
+    def remove(self, indices: Iterable[int]) -> List[int]:
+        """
+        删除指定下标的文件
+
+        Args:
+            indices: 下标
+
+        Returns:
+            List[int]: 实际删除的下标（升序）
+        """
+        removed = sorted({i for i in indices if 0 <= i < len(self._items)})
+        if not removed:
+            return []
+        drop = set(removed)
+        for i in removed:
+            self._keys.discard(path_key(self._items[i]))
+        self._items = [p for i, p in enumerate(self._items) if i not in drop]
+        return removed
+
+    def clear(self):
+        """清空列表"""
+        self._items = []
+        self._keys = set()
+
+    def move_up(self, indices: Iterable[int]) -> Tuple[List[int], List[int]]:
+        """
+        将选中项整体上移一位，已到顶部的连续块保持不动
+
+        Args:
+            indices: 选中的下标
+
+        Returns:
+            tuple: (内容发生变化的下标, 移动后的选中下标)
+        """
+        return self._move(sorted(set(indices)), -1)
+
+    def move_down(self, indices: Iterable[int]) -> Tuple[List[int], List[int]]:
+        """
+        将选中项整体下移一位，已到底部的连续块保持不动
+
+        Args:
+            indices: 选中的下标
+
+        Returns:
+            tuple: (内容发生变化的下标, 移动后的选中下标)
+        """
+        return self._move(sorted(set(indices), reverse=True), 1)
+
+    def _move(self, ordered: List[int], step: int) -> Tuple[List[int], List[int]]:
+        # 按移动方向从前往后处理；目标位置已被选中项占据（被堵住）时原地不动
+        changed = set()
+        selection = set()
+        for i in ordered:
+            if not 0 <= i < len(self._items):
+                continue
+            target = i + step
+            if 0 <= target < len(self._items) and target not in selection:
+                self._items[i], self._items[target] = self._items[target], self._items[i]
+                changed.update((i, target))
+                selection.add(target)
+            else:
+                selection.add(i)
+        return sorted(changed), sorted(selection)
@@ -14,12 +14,33 @@ except Exception:
 
 import threading
 
+from ui.dir_listing import DirectoryListingCache, sort_entries
+from ui.file_list_model import FileListModel, path_key
+from ui.merge_session import MergeSession
+from core.merger import PdfMerger
+from core.meta_cache import MetadataCache
+from core.progress import ProgressBus
+from core.cancel import CancelToken, MergeCancelled
+
+# 压缩等级（显示名称 -> core.compression 中的等级）
+COMPRESSION_LABELS = {"自动": "auto", "最快": "fastest", "均衡": "balanced", "最小": "smallest"}
+
+# 文件浏览器每次事件循环插入的行数，避免大目录一次性插入阻塞界面
+ROW_CHUNK = 500
+
 
 class MainWindow:
     def __init__(self, root):
         self.root = root
-        self.file_list = []
+        self.file_list = FileListModel()
         self.last_dir = os.path.expanduser("~")
+        self.listing_cache = DirectoryListingCache()
+        # 文件加入后即在后台验证，结果显示在列表中并在合并时复用；
+        # 窗口长期打开，不保留文档句柄（否则占用文件，且合并时可能读到旧内容）
+        self.session = MergeSession(
+            PdfMerger(max_open_docs=0, meta_cache=MetadataCache()),
+            on_validated=lambda infos: self.root.after(0, self._show_validation, infos)
+        )
         self._set_font()
         self._build_ui()
 
@@ -60,13 +81,32 @@ class MainWindow:
         tk.Button(btn_frame, text="上移", command=self.move_up).pack(side=tk.LEFT, padx=5)
         tk.Button(btn_frame, text="下移", command=self.move_down).pack(side=tk.LEFT, padx=5)
 
-        # 文件列表
+        # 文件列表：名称 + 验证结果（页数、大小、状态），行 iid 为规范化路径
         # 主文件列表，显式使用选定字体以改善中文显示
         try:
-            self.listbox = tk.Listbox(self.root, selectmode=tk.EXTENDED, width=60, height=10, font=self.ui_font)
+            linespace = self.ui_font.metrics("linespace")
+            style = ttk.Style(self.root)
+            style.configure("Files.Treeview", rowheight=max(linespace + 8, 24), font=self.ui_font)
+            style.configure("Files.Treeview.Heading", font=self.ui_font)
+            tree_style = "Files.Treeview"
         except Exception:
-            self.listbox = tk.Listbox(self.root, selectmode=tk.EXTENDED, width=60, height=10)
-        self.listbox.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+            tree_style = "Treeview"
+        list_frame = tk.Frame(self.root)
+        list_frame.pack(padx=10, pady=5, fill=tk.BOTH, expand=True)
+        self.file_tree = ttk.Treeview(list_frame, columns=("name", "pages", "size", "status"), show="headings",
+                                      selectmode="extended", style=tree_style, height=10)
+        self.file_tree.heading("name", text="文件名")
+        self.file_tree.heading("pages", text="页数")
+        self.file_tree.heading("size", text="大小")
+        self.file_tree.heading("status", text="状态")
+        self.file_tree.column("name", width=360, anchor="w")
+        self.file_tree.column("pages", width=60, anchor="e")
+        self.file_tree.column("size", width=90, anchor="e")
+        self.file_tree.column("status", width=160, anchor="w")
+        scrollbar = tk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.file_tree.yview)
+        self.file_tree.configure(yscrollcommand=scrollbar.set)
+        self.file_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # （已隐藏拖拽提示）
 
@@ -78,20 +118,27 @@ class MainWindow:
         self.output_entry.pack(side=tk.LEFT, padx=5)
         self.output_entry.insert(0, "merged_output.pdf")
         tk.Button(out_frame, text="浏览", command=self.browse_output).pack(side=tk.LEFT)
+        tk.Label(out_frame, text="压缩:").pack(side=tk.LEFT, padx=(10, 0))
+        self.compression_var = tk.StringVar(value="自动")
+        ttk.Combobox(out_frame, textvariable=self.compression_var, values=list(COMPRESSION_LABELS),
+                     state="readonly", width=6).pack(side=tk.LEFT, padx=5)
 
         # 合并按钮和进度条
         action_frame = tk.Frame(self.root)
         action_frame.pack(fill=tk.X, padx=10, pady=10)
         self.merge_btn = tk.Button(action_frame, text="开始合并", command=self.start_merge)
         self.merge_btn.pack(side=tk.LEFT)
+        self.cancel_btn = tk.Button(action_frame, text="取消", command=self.cancel_merge, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=(5, 0))
+        self._cancel = None
         self.progress = ttk.Progressbar(action_frame, orient=tk.HORIZONTAL, length=300, mode='determinate')
         self.progress.pack(side=tk.LEFT, padx=10)
 
         # 注册拖拽（如果可用），不显示额外提示文本
         if DND_AVAILABLE:
             try:
-                self.listbox.drop_target_register(DND_FILES)
-                self.listbox.dnd_bind('<<Drop>>', self._on_drop)
+                self.file_tree.drop_target_register(DND_FILES)
+                self.file_tree.dnd_bind('<<Drop>>', self._on_drop)
             except Exception:
                 # 忽略注册错误，拖拽功能降级到不可用
                 pass
@@ -108,7 +155,7 @@ class MainWindow:
             start_dir = self.last_dir
 
         class FileBrowserDialog(tk.Toplevel):
-            def __init__(self, parent, directory, add_callback, font=None):
+            def __init__(self, parent, directory, add_callback, listing_cache, font=None):
                 super().__init__(parent)
                 self.parent = parent
                 self.directory = directory
@@ -122,6 +169,12 @@ class MainWindow:
                 self.minsize(600, 450)
                 self.font = font
                 self._debounce_id = None
+                self.listing_cache = listing_cache
+                # 每次刷新递增，丢弃过期的后台读取结果
+                self._generation = 0
+                self._insert_job = None
+                self._entries = []
+                self._displayed = []
                 self._build()
 
             def _build(self):
@@ -140,11 +193,13 @@ class MainWindow:
                 tk.Label(ctrlbar, text="排序:", font=self.font).pack(side=tk.LEFT)
                 self.sort_var = tk.StringVar(value="name")
                 # 使用单选按钮并在切换时自动刷新
-                rb_name = tk.Radiobutton(ctrlbar, text="名称", variable=self.sort_var, value="name", command=self._refresh, font=self.font)
+                rb_name = tk.Radiobutton(ctrlbar, text="名称", variable=self.sort_var, value="name", command=self._resort, font=self.font)
                 rb_name.pack(side=tk.LEFT, padx=4)
-                rb_time = tk.Radiobutton(ctrlbar, text="更新时间", variable=self.sort_var, value="mtime", command=self._refresh, font=self.font)
+                rb_time = tk.Radiobutton(ctrlbar, text="更新时间", variable=self.sort_var, value="mtime", command=self._resort, font=self.font)
                 rb_time.pack(side=tk.LEFT, padx=4)
-                tk.Button(ctrlbar, text="刷新", command=self._refresh, font=self.font).pack(side=tk.LEFT, padx=6)
+                tk.Button(ctrlbar, text="刷新", command=lambda: self._refresh(force=True), font=self.font).pack(side=tk.LEFT, padx=6)
+                self.status_var = tk.StringVar()
+                tk.Label(ctrlbar, textvariable=self.status_var, font=self.font).pack(side=tk.RIGHT)
 
                 # 文件列表：名称 + 修改时间（动态行高避免被裁剪）
                 try:
@@ -227,50 +282,84 @@ class MainWindow:
                     self.parent.last_dir = parent_dir
                     self._refresh()
 
-            def _refresh(self):
-                try:
-                    files = [os.path.join(self.directory, x) for x in os.listdir(self.directory)]
-                except Exception as e:
-                    messagebox.showerror("错误", f"无法读取目录: {e}")
+            def _refresh(self, force=False):
+                """读取当前目录；缓存未命中时在工作线程中扫描"""
+                directory = self.directory
+                self._generation += 1
+                generation = self._generation
+                entries = None if force else self.listing_cache.get(directory)
+                if entries is not None:
+                    self._show(entries)
                     return
-                dirs = [p for p in files if os.path.isdir(p) and not os.path.basename(p).startswith('.')]
-                pdfs = [p for p in files if os.path.isfile(p) and p.lower().endswith('.pdf') and not os.path.basename(p).startswith('.')]
-                if self.sort_var.get() == 'name':
-                    dirs.sort(key=lambda p: os.path.basename(p).lower())
-                    pdfs.sort(key=lambda p: os.path.basename(p).lower())
-                else:
-                    dirs.sort(key=lambda p: os.path.getmtime(p), reverse=True)
-                    pdfs.sort(key=lambda p: os.path.getmtime(p), reverse=True)
-                entries = [(p, True) for p in dirs] + [(p, False) for p in pdfs]
-                # 刷新树形列表
-                for item in self.tree.get_children():
-                    self.tree.delete(item)
-                for p, is_dir in entries:
-                    mtime = os.path.getmtime(p)
-                    mtime_str = time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime))
-                    name = os.path.basename(p) + ("/" if is_dir else "")
-                    self.tree.insert("", tk.END, values=(name, mtime_str))
-                # 保存 full paths for retrieval
-                self._displayed = entries
+                self.status_var.set("正在读取目录...")
+
+                def worker():
+                    try:
+                        result, error = self.listing_cache.load(directory), None
+                    except Exception as e:
+                        result, error = None, e
+                    try:
+                        self.after(0, self._on_loaded, generation, result, error)
+                    except Exception:
+                        # 对话框已关闭
+                        pass
+
+                threading.Thread(target=worker, daemon=True).start()
+
+            def _on_loaded(self, generation, entries, error):
+                if generation != self._generation:
+                    return
+                if error is not None:
+                    self.status_var.set("")
+                    messagebox.showerror("错误", f"无法读取目录: {error}")
+                    return
+                self._show(entries)
+
+            def _show(self, entries):
+                self._entries = entries
+                self._resort()
+
+            def _resort(self):
+                # 排序只作用于已读取的条目，不重新扫描目录
+                self._displayed = sort_entries(self._entries, self.sort_var.get())
+                self._cancel_insert()
+                self.tree.delete(*self.tree.get_children())
+                dirs = sum(1 for e in self._displayed if e.is_dir)
+                self.status_var.set(f"{dirs} 个目录, {len(self._displayed) - dirs} 个PDF")
+                self._insert_rows(0)
+
+            def _insert_rows(self, start):
+                # 分批插入，每批之间让出事件循环；行 iid 即为 _displayed 中的下标
+                end = min(start + ROW_CHUNK, len(self._displayed))
+                for i in range(start, end):
+                    entry = self._displayed[i]
+                    mtime_str = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.mtime))
+                    name = entry.name + ("/" if entry.is_dir else "")
+                    self.tree.insert("", tk.END, iid=str(i), values=(name, mtime_str))
+                self._insert_job = self.after(1, self._insert_rows, end) if end < len(self._displayed) else None
+
+            def _cancel_insert(self):
+                if self._insert_job is not None:
+                    self.after_cancel(self._insert_job)
+                    self._insert_job = None
 
             def _add_selected(self):
                 sel_items = list(self.tree.selection())
                 if not sel_items:
                     return
-                indices = [self.tree.index(item) for item in sel_items]
-                selected = [self._displayed[i] for i in indices]
+                selected = [self._displayed[int(item)] for item in sel_items]
 
                 # 如果只选中一个目录，则进入该目录
-                if len(selected) == 1 and selected[0][1] is True:
-                    self._enter_dir(selected[0][0])
+                if len(selected) == 1 and selected[0].is_dir:
+                    self._enter_dir(selected[0].path)
                     return
 
                 # 否则只添加文件，忽略目录
-                files = [p for p, is_dir in selected if not is_dir]
+                files = [e.path for e in selected if not e.is_dir]
                 if files:
                     self.add_callback(files)
                     self.parent.last_dir = self.directory
-                    self.destroy()
+                    self._close()
 
             def _enter_dir(self, path):
                 if os.path.isdir(path):
@@ -282,15 +371,21 @@ class MainWindow:
             def _cancel(self):
                 # 取消也记录当前目录，便于下次打开
                 self.parent.last_dir = self.directory
+                self._close()
+
+            def _close(self):
+                self._cancel_insert()
+                self._generation += 1
                 self.destroy()
 
         # 使用主窗口选定的 UI 字体以提升中文显示
         dialog_font = getattr(self, 'ui_font', None)
         # 打开即进入最近使用目录
-        FileBrowserDialog(self.root, start_dir, self.add_files_from_paths, font=dialog_font)
+        FileBrowserDialog(self.root, start_dir, self.add_files_from_paths, self.listing_cache, font=dialog_font)
 
     def add_files_from_paths(self, paths):
         skipped = []
+        candidates = []
         for f in paths:
             if isinstance(f, bytes):
                 try:
@@ -304,56 +399,71 @@ class MainWindow:
             # 如果是目录，扫描目录下的 PDF（非递归）
             if os.path.isdir(f):
                 try:
-                    children = [os.path.join(f, x) for x in os.listdir(f)]
+                    with os.scandir(f) as it:
+                        pdfs = sorted(e.path for e in it if e.name.lower().endswith('.pdf') and e.is_file())
                 except Exception:
                     skipped.append(f)
                     continue
-                pdfs = [p for p in children if os.path.isfile(p) and p.lower().endswith('.pdf')]
                 if not pdfs:
                     skipped.append(f)
                     continue
-                for p in pdfs:
-                    if p in self.file_list:
-                        continue
-                    self.file_list.append(p)
-                    self.listbox.insert(tk.END, os.path.basename(p))
+                candidates.extend(pdfs)
                 continue
             if not os.path.isfile(f) or not f.lower().endswith('.pdf'):
                 skipped.append(f)
                 continue
-            if f in self.file_list:
-                continue
-            self.file_list.append(f)
-            self.listbox.insert(tk.END, os.path.basename(f))
+            candidates.append(f)
+        # 一次性追加到模型和列表，然后提交后台验证
+        added = self.file_list.extend(candidates)
+        for p in added:
+            self.file_tree.insert("", tk.END, iid=path_key(p), values=self._row(p))
+        self.session.submit(added)
         if skipped:
             messagebox.showwarning("忽略的文件", "以下文件未被添加（非PDF或无效）:\n" + "\n".join(skipped))
 
+    def _row(self, path):
+        info = self.session.get_info(path)
+        name = os.path.basename(path)
+        if info is None:
+            return (name, "", "", "验证中...")
+        size = f"{info['size'] / (1024 * 1024):.2f} MB"
+        if not info['valid']:
+            return (name, "", size, f"❌ {info['error']}")
+        return (name, info['pages'], size, "✓")
+
+    def _show_validation(self, infos):
+        for info in infos:
+            iid = path_key(info['path'])
+            if self.file_tree.exists(iid):
+                self.file_tree.item(iid, values=self._row(info['path']))
+
+    def _selected_indices(self):
+        selected = set(self.file_tree.selection())
+        if not selected:
+            return []
+        return [i for i, iid in enumerate(self.file_tree.get_children()) if iid in selected]
+
     def remove_selected(self):
-        selected = list(self.listbox.curselection())
-        for idx in reversed(selected):
-            self.listbox.delete(idx)
-            del self.file_list[idx]
+        indices = self._selected_indices()
+        paths = [self.file_list[i] for i in indices]
+        self.file_list.remove(indices)
+        self.session.forget(paths)
+        if paths:
+            self.file_tree.delete(*(path_key(p) for p in paths))
 
     def move_up(self):
-        selected = list(self.listbox.curselection())
-        for idx in selected:
-            if idx > 0:
-                self.file_list[idx-1], self.file_list[idx] = self.file_list[idx], self.file_list[idx-1]
-                self._refresh_listbox(selected_idx=idx-1)
+        self._apply_move(*self.file_list.move_up(self._selected_indices()))
 
     def move_down(self):
-        selected = list(self.listbox.curselection())
-        for idx in reversed(selected):
-            if idx < len(self.file_list)-1:
-                self.file_list[idx+1], self.file_list[idx] = self.file_list[idx], self.file_list[idx+1]
-                self._refresh_listbox(selected_idx=idx+1)
-
-    def _refresh_listbox(self, selected_idx=None):
-        self.listbox.delete(0, tk.END)
-        for f in self.file_list:
-            self.listbox.insert(tk.END, os.path.basename(f))
-        if selected_idx is not None:
-            self.listbox.selection_set(selected_idx)
+        self._apply_move(*self.file_list.move_down(self._selected_indices()))
+
+    def _apply_move(self, changed, selection):
+        # 只移动位置发生变化的行；变化的行构成若干连续区间，按升序就位即可
+        for idx in changed:
+            self.file_tree.move(path_key(self.file_list[idx]), "", idx)
+        self.file_tree.selection_set([path_key(self.file_list[idx]) for idx in selection])
+        if selection:
+            self.file_tree.see(path_key(self.file_list[selection[0]]))
 
     def browse_output(self):
         f = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF文件", "*.pdf")])
@@ -370,31 +480,51 @@ class MainWindow:
             messagebox.showwarning("提示", "请设置输出文件名！")
             return
         self.merge_btn.config(state=tk.DISABLED)
+        self.cancel_btn.config(state=tk.NORMAL)
         self.progress['value'] = 0
-        threading.Thread(target=self._merge_thread, args=(output_path,), daemon=True).start()
-
-    def _merge_thread(self, output_path):
+        # 合并线程使用列表快照，合并期间调整列表不影响本次合并
+        compression = COMPRESSION_LABELS.get(self.compression_var.get(), "auto")
+        self._cancel = CancelToken()
+        threading.Thread(target=self._merge_thread,
+                         args=(output_path, self.file_list.paths(), compression, self._cancel),
+                         daemon=True).start()
+
+    def cancel_merge(self):
+        # 合并线程在下一个文件或页面块处停止，并删除未写完的输出
+        if self._cancel:
+            self._cancel.cancel()
+            self.cancel_btn.config(state=tk.DISABLED)
+
+    def _merge_thread(self, output_path, file_paths, compression="auto", cancel=None):
         err = None
         try:
-            from core.merger import PdfMerger
-            merger = PdfMerger()
-            # 将文件添加到合并器
-            merger.add_files(self.file_list)
-
-            def progress_callback(current_page, total_pages, status):
-                try:
-                    percent = int(current_page / total_pages * 100) if total_pages else 0
-                except Exception:
-                    percent = 0
+            def on_progress(event):
+                total = event.total_pages
+                percent = int(min(event.pages_done, total) / total * 100) if total else 0
                 # 使用 root.after 安全更新 UI
                 self.root.after(0, self.progress.config, {'value': percent})
 
-            merger.merge(output_path, progress_callback=progress_callback)
-            self.root.after(0, lambda: messagebox.showinfo("完成", "PDF合并完成！"))
+            # 按页面更新进度条，但每秒最多刷新约10次，避免 root.after 挤满事件队列
+            progress = ProgressBus(0.1)
+            progress.subscribe(on_progress)
+            # 复用后台验证的结果，尚未验证的文件在此补充验证
+            self.session.merge(file_paths, output_path, cancel=cancel, progress=progress,
+                               compression=compression)
+            skipped = self.session.merger.get_skipped_files()
+            if skipped:
+                detail = "\n".join(f"{os.path.basename(r['path'])}: {r['error']}" for r in skipped)
+                self.root.after(0, lambda: messagebox.showwarning(
+                    "完成", f"PDF合并完成，但跳过了 {len(skipped)} 个文件:\n{detail}"))
+            else:
+                self.root.after(0, lambda: messagebox.showinfo("完成", "PDF合并完成！"))
+        except MergeCancelled:
+            self.root.after(0, self.progress.config, {'value': 0})
+            self.root.after(0, lambda: messagebox.showinfo("已取消", "合并已取消"))
         except Exception as e:
             err = str(e)
         finally:
             self.root.after(0, lambda: self.merge_btn.config(state=tk.NORMAL))
+            self.root.after(0, lambda: self.cancel_btn.config(state=tk.DISABLED))
             if err:
                 self.root.after(0, lambda: messagebox.showerror("错误", err))
 
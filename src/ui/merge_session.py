@@ -0,0 +1,164 @@
+"""
+图形界面的常驻合并会话
+文件加入列表后即在后台线程中验证，合并时按当前顺序复用已有的验证结果
+（验证后被修改的文件在合并前重新验证）
+"""
+
+import os
+import queue
+import threading
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from core.merger import PdfMerger
+from core.cancel import CancelToken
+from ui.file_list_model import path_key
+
+
+class MergeSession:
+    """持有一个长期存在的 PdfMerger，所有对它的访问都经由同一把锁串行化"""
+
+    def __init__(self,
+                 merger: PdfMerger,
+                 on_validated: Optional[Callable[[List[dict]], None]] = None,
+                 batch_size: int = 32):
+        """
+        初始化会话
+
+        Args:
+            merger: 合并器
+            on_validated: 每验证完一批文件后在工作线程中调用，参数为文件信息列表
+            batch_size: 后台每批验证的最大文件数
+        """
+        self.merger = merger
+        self.on_validated = on_validated
+        self.batch_size = batch_size
+        self._infos = {}      # 规范化路径 -> 文件信息
+        self._stats = {}      # 规范化路径 -> 验证时的 (大小, 修改时间)
+        self._wanted = set()  # 仍在列表中的规范化路径
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+
+    def submit(self, paths: Iterable[str]):
+        """
+        提交文件到后台验证
+
+        Args:
+            paths: 文件路径
+        """
+        for path in paths:
+            self._wanted.add(path_key(path))
+            self._queue.put(path)
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+
+    def forget(self, paths: Iterable[str]):
+        """
+        文件已从列表中移除：丢弃其验证结果，尚未验证的不再验证
+
+        Args:
+            paths: 文件路径
+        """
+        for path in paths:
+            key = path_key(path)
+            self._wanted.discard(key)
+            self._infos.pop(key, None)
+            self._stats.pop(key, None)
+
+    def get_info(self, path: str) -> Optional[dict]:
+        """获取文件的验证结果，尚未验证时返回 None"""
+        return self._infos.get(path_key(path))
+
+    def pending_count(self) -> int:
+        """尚未验证的文件数"""
+        return sum(1 for key in self._wanted if key not in self._infos)
+
+    def merge(self,
+              paths: List[str],
+              output_path: str,
+              cancel: Optional[CancelToken] = None,
+              **merge_options) -> bool:
+        """
+        按给定顺序合并；尚未验证或验证后被修改的文件先在当前线程中验证
+
+        Args:
+            paths: 文件顺序
+            output_path: 输出文件路径
+            cancel: 取消令牌，在验证的批次之间和合并过程中检查
+            merge_options: 传给 PdfMerger.merge 的其他参数
+
+        Returns:
+            bool: 是否成功
+
+        Raises:
+            MergeCancelled: 合并被取消
+        """
+        self._refresh(paths)
+        # 按批验证，批次之间可以取消；已验证的批次照常登记
+        for start in range(0, len(paths), self.batch_size):
+            if cancel:
+                cancel.check()
+            self._validate(paths[start:start + self.batch_size])
+        with self._lock:
+            self.merger.set_order(paths)
+            return self.merger.merge(output_path, cancel=cancel, **merge_options)
+
+    def _refresh(self, paths: List[str]):
+        """丢弃验证后被修改、替换或删除的文件的验证结果，使其重新验证"""
+        with self._lock:
+            stale = set()
+            for path in paths:
+                key = path_key(path)
+                if key in self._infos and self._stats.get(key) != _file_stat(path):
+                    stale.add(key)
+            if not stale:
+                return
+            for key in stale:
+                self._infos.pop(key)
+                self._stats.pop(key, None)
+            # 从合并列表中移除（同时关闭缓存的文档）
+            self.merger.set_order(
+                [f['path'] for f in self.merger.file_list if path_key(f['path']) not in stale]
+            )
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._validate(batch)
+
+    def _validate(self, paths: List[str]):
+        with self._lock:
+            # 在锁内过滤：后台线程和合并线程不会重复验证同一文件
+            todo = []
+            seen = set()
+            for path in paths:
+                key = path_key(path)
+                if key in self._wanted and key not in self._infos and key not in seen:
+                    seen.add(key)
+                    todo.append(path)
+            if not todo:
+                return
+            # 验证前记录文件状态：验证期间发生的修改在合并前同样会被发现
+            stats = {path_key(path): _file_stat(path) for path in todo}
+            infos = self.merger.add_files(todo)
+            for info in infos:
+                key = path_key(info['path'])
+                self._infos[key] = info
+                self._stats[key] = stats.get(key)
+        if self.on_validated:
+            self.on_validated(infos)
+
+
+def _file_stat(path: str) -> Optional[Tuple[int, int]]:
+    """文件的 (大小, 修改时间)，文件不存在时为 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
@@ -4,12 +4,16 @@
 
 import os
 import sys
+import subprocess
 import fitz  # PyMuPDF
 
 # 添加src到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from core.merger import PdfMerger
+from core.meta_cache import MetadataCache
+from core.result_cache import ResultCache
+from core.scanner import scan_pdfs
 
 
 def create_test_pdf(filename: str, page_count: int = 3, content: str = None):
@@ -154,6 +158,1485 @@ def test_error_handling():
         return True
 
 
+def test_parallel_validation():
+    """测试并发验证"""
+    print("\n" + "=" * 60)
+    print("测试4: 并发验证")
+    print("=" * 60)
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    
+    paths = []
+    for i in range(1, 7):
+        filename = os.path.join(test_dir, f"parallel_{i}.pdf")
+        create_test_pdf(filename, page_count=i)
+        paths.append(filename)
+    paths.insert(3, os.path.join(test_dir, "missing.pdf"))
+    
+    serial = PdfMerger()
+    expected = serial.add_files(paths)
+    
+    for executor in ('thread', 'process'):
+        merger = PdfMerger()
+        results = merger.add_files(paths, jobs=4, executor=executor)
+        assert results == expected, f"{executor} 验证结果与串行不一致"
+        assert merger.file_list == serial.file_list, "文件顺序应与输入一致"
+        assert merger.get_total_pages() == serial.get_total_pages() == 21
+        print(f"✅ {executor} 模式结果与串行一致")
+    
+    return True
+
+
+def test_document_cache():
+    """测试验证阶段的文档句柄复用"""
+    print("\n" + "=" * 60)
+    print("测试5: 文档句柄缓存")
+    print("=" * 60)
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    
+    paths = []
+    for i in range(1, 5):
+        filename = os.path.join(test_dir, f"cache_{i}.pdf")
+        create_test_pdf(filename, page_count=2)
+        paths.append(filename)
+    
+    # 句柄预算为2，前两个文件会被淘汰
+    merger = PdfMerger(max_open_docs=2)
+    merger.add_files(paths)
+    stats = merger.get_cache_stats()
+    assert stats['cached'] == 2 and stats['evictions'] == 2, stats
+    
+    output = os.path.join(test_dir, "cache_merged.pdf")
+    merger.merge(output)
+    stats = merger.get_cache_stats()
+    assert stats['hits'] == 2 and stats['misses'] == 2, stats
+    assert stats['cached'] == 0
+    
+    doc = fitz.open(output)
+    assert len(doc) == 8
+    doc.close()
+    print(f"✅ 缓存统计: {stats}")
+    
+    # 禁用缓存时全部未命中
+    merger = PdfMerger(max_open_docs=0)
+    merger.add_files(paths, jobs=2)
+    merger.merge(output)
+    assert merger.get_cache_stats()['hits'] == 0
+    print("✅ 禁用缓存时正确回退")
+    return True
+
+
+def test_sharded_merge():
+    """测试分片并行合并"""
+    print("\n" + "=" * 60)
+    print("测试6: 分片并行合并")
+    print("=" * 60)
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    
+    paths = []
+    for i in range(1, 10):
+        filename = os.path.join(test_dir, f"shard_{i}.pdf")
+        create_test_pdf(filename, page_count=i % 3 + 1, content=f"shard file {i}")
+        paths.append(filename)
+    
+    merger = PdfMerger()
+    merger.add_files(paths)
+    
+    # 验证后损坏一个文件，合并时应跳过该文件
+    broken = paths[4]
+    with open(broken, 'wb') as f:
+        f.write(b"not a pdf")
+    
+    events = []
+    output = os.path.join(test_dir, "sharded_merged.pdf")
+    merger.merge(output, progress_callback=lambda c, t, m: events.append((c, t, m)),
+                 mode='sharded', workers=3)
+    
+    doc = fitz.open(output)
+    texts = [page.get_text().split("\n")[0] for page in doc]
+    doc.close()
+    expected = []
+    for i in range(1, 10):
+        if paths[i - 1] != broken:
+            expected += [f"shard file {i}"] * (i % 3 + 1)
+    assert texts == expected, "页面顺序应与输入一致"
+    assert events[-1][2] == "完成!"
+    currents = [c for c, _, _ in events]
+    assert currents == sorted(currents), "进度应单调递增"
+    assert not [d for d in os.listdir(test_dir) if d.startswith('.pdfmerge-shards-')]
+    print(f"✅ 分片合并输出 {len(texts)} 页，顺序正确")
+    return True
+
+
+# 在子进程中合并并输出峰值常驻内存(KB)，避免受当前进程已有内存影响
+# Linux 下优先读取 VmHWM：ru_maxrss 会继承 fork 前父进程的峰值
+PEAK_RSS_SCRIPT = """
+import sys, resource
+sys.path.insert(0, sys.argv[1])
+from core.merger import PdfMerger
+merger = PdfMerger(max_open_docs=0)
+merger.add_files(sys.argv[4:])
+merger.merge(sys.argv[2], compress=False, max_memory=int(sys.argv[3]) or None)
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+try:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmHWM:'):
+                peak = int(line.split()[1])
+except OSError:
+    pass
+print(peak)
+"""
+
+
+def test_streaming_merge_memory():
+    """测试流式合并的内存上限"""
+    print("\n" + "=" * 60)
+    print("测试7: 流式合并峰值内存")
+    print("=" * 60)
+    
+    try:
+        import resource  # noqa: F401  仅类Unix系统可用
+    except ImportError:
+        print("⚠️  当前平台不支持 resource 模块，跳过")
+        return True
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    
+    paths = []
+    for i in range(32):
+        filename = os.path.join(test_dir, f"stream_{i}.pdf")
+        create_test_pdf(filename, page_count=100)
+        paths.append(filename)
+    
+    src_dir = os.path.join(os.path.dirname(__file__), '..', 'src')
+    output = os.path.join(test_dir, "stream_merged.pdf")
+    
+    def peak_rss(max_memory):
+        result = subprocess.run(
+            [sys.executable, "-c", PEAK_RSS_SCRIPT, src_dir, output, str(max_memory)] + paths,
+            capture_output=True, text=True, check=True
+        )
+        return int(result.stdout.strip().splitlines()[-1])
+    
+    full_peak = peak_rss(0)
+    stream_peak = peak_rss(512 * 1024)
+    print(f"📈 峰值内存: 普通合并 {full_peak}KB, 流式合并 {stream_peak}KB")
+    
+    doc = fitz.open(output)
+    assert len(doc) == 32 * 100
+    assert doc[-1].get_text().strip().endswith("- 100 -")
+    doc.close()
+    assert stream_peak < full_peak, "流式合并的峰值内存应低于整体合并"
+    print("✅ 流式合并内存受控且输出完整")
+    return True
+
+
+def test_metadata_cache():
+    """测试持久化元数据缓存"""
+    print("\n" + "=" * 60)
+    print("测试8: 元数据缓存")
+    print("=" * 60)
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    db_path = os.path.join(test_dir, "metadata.sqlite3")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    
+    paths = []
+    for i in range(1, 4):
+        filename = os.path.join(test_dir, f"meta_{i}.pdf")
+        create_test_pdf(filename, page_count=i)
+        paths.append(filename)
+    broken = os.path.join(test_dir, "meta_broken.pdf")
+    with open(broken, 'wb') as f:
+        f.write(b"not a pdf")
+    paths.append(broken)
+    
+    first = PdfMerger(meta_cache=MetadataCache(db_path))
+    expected = first.add_files(paths)
+    assert first.get_meta_cache_stats() == {'hits': 0, 'misses': 4}
+    
+    # 新的缓存实例（模拟下一次运行）应全部命中，结果与首次一致
+    second = PdfMerger(meta_cache=MetadataCache(db_path))
+    results = second.add_files(paths, jobs=2)
+    assert second.get_meta_cache_stats() == {'hits': 4, 'misses': 0}
+    assert results == expected
+    assert second.get_total_pages() == 6
+    print("✅ 未变化的文件全部命中缓存")
+    
+    # 文件内容变化后应重新验证
+    create_test_pdf(paths[0], page_count=5)
+    third = PdfMerger(meta_cache=MetadataCache(db_path))
+    results = third.add_files(paths)
+    assert third.get_meta_cache_stats() == {'hits': 3, 'misses': 1}
+    assert results[0]['pages'] == 5
+    print("✅ 文件变化后缓存失效")
+    
+    # 按数量淘汰
+    cache = MetadataCache(db_path, max_entries=2)
+    cache.flush()
+    cache = MetadataCache(db_path)
+    PdfMerger(meta_cache=cache).add_files(paths)
+    assert cache.get_stats()['misses'] == 2
+    print("✅ 超出容量的记录被淘汰")
+    return True
+
+
+def test_result_cache():
+    """测试合并结果缓存"""
+    print("\n" + "=" * 60)
+    print("测试9: 合并结果缓存")
+    print("=" * 60)
+    
+    import json
+    import shutil
+    test_dir = "test_pdfs"
+    cache_dir = os.path.join(test_dir, "result_cache")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    
+    paths = []
+    for i in range(1, 4):
+        filename = os.path.join(test_dir, f"result_{i}.pdf")
+        create_test_pdf(filename, page_count=i)
+        paths.append(filename)
+    output = os.path.join(test_dir, "result_merged.pdf")
+    
+    def run(**options):
+        merger = PdfMerger(result_cache=ResultCache(cache_dir, **options))
+        merger.add_files(paths)
+        merger.merge(output)
+        with open(output, 'rb') as f:
+            return merger.get_result_cache_stats(), f.read()
+    
+    stats, first = run()
+    assert stats == {'hits': 0, 'misses': 1}, stats
+    stats, second = run()
+    assert stats == {'hits': 1, 'misses': 0}, stats
+    assert first == second
+    stats, _ = run(use_hardlinks=True)
+    assert stats['hits'] == 1
+    print("✅ 相同输入直接复用缓存结果")
+
+    # 命中时输出的权限与正常合并相同，原合并中跳过的文件同样被报告
+    plain = os.path.join(test_dir, "result_plain.pdf")
+    merger = PdfMerger()
+    merger.add_files(paths)
+    merger.merge(plain)
+    os.remove(output)
+    stats, _ = run()
+    assert stats['hits'] == 1
+    assert os.stat(output).st_mode & 0o777 == os.stat(plain).st_mode & 0o777
+    meta_path, = [os.path.join(cache_dir, n) for n in os.listdir(cache_dir) if n.endswith('.json')]
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    assert meta['skipped'] == []
+    report = {'path': paths[0], 'reason': 'error', 'error': "broken"}
+    meta['skipped'] = [report]
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    merger = PdfMerger(result_cache=ResultCache(cache_dir))
+    merger.add_files(paths)
+    merger.merge(output)
+    assert merger.get_result_cache_stats()['hits'] == 1
+    assert merger.get_skipped_files() == [report]
+    print("✅ 命中时保留输出权限并重新报告跳过的文件")
+    
+    # 输入变化后重新合并，且旧的硬链接输出不会破坏缓存
+    create_test_pdf(paths[1], page_count=4)
+    stats, _ = run(use_hardlinks=True)
+    assert stats == {'hits': 0, 'misses': 1}, stats
+    assert len(fitz.open(output)) == 8
+    sizes = sorted(os.path.getsize(os.path.join(cache_dir, n))
+                   for n in os.listdir(cache_dir) if n.endswith('.pdf'))
+    assert len(sizes) == 2 and len(first) in sizes
+    print("✅ 输入变化时缓存失效")
+    
+    # 容量上限
+    shutil.rmtree(cache_dir)
+    run(max_bytes=len(first) // 2)
+    assert not os.path.exists(cache_dir)
+    print("✅ 超出容量的结果不会被缓存")
+    return True
+
+
+def test_profiling():
+    """测试性能剖析与跟踪导出"""
+    print("\n" + "=" * 60)
+    print("测试10: 性能剖析")
+    print("=" * 60)
+    
+    import json
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    
+    paths = []
+    for i, pages in enumerate([1, 1, 40]):
+        filename = os.path.join(test_dir, f"profile_{i}.pdf")
+        create_test_pdf(filename, page_count=pages)
+        paths.append(filename)
+    
+    merger = PdfMerger(profile=True, max_open_docs=1)
+    merger.add_files(paths)
+    merger.merge(os.path.join(test_dir, "profile_merged.pdf"))
+    
+    summary = merger.get_profile()
+    for phase in ('validate', 'open', 'insert', 'save'):
+        assert phase in summary['phases'], phase
+    assert summary['phases']['insert']['pages'] == 42
+    assert summary['phases']['validate']['count'] == 3
+    # 前两个文件的句柄被淘汰后需要重新读取
+    assert summary['phases']['open']['bytes'] == sum(os.path.getsize(p) for p in paths[:2])
+    assert summary['files'][0]['file'] == paths[2], "最大的文件应排在最前"
+    assert paths[2] in summary['outliers']
+    print(merger.profiler.format_report())
+    
+    trace_path = os.path.join(test_dir, "trace.json")
+    merger.profiler.export_chrome_trace(trace_path)
+    with open(trace_path, encoding='utf-8') as f:
+        trace = json.load(f)
+    assert all(e['ph'] == 'X' and e['dur'] >= 0 for e in trace['traceEvents'])
+    assert len(trace['traceEvents']) == len(merger.profiler.spans)
+    print("✅ 剖析数据与跟踪文件完整")
+    
+    # 未启用时不记录
+    merger = PdfMerger()
+    merger.add_files(paths)
+    assert not merger.profiler.spans
+    return True
+
+
+def test_directory_scanner():
+    """测试目录扫描"""
+    print("\n" + "=" * 60)
+    print("测试11: 目录扫描")
+    print("=" * 60)
+    
+    import shutil
+    root = os.path.join("test_pdfs", "scan")
+    shutil.rmtree(root, ignore_errors=True)
+    layout = [
+        "file2.pdf", "file10.pdf", "a b.pdf", "notes.txt", "UPPER.PDF",
+        "a/x.pdf", "a/deep/y.pdf", "skip/z.pdf",
+    ]
+    for rel in layout:
+        path = os.path.join(root, *rel.split("/"))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4\n")
+    if hasattr(os, "symlink"):
+        try:
+            os.symlink(os.path.abspath(root), os.path.join(root, "a", "loop"))
+        except OSError:
+            pass
+    
+    # 默认顺序与原先 os.walk + 排序的结果一致
+    legacy = sorted(
+        os.path.join(d, f) for d, _, files in os.walk(root) for f in files
+        if f.lower().endswith('.pdf')
+    )
+    for workers in (1, 4):
+        assert list(scan_pdfs(root, workers=workers)) == legacy
+    print("✅ 默认顺序与原实现一致")
+    
+    names = [os.path.relpath(p, root).replace(os.sep, "/")
+             for p in scan_pdfs(root, order='natural', exclude=['skip'], max_depth=1)]
+    assert names == ["a b.pdf", "a/x.pdf", "file2.pdf", "file10.pdf", "UPPER.PDF"], names
+    print("✅ 自然排序、排除与深度限制正确")
+    
+    followed = list(scan_pdfs(root, symlinks='follow'))
+    assert len(followed) == len(legacy), "跟随链接时不应因循环重复扫描"
+    
+    # 扫描结果可直接流式交给验证
+    merger = PdfMerger()
+    results = merger.add_files(scan_pdfs(root), jobs=2)
+    assert [r['path'] for r in results] == legacy
+    print("✅ 扫描与验证流式衔接")
+    return True
+
+
+def test_validation_levels():
+    """测试分级验证"""
+    print("\n" + "=" * 60)
+    print("测试12: 分级验证")
+    print("=" * 60)
+    
+    from core.validation import quick_inspect
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    
+    paths = []
+    for i, pages in enumerate([2, 7]):
+        filename = os.path.join(test_dir, f"level_{i}.pdf")
+        create_test_pdf(filename, page_count=pages)
+        paths.append(filename)
+    truncated = os.path.join(test_dir, "level_truncated.pdf")
+    with open(paths[1], "rb") as f:
+        data = f.read()
+    with open(truncated, "wb") as f:
+        f.write(data[:len(data) // 2])
+    
+    assert quick_inspect(paths[1]) == (7, None)
+    assert quick_inspect(truncated)[1] is not None
+    print("✅ 快速检查读取页数并发现截断文件")
+
+    # %%EOF 之后的附加数据：完整打开可以接受，快速检查也不能拒绝
+    for extra in (8 * 1024, 2 * 1024 * 1024):
+        trailing = os.path.join(test_dir, f"level_trailing_{extra}.pdf")
+        with open(trailing, "wb") as f:
+            f.write(data + b"\0" * extra)
+        pages, error = quick_inspect(trailing)
+        assert error is None, error
+        assert pages in (7, None)
+        merger = PdfMerger()
+        assert merger.add_files([trailing], level='quick')[0]['valid']
+        merger.merge(os.path.join(test_dir, "level_trailing_merged.pdf"))
+        assert merger.get_total_pages() == 7
+    print("✅ 结束标记后带附加数据的文件通过快速检查")
+    
+    invalid = os.path.join(test_dir, "level_invalid.pdf")
+    with open(invalid, "wb") as f:
+        f.write(b"not a pdf")
+    
+    output = os.path.join(test_dir, "level_merged.pdf")
+    for level in ('quick', 'standard', 'deep'):
+        merger = PdfMerger()
+        results = merger.add_files(paths + [invalid], level=level)
+        assert [r['valid'] for r in results] == [True, True, False], level
+        merger.merge(output)
+        assert merger.get_total_pages() == 9
+        with fitz.open(output) as doc:
+            assert len(doc) == 9
+    print("✅ 三个级别的验证与合并结果一致")
+    
+    try:
+        PdfMerger().add_files(paths, level='paranoid')
+        assert False, "未知级别应报错"
+    except ValueError:
+        pass
+    return True
+
+
+def test_directory_listing_cache():
+    """测试文件浏览器的目录列表缓存"""
+    print("\n" + "=" * 60)
+    print("测试13: 目录列表缓存")
+    print("=" * 60)
+    
+    import shutil
+    from ui.dir_listing import DirectoryListingCache, sort_entries
+    root = os.path.join("test_pdfs", "listing")
+    shutil.rmtree(root, ignore_errors=True)
+    os.makedirs(os.path.join(root, "sub"))
+    os.makedirs(os.path.join(root, ".hidden"))
+    for i, name in enumerate(["A.PDF", "b.pdf", "c.txt", ".x.pdf"]):
+        path = os.path.join(root, name)
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4\n")
+        os.utime(path, (1000 + i, 1000 + i))
+    
+    cache = DirectoryListingCache()
+    assert cache.get(root) is None
+    entries = cache.load(root)
+    assert cache.get(root) is entries, "目录未变化时应命中缓存"
+    assert [e.name for e in sort_entries(entries, 'name')] == ["sub", "A.PDF", "b.pdf"]
+    assert [e.name for e in sort_entries(entries, 'mtime')] == ["sub", "b.pdf", "A.PDF"]
+    print("✅ 一次扫描得到目录和PDF，排序复用缓存")
+    
+    with open(os.path.join(root, "d.pdf"), "wb") as f:
+        f.write(b"%PDF-1.4\n")
+    st = os.stat(root)
+    os.utime(root, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert cache.get(root) is None, "目录变化后缓存应失效"
+    assert len(cache.load(root)) == 4
+    print("✅ 目录 mtime 变化时缓存失效")
+    return True
+
+
+def test_file_list_model():
+    """测试合并列表模型"""
+    print("\n" + "=" * 60)
+    print("测试14: 合并列表模型")
+    print("=" * 60)
+    
+    import time
+    from ui.file_list_model import FileListModel
+    model = FileListModel()
+    added = model.extend(["a.pdf", "b.pdf", "./a.pdf", "c.pdf", "b.pdf", "d.pdf"])
+    assert added == ["a.pdf", "b.pdf", "c.pdf", "d.pdf"]
+    assert "./c.pdf" in model and "e.pdf" not in model
+    print("✅ 追加时去重（含同一文件的不同写法）")
+    
+    changed, selection = model.move_up([0, 2, 3])
+    assert model.paths() == ["a.pdf", "c.pdf", "d.pdf", "b.pdf"]
+    assert changed == [1, 2, 3] and selection == [0, 1, 2]
+    changed, selection = model.move_down([2, 3])
+    assert model.paths() == ["a.pdf", "c.pdf", "d.pdf", "b.pdf"] and not changed
+    assert selection == [2, 3]
+    print("✅ 多选批量移动，堵住的连续块不动")
+    
+    assert model.remove([3, 0, 7]) == [0, 3]
+    assert model.paths() == ["c.pdf", "d.pdf"] and "a.pdf" not in model
+    
+    # 大列表追加应为线性复杂度
+    big = FileListModel()
+    start = time.perf_counter()
+    big.extend(f"/data/scan_{i:06d}.pdf" for i in range(50000))
+    big.extend(f"/data/scan_{i:06d}.pdf" for i in range(50000))
+    assert len(big) == 50000
+    assert time.perf_counter() - start < 5
+    print("✅ 5万个文件追加与判重")
+    return True
+
+
+def test_merge_session():
+    """测试图形界面的常驻合并会话"""
+    print("\n" + "=" * 60)
+    print("测试15: 后台验证与结果复用")
+    print("=" * 60)
+    
+    import threading
+    from ui.merge_session import MergeSession
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    
+    paths = []
+    for i in range(4):
+        filename = os.path.join(test_dir, f"session_{i}.pdf")
+        create_test_pdf(filename, page_count=i + 1)
+        paths.append(filename)
+    invalid = os.path.join(test_dir, "session_invalid.pdf")
+    with open(invalid, "wb") as f:
+        f.write(b"not a pdf")
+    
+    done = threading.Event()
+    validated = []
+    
+    def on_validated(infos):
+        validated.extend(infos)
+        if len(validated) >= 4:
+            done.set()
+    
+    session = MergeSession(PdfMerger(profile=True), on_validated=on_validated)
+    session.submit(paths[:3] + [invalid])
+    assert done.wait(30), "后台验证超时"
+    assert session.pending_count() == 0
+    assert session.get_info(paths[2])['pages'] == 3
+    assert not session.get_info(invalid)['valid']
+    print("✅ 加入后在后台完成验证")
+    
+    output = os.path.join(test_dir, "session_merged.pdf")
+    order = [paths[2], invalid, paths[0]]
+    session.forget([paths[1]])
+    session.merge(order, output)
+    with fitz.open(output) as doc:
+        assert len(doc) == 4
+    
+    # 再加入一个文件并调整顺序：只验证新文件
+    session.submit([paths[3]])
+    session.merge([paths[3], paths[0], paths[2]], output)
+    with fitz.open(output) as doc:
+        assert len(doc) == 8
+    validations = session.merger.get_profile()['phases']['validate']['count']
+    assert validations == 5, validations
+    print("✅ 重新排序与增量加入无需重新验证")
+
+    # 验证后文件被改写：合并前重新验证，不使用验证时保留的旧文档
+    done.clear()
+    session = MergeSession(PdfMerger(), on_validated=lambda infos: done.set())
+    session.submit(paths[:2])
+    assert done.wait(30), "后台验证超时"
+    create_test_pdf(paths[0], page_count=5, content="rewritten")
+    session.merge(paths[:2], output)
+    with fitz.open(output) as doc:
+        assert len(doc) == 7
+        assert "rewritten" in doc[0].get_text()
+    assert session.get_info(paths[0])['pages'] == 5
+    print("✅ 验证后被修改的文件在合并前重新验证")
+    return True
+
+
+def test_page_selection():
+    """测试页面选择"""
+    print("\n" + "=" * 60)
+    print("测试16: 页面选择")
+    print("=" * 60)
+    
+    from core.page_ranges import parse_page_spec, split_page_spec
+    assert parse_page_spec("1-5,9,20-", 22) == [(0, 4), (8, 8), (19, 21)]
+    assert parse_page_spec("odd", 5) == [(0, 0), (2, 2), (4, 4)]
+    assert parse_page_spec("1,2,3-4,-2", 6) == [(0, 3), (0, 1)]
+    assert parse_page_spec("4-2", 6) == [(3, 1)]
+    for bad in ("0", "7", "1-x", ","):
+        try:
+            parse_page_spec(bad, 6)
+            assert False, f"应拒绝 {bad!r}"
+        except ValueError:
+            pass
+    assert split_page_spec("report.pdf:1-5,9") == ("report.pdf", "1-5,9")
+    assert split_page_spec("folder") == ("folder", None)
+    print("✅ 页码规格解析")
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    archive = os.path.join(test_dir, "select_archive.pdf")
+    scan = os.path.join(test_dir, "select_scan.pdf")
+    create_test_pdf(archive, page_count=30)
+    create_test_pdf(scan, page_count=5)
+    
+    import re
+    
+    def page_labels(path):
+        with fitz.open(path) as doc:
+            return [re.search(r"(\d+/\d+)", page.get_text()).group(1) for page in doc]
+    
+    output = os.path.join(test_dir, "select_merged.pdf")
+    expected = ["1/30", "2/30", "9/30", "29/30", "30/30", "1/5", "3/5", "5/5"]
+    for options in ({'mode': 'serial'}, {'mode': 'sharded', 'workers': 2}, {'max_memory': 1}):
+        merger = PdfMerger()
+        merger.add_files([(archive, "1-2,9,29-"), (scan, "odd")], level='quick')
+        assert merger.get_total_pages() == 8, merger.get_total_pages()
+        pages_seen = []
+        merger.merge(output, progress_callback=lambda cur, total, msg: pages_seen.append(total),
+                     **options)
+        assert set(pages_seen) == {8}
+        assert page_labels(output) == expected, (options, page_labels(output))
+    print("✅ 串行、分片和流式合并都只插入选中的页面")
+    
+    merger = PdfMerger()
+    info = merger.add_file(scan, pages="6")
+    assert not info['valid'] and "页码" in info['error']
+    return True
+
+
+def test_merge_profiles():
+    """测试合并配置"""
+    print("\n" + "=" * 60)
+    print("测试17: 合并配置")
+    print("=" * 60)
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    source = os.path.join(test_dir, "profile_annots.pdf")
+    doc = fitz.open()
+    for i in range(3):
+        page = doc.new_page(width=595, height=842)
+        page.insert_text((50, 50), f"page {i + 1}", fontsize=14)
+        page.insert_link({'kind': fitz.LINK_URI, 'from': fitz.Rect(50, 60, 200, 80),
+                          'uri': "https://example.com"})
+        page.add_text_annot((300, 60), "note")
+    doc.save(source)
+    doc.close()
+    
+    output = os.path.join(test_dir, "profile_annots_merged.pdf")
+    expected = {'full': (3, 3), 'lean': (0, 0), 'pages-only': (0, 0)}
+    for profile, (links, annots) in expected.items():
+        merger = PdfMerger()
+        merger.add_files([source, source])
+        merger.merge(output, merge_profile=profile)
+        with fitz.open(output) as doc:
+            assert len(doc) == 6
+            assert sum(len(page.get_links()) for page in doc) == links * 2, profile
+            assert sum(1 for page in doc for _ in page.annots()) == annots * 2, profile
+    print("✅ lean/pages-only 不复制链接和注释")
+    
+    try:
+        merger.merge(output, merge_profile='minimal')
+        assert False, "未知配置应报错"
+    except ValueError:
+        pass
+    return True
+
+
+def test_compression_tiers():
+    """测试压缩等级"""
+    print("\n" + "=" * 60)
+    print("测试18: 压缩等级")
+    print("=" * 60)
+    
+    from core.compression import resolve_tier, AUTO_SMALLEST_MAX_PAGES, AUTO_SMALLEST_MAX_BYTES
+    assert resolve_tier('auto', 1024, 10) == 'smallest'
+    assert resolve_tier('auto', 1024, AUTO_SMALLEST_MAX_PAGES + 1) == 'balanced'
+    assert resolve_tier('auto', AUTO_SMALLEST_MAX_BYTES + 1, 10) == 'balanced'
+    try:
+        resolve_tier('ultra')
+        assert False, "未知等级应报错"
+    except ValueError:
+        pass
+    print("✅ auto 按输入规模选择等级")
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    paths = []
+    for i in range(4):
+        filename = os.path.join(test_dir, f"tier_{i}.pdf")
+        create_test_pdf(filename, page_count=10)
+        paths.append(filename)
+    
+    merger = PdfMerger()
+    merger.add_files(paths)
+    sizes = {}
+    for tier in ('fastest', 'balanced', 'smallest'):
+        output = os.path.join(test_dir, f"tier_{tier}.pdf")
+        merger.merge(output, compression=tier)
+        with fitz.open(output) as doc:
+            assert len(doc) == 40
+        sizes[tier] = os.path.getsize(output)
+    assert sizes['smallest'] <= sizes['balanced'] < sizes['fastest'], sizes
+    print(f"✅ 输出大小: {sizes}")
+    
+    output = os.path.join(test_dir, "tier_streaming.pdf")
+    merger.merge(output, compression='balanced', max_memory=1)
+    with fitz.open(output) as doc:
+        assert len(doc) == 40
+    return True
+
+
+def test_resource_dedupe():
+    """测试跨文件资源去重"""
+    print("\n" + "=" * 60)
+    print("测试19: 跨文件资源去重")
+    print("=" * 60)
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    # 每个文件都嵌入同一张“徽标”图片（不可压缩的噪声，便于比较大小）
+    logo = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 128, 128), False)
+    logo.set_rect(logo.irect, (255, 255, 255))
+    for y in range(0, 128, 4):
+        for x in range(0, 128, 4):
+            logo.set_pixel(x, y, ((x * 37 + y * 11) % 256, (x * y) % 256, (x + y * 53) % 256))
+    paths = []
+    for i in range(6):
+        filename = os.path.join(test_dir, f"dedupe_{i}.pdf")
+        doc = fitz.open()
+        for j in range(3):
+            page = doc.new_page(width=595, height=842)
+            page.insert_image(fitz.Rect(50, 100, 178, 228), pixmap=logo)
+            page.insert_text((50, 50), f"invoice {i}-{j}", fontsize=20)
+        doc.save(filename, deflate=True)
+        doc.close()
+        paths.append(filename)
+    
+    merger = PdfMerger()
+    merger.add_files(paths)
+    sizes = {}
+    for dedupe in (False, True):
+        output = os.path.join(test_dir, f"dedupe_{dedupe}.pdf")
+        merger.merge(output, compression='balanced', dedupe=dedupe)
+        sizes[dedupe] = os.path.getsize(output)
+        with fitz.open(output) as doc:
+            assert len(doc) == 18
+            assert "invoice 5-2" in doc[-1].get_text()
+            assert len(doc[-1].get_images()) == 1
+    stats = merger.get_dedup_stats()
+    assert stats['duplicates'] >= 5 and stats['bytes_saved'] > 0, stats
+    assert sizes[True] < sizes[False] / 2, sizes
+    print(f"✅ 去重后 {sizes[True]} 字节（未去重 {sizes[False]} 字节），统计: {stats}")
+    
+    # 分片并行与流式合并同样去重
+    for options in ({'mode': 'sharded', 'workers': 2}, {'max_memory': 1}):
+        output = os.path.join(test_dir, "dedupe_mode.pdf")
+        merger.merge(output, compression='balanced', **options)
+        with fitz.open(output) as doc:
+            assert len(doc) == 18
+        assert merger.get_dedup_stats()['duplicates'] >= 5, options
+        assert os.path.getsize(output) < sizes[False], options
+    print("✅ 分片并行与流式合并均已去重")
+
+    # 注释外观与页面文字共用同一字体对象：重复的字体被释放后，外观中的引用也要改写
+    annotated = os.path.join(test_dir, "dedupe_annot.pdf")
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_text((50, 50), "shared font", fontname="helv", fontsize=20)
+    page.add_freetext_annot(fitz.Rect(50, 100, 300, 150), "annotation text", fontname="Helv")
+    doc.save(annotated)
+    doc.close()
+    with fitz.open(annotated) as doc:
+        expected = doc[0].get_pixmap().samples
+    for options in ({}, {'max_memory': 1}):
+        merger = PdfMerger()
+        merger.add_files([annotated, annotated])
+        output = os.path.join(test_dir, "dedupe_annot_merged.pdf")
+        merger.merge(output, compression='balanced', **options)
+        assert merger.get_dedup_stats()['duplicates'] >= 1
+        with fitz.open(output) as doc:
+            for page in doc:
+                assert page.get_pixmap().samples == expected, options
+    print("✅ 注释外观共用的字体去重后渲染结果不变")
+
+    # smallest 等级由保存时的 garbage=4 去重
+    merger.merge(os.path.join(test_dir, "dedupe_smallest.pdf"), compression='smallest')
+    assert merger.get_dedup_stats() is None
+    return True
+
+
+def test_prefetch():
+    """测试合并时的后台预读"""
+    print("\n" + "=" * 60)
+    print("测试20: 后台预读")
+    print("=" * 60)
+    
+    import time
+    from core.prefetch import Prefetcher, read_file
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    paths = []
+    for i in range(5):
+        filename = os.path.join(test_dir, f"prefetch_{i}.pdf")
+        create_test_pdf(filename, page_count=4)
+        paths.append(filename)
+    with open(paths[0], 'rb') as f:
+        raw = f.read()
+    assert bytes(read_file(paths[0], remote=False)) == raw
+    assert read_file(paths[0], remote=True) == raw
+    
+    # 预算只够两个文件：后台线程读完两个后等待
+    sizes = [os.path.getsize(p) for p in paths]
+    prefetcher = Prefetcher(list(zip(paths, sizes)), max_bytes=sizes[0] + sizes[1])
+    deadline = time.time() + 5
+    while len(prefetcher._ready) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    assert sorted(prefetcher._ready) == [0, 1], prefetcher._ready.keys()
+    assert bytes(prefetcher.take(paths[0])) == raw
+    # 跳过的文件被丢弃，预算随之释放
+    with prefetcher.open(paths[2]) as doc:
+        assert len(doc) == 4
+    try:
+        prefetcher.take(paths[1])
+        assert False, "已跳过的文件不应再能取出"
+    except KeyError:
+        pass
+    prefetcher.close()
+    print("✅ 预读按顺序进行并受字节预算限制")
+    
+    # 读取失败在取出时报告
+    missing = os.path.join(test_dir, "prefetch_missing.pdf")
+    with Prefetcher([(missing, 100), (paths[0], sizes[0])]) as prefetcher:
+        try:
+            prefetcher.take(missing)
+            assert False, "读取失败应抛出异常"
+        except OSError:
+            pass
+        assert bytes(prefetcher.take(paths[0])) == raw
+    
+    # 有无预读的合并结果一致
+    texts = []
+    for prefetch_bytes in (0, sizes[0] * 2):
+        merger = PdfMerger(max_open_docs=0, prefetch_bytes=prefetch_bytes)
+        merger.add_files(paths)
+        for options in ({}, {'max_memory': sizes[0] * 2}):
+            output = os.path.join(test_dir, "prefetch_merged.pdf")
+            merger.merge(output, **options)
+            with fitz.open(output) as doc:
+                assert len(doc) == 20
+                texts.append([page.get_text() for page in doc])
+    assert all(t == texts[0] for t in texts)
+    print("✅ 预读合并与直接读取的结果一致")
+    return True
+
+
+def test_isolation():
+    """测试隔离模式"""
+    print("\n" + "=" * 60)
+    print("测试21: 隔离模式")
+    print("=" * 60)
+    
+    from core.isolation import IsolationLimits
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    paths = []
+    for i in range(3):
+        filename = os.path.join(test_dir, f"isolate_{i}.pdf")
+        create_test_pdf(filename, page_count=3)
+        paths.append(filename)
+    # 解码后约7MB的不可压缩图片，用于触发内存上限
+    heavy = os.path.join(test_dir, "isolate_heavy.pdf")
+    doc = fitz.open()
+    page = doc.new_page()
+    pix = fitz.Pixmap(fitz.csRGB, 1500, 1500, os.urandom(1500 * 1500 * 3), False)
+    page.insert_image(page.rect, pixmap=pix)
+    doc.save(heavy)
+    doc.close()
+    
+    merger = PdfMerger()
+    merger.add_files([paths[0], heavy, paths[1], paths[2]])
+    output = os.path.join(test_dir, "isolated.pdf")
+    merger.merge(output, isolation=IsolationLimits(timeout=60))
+    with fitz.open(output) as doc:
+        assert len(doc) == 10
+    assert merger.get_skipped_files() == []
+    print("✅ 隔离模式正常合并")
+    
+    merger.merge(output, isolation=IsolationLimits(timeout=60, max_memory=1024 * 1024))
+    skipped = merger.get_skipped_files()
+    assert [(r['path'], r['reason']) for r in skipped] == [(heavy, 'memory')], skipped
+    with fitz.open(output) as doc:
+        assert len(doc) == 9
+    print(f"✅ 超出内存上限的文件被跳过: {skipped[0]['error']}")
+    
+    try:
+        merger.merge(output, isolation=IsolationLimits(timeout=0.001))
+        assert False, "全部超时应报错"
+    except Exception:
+        pass
+    assert {r['reason'] for r in merger.get_skipped_files()} == {'timeout'}
+    assert len(merger.get_skipped_files()) == 4
+    print("✅ 超时的文件被终止并记录")
+    
+    try:
+        merger.merge(output, isolation=IsolationLimits(), max_memory=1024 * 1024)
+        assert False, "隔离模式不能与流式合并同时使用"
+    except ValueError:
+        pass
+    return True
+
+
+def test_resumable_merge():
+    """测试可恢复的合并"""
+    print("\n" + "=" * 60)
+    print("测试22: 可恢复的合并")
+    print("=" * 60)
+    
+    import core.checkpoint as checkpoint
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    paths = []
+    for i in range(7):
+        filename = os.path.join(test_dir, f"resume_{i}.pdf")
+        create_test_pdf(filename, page_count=2, content=f"resume file {i}")
+        paths.append(filename)
+    output = os.path.join(test_dir, "resumed.pdf")
+    journal_dir = checkpoint.checkpoint_dir(output)
+    
+    old_files = checkpoint.CHECKPOINT_FILES
+    checkpoint.CHECKPOINT_FILES = 2  # 每2个文件一个检查点，共4段
+    try:
+        merger = PdfMerger()
+        merger.add_files(paths)
+        
+        # 第二个检查点写入后中断
+        def interrupt(current, total, status):
+            if status.startswith("已保存检查点 2/"):
+                raise RuntimeError("模拟中断")
+        try:
+            merger.merge(output, progress_callback=interrupt, resume=True)
+            assert False, "应当被中断"
+        except Exception as e:
+            assert "模拟中断" in str(e)
+        assert os.path.isdir(journal_dir)
+        assert len(os.listdir(journal_dir)) == 3  # 日志 + 2个分段
+        print("✅ 中断后保留了2个检查点")
+        
+        # 再次运行只处理剩余的文件
+        statuses = []
+        merger.merge(output, progress_callback=lambda c, t, s: statuses.append(s), resume=True)
+        processed = [s for s in statuses if s.startswith("正在处理")]
+        assert statuses[0] == "从检查点继续: 已完成 2/4 段", statuses[0]
+        assert processed == [f"正在处理: resume_{i}.pdf" for i in range(4, 7)], processed
+        assert not os.path.exists(journal_dir)
+        with fitz.open(output) as doc:
+            assert len(doc) == 14
+            for i in range(7):
+                assert f"resume file {i}" in doc[i * 2].get_text()
+        print("✅ 从检查点继续，成功后删除检查点目录")
+        
+        # 输入变化后不复用旧的检查点
+        try:
+            merger.merge(output, progress_callback=interrupt, resume=True)
+        except Exception:
+            pass
+        create_test_pdf(paths[0], page_count=3, content="resume file 0")
+        merger.clear()
+        merger.add_files(paths)
+        statuses = []
+        merger.merge(output, progress_callback=lambda c, t, s: statuses.append(s), resume=True)
+        assert not statuses[0].startswith("从检查点继续")
+        with fitz.open(output) as doc:
+            assert len(doc) == 15
+    finally:
+        checkpoint.CHECKPOINT_FILES = old_files
+    return True
+
+
+def test_progress_events():
+    """测试进度事件总线"""
+    print("\n" + "=" * 60)
+    print("测试23: 进度事件总线")
+    print("=" * 60)
+    
+    import io
+    import json
+    from core.progress import (ProgressBus, ProgressEvent, json_lines_writer,
+                               PAGES_DONE, PHASE, FILE_STARTED, FINISHED)
+    
+    # 间隔内只保留最新的事件，阶段切换和完成事件总是立即送达
+    bus = ProgressBus(min_interval=60)
+    received = []
+    unsubscribe = bus.subscribe(received.append)
+    for pages in range(1, 101):
+        bus.emit(ProgressEvent(PAGES_DONE, pages, 100))
+    assert bus.emitted == 100 and len(received) == 1, len(received)
+    bus.emit(ProgressEvent(PHASE, 100, 100, phase='save'))
+    assert [e.pages_done for e in received] == [1, 100, 100]
+    assert received[-1].kind == PHASE
+    unsubscribe()
+    bus.emit(ProgressEvent(FINISHED, 100, 100))
+    assert len(received) == 3
+    print(f"✅ 合并了 {bus.emitted} 个事件中的 {bus.emitted - bus.dispatched} 个")
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    paths = []
+    for i in range(3):
+        filename = os.path.join(test_dir, f"progress_{i}.pdf")
+        create_test_pdf(filename, page_count=40, content=f"progress file {i}")
+        paths.append(filename)
+    output = os.path.join(test_dir, "progress_merged.pdf")
+    
+    # 合并时按页面块报告，旧式回调的调用不变
+    merger = PdfMerger()
+    merger.add_files(paths)
+    bus = ProgressBus(min_interval=0)
+    events = []
+    bus.subscribe(events.append)
+    log = io.StringIO()
+    bus.subscribe(json_lines_writer(log))
+    statuses = []
+    merger.merge(output, progress_callback=lambda c, t, s: statuses.append((c, s)), progress=bus)
+    assert statuses == [(0, "正在处理: progress_0.pdf"), (40, "正在处理: progress_1.pdf"),
+                        (80, "正在处理: progress_2.pdf"), (120, "正在保存文件..."), (120, "完成!")], statuses
+    pages = [e.pages_done for e in events if e.kind == PAGES_DONE]
+    assert pages == [32, 40, 72, 80, 112, 120], pages
+    assert [e.path for e in events if e.kind == FILE_STARTED] == paths
+    assert [e.phase for e in events if e.kind == PHASE] == ['save']
+    assert events[-1].kind == FINISHED and events[-1].pages_done == 120
+    lines = [json.loads(line) for line in log.getvalue().splitlines()]
+    assert len(lines) == len(events) and lines[-1]['kind'] == FINISHED
+    with fitz.open(output) as doc:
+        assert len(doc) == 120
+    print(f"✅ 合并120页产生 {len(events)} 个事件（页面粒度），旧式回调 {len(statuses)} 次")
+
+    # 按页面块插入不影响跨块的内部链接
+    linked = os.path.join(test_dir, "progress_links.pdf")
+    create_test_pdf(linked, page_count=100)
+    with fitz.open(linked) as doc:
+        doc[0].insert_link({'kind': fitz.LINK_GOTO, 'from': fitz.Rect(10, 10, 100, 30), 'page': 80})
+        doc[0].insert_link({'kind': fitz.LINK_GOTO, 'from': fitz.Rect(10, 40, 100, 60), 'page': 1})
+        doc.saveIncr()
+    import core.page_ranges as page_ranges
+    can_restore_links = page_ranges.CAN_RESTORE_LINKS
+    link_targets = []
+    # 最后一次模拟 PyMuPDF 没有 _do_links：区间改为一次插入
+    for bus, can_restore in ((None, can_restore_links), (ProgressBus(min_interval=0), can_restore_links),
+                             (ProgressBus(min_interval=0), False)):
+        page_ranges.CAN_RESTORE_LINKS = can_restore
+        try:
+            merger = PdfMerger()
+            merger.add_files([linked, (linked, "50-100,1-2")])
+            merger.merge(output, mode='serial', progress=bus)
+        finally:
+            page_ranges.CAN_RESTORE_LINKS = can_restore_links
+        with fitz.open(output) as doc:
+            link_targets.append([[link['page'] for link in page.get_links()] for page in doc])
+    assert link_targets[0][0] == [80, 1], link_targets[0][0]
+    assert link_targets[1] == link_targets[0]
+    assert link_targets[2] == link_targets[0]
+    print("✅ 跨页面块的内部链接被保留")
+    return True
+
+
+def test_cancellation():
+    """测试取消合并"""
+    print("\n" + "=" * 60)
+    print("测试24: 取消合并")
+    print("=" * 60)
+    
+    import threading
+    import core.parallel as parallel
+    from core.cancel import CancelToken, MergeCancelled
+    from core.progress import ProgressBus, PAGES_DONE, CANCELLED
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    paths = []
+    for i in range(4):
+        filename = os.path.join(test_dir, f"cancel_{i}.pdf")
+        create_test_pdf(filename, page_count=80, content=f"cancel file {i}")
+        paths.append(filename)
+    output = os.path.join(test_dir, "cancelled.pdf")
+    
+    def leftovers():
+        return [n for n in os.listdir(test_dir) if n.startswith('.pdfmerge-')]
+    
+    # 验证在文件之间取消，已验证的文件保留
+    merger = PdfMerger()
+    cancel = CancelToken()
+    
+    def source():
+        yield paths[0]
+        cancel.cancel()
+        yield paths[1]
+    try:
+        merger.add_files(source(), cancel=cancel)
+        assert False, "应当被取消"
+    except MergeCancelled:
+        pass
+    assert [f['path'] for f in merger.file_list] == [paths[0]]
+    print("✅ 验证在文件之间取消")
+    
+    # 串行合并在页面块之间取消，不写出输出
+    merger = PdfMerger()
+    merger.add_files(paths)
+    if os.path.exists(output):
+        os.remove(output)
+    cancel = CancelToken()
+    bus = ProgressBus(min_interval=0)
+    events = []
+    bus.subscribe(events.append)
+    bus.subscribe(lambda e: e.kind == PAGES_DONE and e.pages_done >= 100 and cancel.cancel())
+    try:
+        merger.merge(output, progress=bus, cancel=cancel)
+        assert False, "应当被取消"
+    except MergeCancelled:
+        pass
+    done = [e.pages_done for e in events if e.kind == PAGES_DONE]
+    assert done[-1] < 140, done
+    assert events[-1].kind == CANCELLED
+    assert not os.path.exists(output)
+    print(f"✅ 串行合并在第 {done[-1]} 页后停止")
+    
+    # 流式合并取消时删除已写入一部分的输出
+    cancel = CancelToken()
+    
+    def on_progress(current, total, status):
+        if status == "正在处理: cancel_2.pdf":
+            assert os.path.exists(output)
+            cancel.cancel()
+    try:
+        merger.merge(output, progress_callback=on_progress, max_memory=1, cancel=cancel)
+        assert False, "应当被取消"
+    except MergeCancelled:
+        pass
+    assert not os.path.exists(output)
+    print("✅ 流式合并取消后删除未写完的输出")
+    
+    # 分片并行：工作进程在页面块之间检查停止事件，主进程清理临时分片
+    stop = threading.Event()
+    stop.set()
+    parallel._stop = stop
+    try:
+        parallel.merge_shard([(paths[0], None)], os.path.join(test_dir, "shard.pdf"))
+        assert False, "应当被取消"
+    except MergeCancelled:
+        pass
+    finally:
+        parallel._stop = None
+    cancel = CancelToken()
+    try:
+        merger.merge(output, progress_callback=lambda c, t, s: s.startswith("已完成分片") and cancel.cancel(),
+                     mode='sharded', workers=2, cancel=cancel)
+        assert False, "应当被取消"
+    except MergeCancelled:
+        pass
+    assert not os.path.exists(output)
+    assert not leftovers(), leftovers()
+    print("✅ 分片合并取消后清理临时分片")
+    
+    # 未取消时结果不变
+    assert merger.merge(output, cancel=CancelToken())
+    with fitz.open(output) as doc:
+        assert len(doc) == 320
+
+    # 带取消令牌的分片合并按页面块插入，跨块的内部链接同样保留
+    linked = os.path.join(test_dir, "cancel_links.pdf")
+    create_test_pdf(linked, page_count=100)
+    with fitz.open(linked) as doc:
+        doc[0].insert_link({'kind': fitz.LINK_GOTO, 'from': fitz.Rect(10, 10, 100, 30), 'page': 80})
+        doc.saveIncr()
+    link_targets = []
+    for cancel in (None, CancelToken()):
+        merger = PdfMerger()
+        merger.add_files([linked, linked])
+        merger.merge(output, mode='sharded', workers=2, cancel=cancel)
+        with fitz.open(output) as doc:
+            link_targets.append([link['page'] for link in doc[100].get_links()])
+    assert link_targets == [[180], [180]], link_targets
+    print("✅ 取消令牌不改变分片合并的输出")
+    return True
+
+
+def test_async_merge():
+    """测试异步合并接口"""
+    print("\n" + "=" * 60)
+    print("测试25: 异步合并接口")
+    print("=" * 60)
+    
+    import asyncio
+    from core.async_merge import AsyncMerger, ProgressStream
+    from core.progress import PAGES_DONE, FINISHED, CANCELLED
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    paths = []
+    for i in range(4):
+        filename = os.path.join(test_dir, f"async_{i}.pdf")
+        create_test_pdf(filename, page_count=80, content=f"async file {i}")
+        paths.append(filename)
+    broken = os.path.join(test_dir, "async_broken.pdf")
+    with open(broken, 'wb') as f:
+        f.write(b"not a pdf")
+    outputs = [os.path.join(test_dir, f"async_merged_{i}.pdf") for i in range(3)]
+    cancelled_output = os.path.join(test_dir, "async_cancelled.pdf")
+    
+    async def run():
+        async with AsyncMerger(max_concurrent=1) as runner:
+            # 超出上限的合并在事件循环中排队
+            peak = 0
+            
+            async def watch():
+                nonlocal peak
+                while True:
+                    peak = max(peak, runner.active)
+                    await asyncio.sleep(0.001)
+            watcher = asyncio.create_task(watch())
+            results = await asyncio.gather(*[
+                runner.merge(paths + [broken], output, compression='fastest') for output in outputs
+            ])
+            watcher.cancel()
+            assert peak == 1, peak
+            for result in results:
+                assert result['files'] == 4 and result['pages'] == 320
+                assert [info['path'] for info in result['invalid']] == [broken]
+            print(f"✅ 3个合并排队执行，同时进行的合并数最多为 {peak}")
+            
+            # 进度事件流
+            events = ProgressStream()
+            task = asyncio.create_task(runner.merge(paths, outputs[0], events=events, progress_interval=0))
+            received = [event async for event in events]
+            await task
+            assert received[-1].kind == FINISHED and received[-1].pages_done == 320
+            assert any(e.kind == PAGES_DONE for e in received)
+            print(f"✅ 进度流交付了 {len(received)} 个事件")
+            
+            # 取消任务即取消合并
+            if os.path.exists(cancelled_output):
+                os.remove(cancelled_output)
+            events = ProgressStream()
+            task = asyncio.create_task(runner.merge(paths, cancelled_output, events=events,
+                                                    progress_interval=0, max_memory=1))
+            kinds = []
+            async for event in events:
+                kinds.append(event.kind)
+                if event.kind == PAGES_DONE and event.pages_done > 100:
+                    task.cancel()
+            try:
+                await task
+                assert False, "应当被取消"
+            except asyncio.CancelledError:
+                pass
+            assert kinds[-1] == CANCELLED, kinds[-1]
+            assert not os.path.exists(cancelled_output)
+            assert runner.active == 0
+            print("✅ 取消任务后合并停止并删除未写完的输出")
+    
+    asyncio.run(run())
+    for output in outputs:
+        with fitz.open(output) as doc:
+            assert len(doc) == 320
+    return True
+
+
+def test_merge_iter():
+    """测试边读取边合并"""
+    print("\n" + "=" * 60)
+    print("测试26: 边读取边合并")
+    print("=" * 60)
+    
+    import io
+    from main import read_path_list
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    paths = []
+    for i in range(3):
+        filename = os.path.join(test_dir, f"iter_{i}.pdf")
+        create_test_pdf(filename, page_count=20, content=f"iter file {i}")
+        paths.append(filename)
+    with open(paths[1], 'rb') as f:
+        data = f.read()
+    output = os.path.join(test_dir, "iter_merged.pdf")
+    if os.path.exists(output):
+        os.remove(output)
+    
+    # 输入由生成器逐个给出，第一个结果在输入结束前产出
+    consumed = []
+    
+    def source():
+        for item in [paths[0], os.path.join(test_dir, "iter_missing.pdf"), data, (paths[2], "1-5")]:
+            consumed.append(item)
+            yield item
+    
+    merger = PdfMerger()
+    results = merger.merge_iter(source(), output, batch_bytes=1)
+    first = next(results)
+    assert first['valid'] and first['pages'] == 20
+    assert len(consumed) == 1, "第一个结果应在读取下一个输入前产出"
+    rest = list(results)
+    assert [r['valid'] for r in rest] == [False, True, True]
+    assert rest[1]['path'] == "<stream 2>" and rest[2]['pages'] == 5
+    with fitz.open(output) as doc:
+        assert len(doc) == 45
+        assert "iter file 1" in doc[20].get_text()
+        assert "iter file 2" in doc[40].get_text()
+    print("✅ 逐个产出结果，无效输入不影响其他文件，内存中的PDF数据可直接合并")
+    
+    # 提前停止迭代时删除未写完的输出
+    os.remove(output)
+    results = merger.merge_iter(iter(paths), output, batch_bytes=1)
+    next(results)
+    results.close()
+    assert not os.path.exists(output)
+
+    # 输入源出错时同样删除
+    def failing():
+        yield paths[0]
+        raise OSError("队列连接中断")
+
+    try:
+        list(merger.merge_iter(failing(), output, batch_bytes=1))
+        assert False, "应当抛出输入源的异常"
+    except OSError:
+        pass
+    assert not os.path.exists(output)
+    print("✅ 提前停止迭代或出错后未写完的输出已删除")
+
+    # 写入后重新打开输出文件但没有再插入页面时，不再追加写入
+    saved = []
+    save_batch = merger._save_batch
+    merger._save_batch = lambda doc, *args: (saved.append(doc.page_count), save_batch(doc, *args))
+    missing = os.path.join(test_dir, "iter_missing.pdf")
+    results = list(merger.merge_iter([paths[0], missing], output, batch_bytes=1))
+    del merger._save_batch
+    assert [r['valid'] for r in results] == [True, False]
+    assert saved == [20], saved
+    with fitz.open(output) as doc:
+        assert len(doc) == 20
+
+    # 参数错误在调用时立即抛出
+    for inputs, options in (([], {}), (paths, {'merge_profile': "unknown"}), (paths, {'compression': "unknown"})):
+        try:
+            merger.merge_iter(inputs, output, **options)
+            assert False, f"应当立即抛出 ValueError: {options}"
+        except ValueError:
+            pass
+    print("✅ 参数在调用时检查，最后一批没有页面时不再写入")
+    
+    # 路径列表：换行分隔和 NUL 分隔
+    assert list(read_path_list(io.BytesIO(b"a.pdf\r\nb c.pdf\n\nd.pdf"))) == ["a.pdf", "b c.pdf", "d.pdf"]
+    assert list(read_path_list(io.BytesIO(b"a b.pdf\0c.pdf\0"), chunk_size=3)) == ["a b.pdf", "c.pdf"]
+    print("✅ 路径列表按换行或 NUL 分隔读取")
+    return True
+
+
+def test_memory_streams():
+    """测试内存中的输入和输出"""
+    print("\n" + "=" * 60)
+    print("测试27: 内存中的输入和输出")
+    print("=" * 60)
+    
+    import io
+    
+    test_dir = "test_pdfs"
+    os.makedirs(test_dir, exist_ok=True)
+    paths = []
+    for i in range(3):
+        filename = os.path.join(test_dir, f"memory_{i}.pdf")
+        create_test_pdf(filename, page_count=10, content=f"memory file {i}")
+        paths.append(filename)
+    datas = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            datas.append(f.read())
+    
+    # bytes、memoryview、BytesIO、打开的文件和路径可以混合使用
+    merger = PdfMerger()
+    with open(paths[2], 'rb') as f:
+        results = merger.add_files([
+            datas[0],
+            (memoryview(datas[1]), "1-3"),
+            io.BytesIO(datas[2]),
+            f,
+            b"not a pdf",
+            paths[0],
+        ])
+    assert [r['valid'] for r in results] == [True, True, True, True, False, True]
+    assert results[0]['path'] == "<stream 1>"
+    assert merger.get_total_pages() == 43
+    
+    data = merger.merge_to_bytes(compression='balanced')
+    with fitz.open(stream=data, filetype='pdf') as doc:
+        assert len(doc) == 43
+        assert "memory file 1" in doc[10].get_text()
+        assert "memory file 0" in doc[-1].get_text()
+    print("✅ 内存中的输入直接合并，结果以 bytes 返回")
+
+    # BytesIO 从当前位置读起，合并器持有数据期间调用方仍可改写缓冲区
+    buffer = io.BytesIO(b"header" + datas[1])
+    buffer.seek(len(b"header"))
+    merger = PdfMerger()
+    info = merger.add_file(buffer)
+    assert info['valid'] and info['pages'] == 10
+    buffer.seek(0)
+    buffer.truncate()
+    buffer.write(b"reused")
+    with fitz.open(stream=merger.merge_to_bytes(), filetype='pdf') as doc:
+        assert "memory file 1" in doc[0].get_text()
+    print("✅ BytesIO 从当前位置读取且不锁定调用方的缓冲区")
+    
+    # 写到可写的文件对象；需要重新打开输出的模式不可用
+    output = io.BytesIO()
+    merger.merge(output, compression='fastest')
+    assert output.getvalue().startswith(b"%PDF")
+    for options in ({'max_memory': 1}, {'resume': True}):
+        try:
+            merger.merge(io.BytesIO(), **options)
+            assert False, "应当拒绝输出到文件对象"
+        except ValueError:
+            pass
+    try:
+        merger.merge(os.path.join(test_dir, "memory_sharded.pdf"), mode='sharded')
+        assert False, "内存中的输入不能分片并行"
+    except ValueError:
+        pass
+    print("✅ 输出到文件对象，不支持的组合被拒绝")
+    
+    # 命令行：- 从标准输入读入，-o - 写到标准输出
+    src_dir = os.path.join(os.path.dirname(__file__), '..', 'src')
+    result = subprocess.run(
+        [sys.executable, os.path.join(src_dir, "main.py"), "-", os.path.abspath(paths[1]), "-o", "-"],
+        input=datas[0], capture_output=True, check=True, cwd=test_dir
+    )
+    assert result.stdout.startswith(b"%PDF")
+    with fitz.open(stream=result.stdout, filetype='pdf') as doc:
+        assert len(doc) == 20
+    assert "合并成功" in result.stderr.decode('utf-8')
+    assert not os.path.exists(os.path.join(test_dir, "<stdout>"))
+    print("✅ 命令行通过标准输入输出合并，标准输出中只有PDF数据")
+    return True
+
+
 if __name__ == '__main__':
     print("\n" + "🧪 PDF合并工具测试套件" + "\n")
     
@@ -163,6 +1646,30 @@ if __name__ == '__main__':
     results.append(("基本合并", test_basic_merge()))
     results.append(("大文件处理", test_large_file()))
     results.append(("错误处理", test_error_handling()))
+    results.append(("并发验证", test_parallel_validation()))
+    results.append(("文档缓存", test_document_cache()))
+    results.append(("分片合并", test_sharded_merge()))
+    results.append(("流式合并", test_streaming_merge_memory()))
+    results.append(("元数据缓存", test_metadata_cache()))
+    results.append(("结果缓存", test_result_cache()))
+    results.append(("性能剖析", test_profiling()))
+    results.append(("目录扫描", test_directory_scanner()))
+    results.append(("分级验证", test_validation_levels()))
+    results.append(("目录列表缓存", test_directory_listing_cache()))
+    results.append(("合并列表模型", test_file_list_model()))
+    results.append(("后台验证", test_merge_session()))
+    results.append(("页面选择", test_page_selection()))
+    results.append(("合并配置", test_merge_profiles()))
+    results.append(("压缩等级", test_compression_tiers()))
+    results.append(("资源去重", test_resource_dedupe()))
+    results.append(("后台预读", test_prefetch()))
+    results.append(("隔离模式", test_isolation()))
+    results.append(("可恢复合并", test_resumable_merge()))
+    results.append(("进度事件", test_progress_events()))
+    results.append(("取消合并", test_cancellation()))
+    results.append(("异步合并", test_async_merge()))
+    results.append(("边读取边合并", test_merge_iter()))
+    results.append(("内存中的输入和输出", test_memory_streams()))
     
     # 总结
     print("\n" + "=" * 60)